@@ -1,8 +1,16 @@
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Iterable, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import Session as OrmSession, make_transient_to_detached, object_session
+import asyncio
 import os
+import time
+
+from app.cache import TTLCache
+from app.models import User
 
 # Carregar variáveis de ambiente do .env
 try:
@@ -18,13 +26,34 @@ ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 30  # 30 dias
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# Pool dedicado ao bcrypt (~100-300ms de CPU por operação): limita quantos
+# hashes rodam ao mesmo tempo e mantém o event loop livre durante logins
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", str(min(2, os.cpu_count() or 1))))
+_bcrypt_executor = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+
+# Cache de tokens já validados (token -> claims) e de usuários (id -> snapshot)
+TOKEN_CACHE_TTL = 300
+USER_CACHE_TTL = 60
+_claims_cache = TTLCache(maxsize=10000, ttl=TOKEN_CACHE_TTL)
+_user_cache = TTLCache(maxsize=5000, ttl=USER_CACHE_TTL)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verifica se a senha fornecida corresponde ao hash armazenado"""
-    return pwd_context.verify(plain_password, hashed_password)
+    """Verifica se a senha fornecida corresponde ao hash armazenado (no pool do bcrypt)"""
+    return _bcrypt_executor.submit(pwd_context.verify, plain_password, hashed_password).result()
 
 def get_password_hash(password: str) -> str:
-    """Gera um hash bcrypt da senha"""
-    return pwd_context.hash(password)
+    """Gera um hash bcrypt da senha (no pool do bcrypt)"""
+    return _bcrypt_executor.submit(pwd_context.hash, password).result()
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password para endpoints async: aguarda o pool sem bloquear o event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_bcrypt_executor, pwd_context.verify, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    """get_password_hash para endpoints async"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_bcrypt_executor, pwd_context.hash, password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """
@@ -99,3 +128,94 @@ def decode_token(token: str) -> Optional[dict]:
         return payload
     except JWTError:
         return None
+
+def get_token_claims(token: str) -> Optional[dict]:
+    """
+    Claims de um token válido, decodificando o JWT apenas na primeira vez
+
+    O resultado fica em cache por TOKEN_CACHE_TTL segundos (ou até o `exp`
+    do token, o que vier primeiro).
+
+    Returns:
+        Payload do token (com 'sub') ou None se inválido/expirado
+    """
+    claims = _claims_cache.get(token)
+    if claims is None:
+        claims = decode_token(token)
+        if not claims or not claims.get("sub") or claims.get("exp") is None:
+            return None
+        _claims_cache.set(token, claims)
+
+    if claims["exp"] <= time.time():
+        _claims_cache.invalidate(token)
+        return None
+    return claims
+
+def get_cached_user(session: OrmSession, user_id: int) -> Optional[User]:
+    """
+    Usuário do cache anexado à sessão do request, sem consulta ao banco
+
+    O snapshot em cache é compartilhado entre requests; session.merge(load=False)
+    devolve uma cópia própria da sessão, que pode ser alterada e commitada.
+    """
+    snapshot = _user_cache.get(user_id)
+    if snapshot is None:
+        return None
+    return session.merge(snapshot, load=False)
+
+def cache_user(user: User):
+    """Guarda um snapshot destacado (detached) do usuário no cache"""
+    snapshot = User(**user.model_dump())
+    make_transient_to_detached(snapshot)
+    _user_cache.set(user.id, snapshot)
+
+def token_revogado(claims: dict, user: User) -> bool:
+    """Token emitido antes da última revogação (claim 'ver' diferente de user.token_version)"""
+    return claims.get("ver", 0) != (user.token_version or 0)
+
+def revogar_tokens(user: User):
+    """
+    Invalida todos os tokens já emitidos para o usuário (troca de senha, logout geral)
+
+    Só altera o objeto; o commit fica com quem chamou.
+    """
+    user.token_version = (user.token_version or 0) + 1
+
+def invalidate_user(user_id: Optional[int]):
+    """Remove o usuário do cache (alteração de dados, senha ou exclusão)"""
+    if user_id is not None:
+        _user_cache.invalidate(user_id)
+
+def invalidate_users(session: OrmSession, user_ids: Optional[Iterable[int]] = None):
+    """
+    Invalida usuários alterados por UPDATE Core (update(User)), que não dispara
+    os eventos do ORM abaixo: agora e novamente após o commit da sessão
+
+    Args:
+        user_ids: Usuários alterados; None = todos (UPDATE sem filtro)
+    """
+    if user_ids is None:
+        _user_cache.clear()
+        session.info["todos_usuarios_alterados"] = True
+        return
+    for user_id in user_ids:
+        invalidate_user(user_id)
+        session.info.setdefault("usuarios_alterados", set()).add(user_id)
+
+# Qualquer UPDATE/DELETE de User pelo ORM invalida o cache: na hora do flush
+# e novamente após o commit (evita que um request concorrente recoloque a
+# versão antiga entre o flush e o commit)
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _usuario_alterado(mapper, connection, target):
+    invalidate_user(target.id)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault("usuarios_alterados", set()).add(target.id)
+
+@event.listens_for(OrmSession, "after_commit")
+def _invalidar_apos_commit(session):
+    if session.info.pop("todos_usuarios_alterados", False):
+        _user_cache.clear()
+    for user_id in session.info.pop("usuarios_alterados", ()):
+        invalidate_user(user_id)
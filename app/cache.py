@@ -0,0 +1,66 @@
+"""
+Cache em memória com expiração (TTL)
+Usado para respostas e consultas que podem ficar alguns segundos desatualizadas
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Callable, Hashable, Optional
+import time
+
+_AUSENTE = object()
+
+
+class TTLCache:
+    """
+    Cache LRU thread-safe com tempo de vida por entrada
+
+    Args:
+        maxsize: Número máximo de entradas (as menos usadas saem primeiro)
+        ttl: Tempo de vida de cada entrada, em segundos
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._dados: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, chave: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entrada = self._dados.get(chave)
+            if entrada is None:
+                return default
+            expira_em, valor = entrada
+            if expira_em <= time.monotonic():
+                del self._dados[chave]
+                return default
+            self._dados.move_to_end(chave)
+            return valor
+
+    def set(self, chave: Hashable, valor: Any, ttl: Optional[float] = None):
+        with self._lock:
+            self._dados[chave] = (time.monotonic() + (self.ttl if ttl is None else ttl), valor)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.maxsize:
+                self._dados.popitem(last=False)
+
+    def get_or_set(self, chave: Hashable, factory: Callable[[], Any]) -> Any:
+        """Retorna o valor em cache ou calcula com factory() e guarda"""
+        valor = self.get(chave, _AUSENTE)
+        if valor is _AUSENTE:
+            valor = factory()
+            self.set(chave, valor)
+        return valor
+
+    def invalidate(self, chave: Hashable):
+        with self._lock:
+            self._dados.pop(chave, None)
+
+    def clear(self):
+        with self._lock:
+            self._dados.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._dados)
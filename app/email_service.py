@@ -1,11 +1,22 @@
 """
-Serviço de envio de emails para recuperação de senha
+Serviço de emails: templates das mensagens e conexão SMTP
+Os templates (string.Template) ficam em app/templates/email e são compilados
+uma única vez na importação. O envio é feito em background pela fila
+app.services.email_outbox
 """
 import smtplib
+from dataclasses import dataclass
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
+from html import escape
+from pathlib import Path
+from string import Template
 import os
-from typing import Optional
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from sqlmodel import Session
+
+from app.models import EmailOutbox
 
 # Carregar variáveis de ambiente do .env
 try:
@@ -27,296 +38,142 @@ FRONTEND_URL = os.getenv("FRONTEND_URL", "https://expotv.com.br")
 # URL do backend para a página de reset
 BACKEND_URL = os.getenv("BACKEND_URL", "https://expotv-backend.fly.dev")
 
+# Templates dos emails
+TEMPLATES_DIR = Path(__file__).parent / "templates" / "email"
+
+# Timeout das operações SMTP (segundos)
+SMTP_TIMEOUT = int(os.getenv("SMTP_TIMEOUT", "30"))
+
 
-def send_password_reset_email(to_email: str, reset_token: str, user_name: str) -> bool:
+def smtp_configurado() -> bool:
+    return bool(SMTP_USER and SMTP_PASSWORD)
+
+
+def conectar_smtp() -> smtplib.SMTP:
     """
-    Envia email com link para resetar senha
+    Abre uma conexão SMTP autenticada (STARTTLS + login)
     
-    Args:
-        to_email: Email do destinatário
-        reset_token: Token único para reset
-        user_name: Nome do usuário
-        
-    Returns:
-        True se enviado com sucesso, False caso contrário
+    Quem chama deve fechar com quit(); a mesma conexão pode enviar vários emails.
     """
-    
-    # Link de reset - aponta para a página HTML no backend
-    reset_link = f"{BACKEND_URL}/reset-password-page?token={reset_token}"
-    
-    # HTML do email
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="utf-8">
-        <style>
-            body {{
-                font-family: Arial, sans-serif;
-                line-height: 1.6;
-                color: #333;
-            }}
-            .container {{
-                max-width: 600px;
-                margin: 0 auto;
-                padding: 20px;
-                background-color: #f9f9f9;
-            }}
-            .header {{
-                background-color: #213547;
-                color: white;
-                padding: 20px;
-                text-align: center;
-                border-radius: 5px 5px 0 0;
-            }}
-            .content {{
-                background-color: white;
-                padding: 30px;
-                border-radius: 0 0 5px 5px;
-            }}
-            .button {{
-                display: inline-block;
-                padding: 12px 30px;
-                background-color: #213547;
-                color: white;
-                text-decoration: none;
-                border-radius: 5px;
-                margin: 20px 0;
-            }}
-            .button:hover {{
-                background-color: #2d4a63;
-            }}
-            .footer {{
-                text-align: center;
-                margin-top: 20px;
-                font-size: 12px;
-                color: #666;
-            }}
-            .warning {{
-                background-color: #fff3cd;
-                border: 1px solid #ffc107;
-                padding: 15px;
-                border-radius: 5px;
-                margin: 15px 0;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>🔒 Recuperação de Senha</h1>
-            </div>
-            <div class="content">
-                <p>Olá <strong>{user_name}</strong>,</p>
-                
-                <p>Recebemos uma solicitação para redefinir a senha da sua conta no <strong>EXPO TV</strong>.</p>
-                
-                <p>Para criar uma nova senha, clique no botão abaixo:</p>
-                
-                <center>
-                    <a href="{reset_link}" class="button">Redefinir Senha</a>
-                </center>
-                
-                <p>Ou copie e cole este link no seu navegador:</p>
-                <p style="background-color: #f5f5f5; padding: 10px; border-radius: 5px; word-break: break-all;">
-                    {reset_link}
-                </p>
-                
-                <div class="warning">
-                    <strong>⚠️ Importante:</strong>
-                    <ul>
-                        <li>Este link é válido por <strong>1 hora</strong></li>
-                        <li>Se você não solicitou esta alteração, ignore este email</li>
-                        <li>Sua senha atual permanecerá ativa até você criar uma nova</li>
-                    </ul>
-                </div>
-                
-                <p>Se tiver alguma dúvida, entre em contato com nosso suporte.</p>
-                
-                <p>Atenciosamente,<br>
-                <strong>Equipe EXPO TV</strong></p>
-            </div>
-            <div class="footer">
-                <p>© 2025 EXPO TV - Sistema de Gestão para Condomínios</p>
-                <p>Este é um email automático, por favor não responda.</p>
-            </div>
-        </div>
-    </body>
-    </html>
+    server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT)
+    try:
+        server.starttls()
+        server.login(SMTP_USER, SMTP_PASSWORD)
+    except Exception:
+        server.close()
+        raise
+    return server
+
+
+def montar_mensagem(to_email: str, subject: str, text_content: str, html_content: Optional[str] = None) -> MIMEMultipart:
+    """Mensagem multipart (texto + HTML opcional) com o remetente padrão"""
+    message = MIMEMultipart("alternative")
+    message["Subject"] = subject
+    message["From"] = f"{FROM_NAME} <{FROM_EMAIL}>"
+    message["To"] = to_email
+    
+    message.attach(MIMEText(text_content, "plain", "utf-8"))
+    if html_content:
+        message.attach(MIMEText(html_content, "html", "utf-8"))
+    return message
+
+
+@dataclass(frozen=True)
+class Bloco:
     """
-    
-    # Texto alternativo (para clientes que não suportam HTML)
-    text_content = f"""
-    Recuperação de Senha - EXPO TV
-    
-    Olá {user_name},
-    
-    Recebemos uma solicitação para redefinir a senha da sua conta.
-    
-    Para criar uma nova senha, acesse o link abaixo:
-    {reset_link}
-    
-    Este link é válido por 1 hora.
-    
-    Se você não solicitou esta alteração, ignore este email.
-    
-    Atenciosamente,
-    Equipe EXPO TV
+    Valor de contexto com versões próprias para o texto e para o HTML
+
+    O HTML é usado como está (sem escape): quem monta o bloco escapa os dados.
     """
-    
-    try:
-        # Criar mensagem
-        message = MIMEMultipart("alternative")
-        message["Subject"] = "🔒 Recuperação de Senha - EXPO TV"
-        message["From"] = f"{FROM_NAME} <{FROM_EMAIL}>"
-        message["To"] = to_email
-        
-        # Adicionar ambas as versões
-        part1 = MIMEText(text_content, "plain", "utf-8")
-        part2 = MIMEText(html_content, "html", "utf-8")
-        
-        message.attach(part1)
-        message.attach(part2)
-        
-        # Conectar e enviar
-        if not SMTP_USER or not SMTP_PASSWORD:
-            print("⚠️ SMTP não configurado. Email não será enviado.")
-            print(f"Link de reset (modo dev): {reset_link}")
-            return False
-            
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USER, SMTP_PASSWORD)
-            server.send_message(message)
-        
-        print(f"✅ Email enviado para {to_email}")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Erro ao enviar email: {str(e)}")
-        print(f"Link de reset (modo dev): {reset_link}")
-        return False
-
-
-def send_password_changed_notification(to_email: str, user_name: str) -> bool:
+    texto: str
+    html: str
+
+
+@dataclass(frozen=True)
+class EmailTemplate:
+    """Template pré-compilado: assunto, texto e HTML (com o layout base já aplicado)"""
+    nome: str
+    assunto: Template
+    texto: Template
+    html: Optional[Template]
+
+    def render(self, context: Mapping[str, Any]) -> Tuple[str, str, Optional[str]]:
+        """
+        Renderiza (assunto, texto, html); valores do contexto são escapados no HTML
+        (exceto a parte HTML de um Bloco)
+
+        Raises:
+            KeyError: Se faltar alguma variável usada pelo template
+        """
+        valores = {**_CONTEXTO_PADRAO, **context}
+        html = None
+        if self.html is not None:
+            html = self.html.substitute({
+                chave: valor.html if isinstance(valor, Bloco) else escape(str(valor))
+                for chave, valor in valores.items()
+            })
+        valores = {chave: valor.texto if isinstance(valor, Bloco) else valor for chave, valor in valores.items()}
+        return self.assunto.substitute(valores), self.texto.substitute(valores), html
+
+
+def _carregar_templates() -> Dict[str, EmailTemplate]:
     """
-    Envia notificação de que a senha foi alterada com sucesso
-    
-    Args:
-        to_email: Email do destinatário
-        user_name: Nome do usuário
-        
+    Lê e compila os templates de TEMPLATES_DIR uma única vez
+
+    Cada template tem um `{nome}.txt` (1ª linha = assunto, depois uma linha
+    em branco e o corpo em texto) e, opcionalmente, um `{nome}.html` com o
+    conteúdo que entra no layout `base.html`. A 1ª linha do HTML pode definir
+    o título do cabeçalho: `<!-- titulo: ... -->`.
+    """
+    base = Template((TEMPLATES_DIR / "base.html").read_text(encoding="utf-8"))
+    templates = {}
+    for arquivo_texto in sorted(TEMPLATES_DIR.glob("*.txt")):
+        nome = arquivo_texto.stem
+        assunto, _, texto = arquivo_texto.read_text(encoding="utf-8").partition("\n\n")
+
+        html = None
+        arquivo_html = arquivo_texto.with_suffix(".html")
+        if arquivo_html.exists():
+            conteudo = arquivo_html.read_text(encoding="utf-8")
+            titulo = assunto
+            primeira_linha, _, resto = conteudo.partition("\n")
+            if primeira_linha.startswith("<!-- titulo:"):
+                titulo = primeira_linha.removeprefix("<!-- titulo:").removesuffix("-->").strip()
+                conteudo = resto
+            # Layout base aplicado aqui: só as variáveis do email ficam para o render
+            html = Template(base.safe_substitute(titulo=titulo, conteudo=conteudo))
+
+        templates[nome] = EmailTemplate(nome, Template(assunto.strip()), Template(texto), html)
+    return templates
+
+
+_CONTEXTO_PADRAO = {"backend_url": BACKEND_URL, "frontend_url": FRONTEND_URL}
+TEMPLATES = _carregar_templates()
+
+
+def render_templated(template: str, context: Mapping[str, Any]) -> Tuple[str, str, Optional[str]]:
+    """
+    Renderiza um template de email
+
     Returns:
-        True se enviado com sucesso, False caso contrário
+        (assunto, texto, html)
     """
-    
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="utf-8">
-        <style>
-            body {{
-                font-family: Arial, sans-serif;
-                line-height: 1.6;
-                color: #333;
-            }}
-            .container {{
-                max-width: 600px;
-                margin: 0 auto;
-                padding: 20px;
-                background-color: #f9f9f9;
-            }}
-            .header {{
-                background-color: #213547;
-                color: white;
-                padding: 20px;
-                text-align: center;
-                border-radius: 5px 5px 0 0;
-            }}
-            .content {{
-                background-color: white;
-                padding: 30px;
-                border-radius: 0 0 5px 5px;
-            }}
-            .success {{
-                background-color: #d4edda;
-                border: 1px solid #213547;
-                padding: 15px;
-                border-radius: 5px;
-                margin: 15px 0;
-            }}
-            .footer {{
-                text-align: center;
-                margin-top: 20px;
-                font-size: 12px;
-                color: #666;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="container">
-            <div class="header">
-                <h1>✅ Senha Alterada</h1>
-            </div>
-            <div class="content">
-                <p>Olá <strong>{user_name}</strong>,</p>
-                
-                <div class="success">
-                    <strong>✅ Sucesso!</strong><br>
-                    Sua senha foi alterada com sucesso.
-                </div>
-                
-                <p>Se você não realizou esta alteração, entre em contato com nosso suporte imediatamente.</p>
-                
-                <p>Atenciosamente,<br>
-                <strong>Equipe EXPO TV</strong></p>
-            </div>
-            <div class="footer">
-                <p>© 2025 EXPO TV - Sistema de Gestão para Condomínios</p>
-            </div>
-        </div>
-    </body>
-    </html>
+    return TEMPLATES[template].render(context)
+
+
+def send_templated(template: str, context: Mapping[str, Any], *, to_email: str, session: Session) -> EmailOutbox:
     """
-    
-    text_content = f"""
-    Senha Alterada - EXPO TV
-    
-    Olá {user_name},
-    
-    Sua senha foi alterada com sucesso.
-    
-    Se você não realizou esta alteração, entre em contato com nosso suporte.
-    
-    Atenciosamente,
-    Equipe EXPO TV
+    Renderiza um template e enfileira o email (envio em background)
+
+    Não faz commit: o email sai junto com a transação de quem chama.
+
+    Args:
+        template: Nome do template em TEMPLATES_DIR (ex.: 'password_reset')
+        context: Variáveis do template
+        to_email: Destinatário
+        session: Sessão do banco onde o email é enfileirado
     """
-    
-    try:
-        message = MIMEMultipart("alternative")
-        message["Subject"] = "✅ Senha Alterada - EXPO TV"
-        message["From"] = f"{FROM_NAME} <{FROM_EMAIL}>"
-        message["To"] = to_email
-        
-        part1 = MIMEText(text_content, "plain", "utf-8")
-        part2 = MIMEText(html_content, "html", "utf-8")
-        
-        message.attach(part1)
-        message.attach(part2)
-        
-        if not SMTP_USER or not SMTP_PASSWORD:
-            print("⚠️ SMTP não configurado. Notificação não será enviada.")
-            return False
-            
-        with smtplib.SMTP(SMTP_HOST, SMTP_PORT) as server:
-            server.starttls()
-            server.login(SMTP_USER, SMTP_PASSWORD)
-            server.send_message(message)
-        
-        print(f"✅ Notificação enviada para {to_email}")
-        return True
-        
-    except Exception as e:
-        print(f"❌ Erro ao enviar notificação: {str(e)}")
-        return False
+    from app.services.email_outbox import enfileirar_email  # email_outbox importa este módulo
+
+    assunto, texto, html = render_templated(template, context)
+    return enfileirar_email(session, to_email, assunto, texto, html)
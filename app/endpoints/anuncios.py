@@ -1,9 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Response
+from sqlmodel import Session, func
 from app.db import engine
+from app.queries import LIMITE_MAXIMO, paginar, parse_fields
 from app.models import Anuncio
-from app.schemas import AnuncioCreate
-from app.storage import upload_image_to_r2, delete_image_from_r2
+from app.schemas import AnuncioUpdate
+from app.storage import upload_media_with_info, delete_image_from_r2
+from app.services.dayparting import horario_local, parse_janelas, status_inicial
+from app.services.content_links import do_condominio, remover_vinculos, sincronizar_condominios
 from typing import Optional
 from datetime import datetime
 
@@ -15,12 +18,25 @@ def get_session():
 
 @router.get("/anuncios", 
     summary="📋 Listar Anúncios", 
-    description="Lista todos os anúncios cadastrados no sistema",
-    response_description="Lista de anúncios"
+    description="Lista os anúncios cadastrados no sistema (paginação por cursor, filtros e seleção de campos)",
+    response_description="Lista de anúncios (próximo cursor no header X-Next-After-Id)"
 )
-def get_all_anuncios(session: Session = Depends(get_session)):
-    anuncios = session.exec(select(Anuncio)).all()
-    return anuncios
+def get_all_anuncios(
+    response: Response,
+    status: Optional[str] = Query(None, description="Filtrar por status (ex.: Ativo)"),
+    condominio_id: Optional[int] = Query(None, description="Filtrar anúncios exibidos neste condomínio"),
+    after_id: Optional[int] = Query(None, description="Cursor: retorna apenas registros com id maior que este"),
+    limit: Optional[int] = Query(None, description="Tamanho da página (sem limite se omitido)", ge=1, le=LIMITE_MAXIMO),
+    fields: Optional[str] = Query(None, description="Campos a retornar, separados por vírgula (ex.: id,nome,status)"),
+    session: Session = Depends(get_session)
+):
+    filtros = []
+    if status:
+        filtros.append(func.lower(Anuncio.status) == status.lower())
+    if condominio_id is not None:
+        filtros.append(do_condominio(Anuncio, condominio_id))
+    
+    return paginar(session, Anuncio, response, filtros, after_id, limit, parse_fields(Anuncio, fields))
 
 @router.get("/anuncios/{anuncio_id}", 
     summary="🔍 Buscar Anúncio", 
@@ -45,7 +61,11 @@ async def create_anuncio(
     nome_anunciante: Optional[str] = Form(None, description="Nome completo do anunciante", example="João Silva"),
     status: str = Form(..., description="Status do anúncio", example="Ativo"),
     data_expiracao: Optional[datetime] = Form(None, description="Data de expiração do anúncio (formato ISO)", example="2025-12-31T23:59:59"),
+    data_inicio: Optional[datetime] = Form(None, description="Início da exibição (formato ISO) - fica 'Agendado' até lá", example="2025-12-01T00:00:00"),
+    janelas_exibicao: Optional[str] = Form(None, description="Janelas semanais de exibição (separadas por ';')", example="seg-sex 06:00-12:00; sab,dom 08:00-20:00"),
     tempo_exibicao: int = Form(10, description="Tempo de exibição em segundos (padrão: 10s)", example=10, ge=1, le=300),
+    peso: int = Form(1, description="Peso no rodízio de anúncios (1-10, padrão: 1)", example=1, ge=1, le=10),
+    prioridade: int = Form(0, description="Prioridade (0-3, cada nível dobra o peso)", example=0, ge=0, le=3),
     image: Optional[UploadFile] = File(
         None, 
         description="🖼️ Imagem/Vídeo do anúncio (PNG, JPG, JPEG, WebP, MP4, MOV, AVI, WebM) - Opcional",
@@ -55,7 +75,13 @@ async def create_anuncio(
     ),
     session: Session = Depends(get_session)
 ):
+    try:
+        parse_janelas(janelas_exibicao)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     archive_url = ""
+    media_info = {}
     
     # Se tem imagem/vídeo, fazer upload
     if image and image.filename:
@@ -82,7 +108,8 @@ async def create_anuncio(
         try:
             # Upload para R2 (usa a função original que já funciona)
             image_content = await image.read()
-            archive_url = upload_image_to_r2(image_content, image.filename, image.content_type)
+            media_info = upload_media_with_info(image_content, image.filename, image.content_type)
+            archive_url = media_info["url"]
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Erro no upload: {str(e)}")
             print(f"❌ Erro no upload: {str(e)}")
@@ -94,13 +121,22 @@ async def create_anuncio(
         condominios_ids=condominios_ids,
         numero_anunciante=numero_anunciante,
         nome_anunciante=nome_anunciante,
-        status=status,
+        status=status_inicial(status, data_inicio),
         data_expiracao=data_expiracao,
+        data_inicio=horario_local(data_inicio),
+        janelas_exibicao=janelas_exibicao,
         archive_url=archive_url,
-        tempo_exibicao=tempo_exibicao
+        archive_size=media_info.get("size"),
+        archive_hash=media_info.get("hash"),
+        archive_content_type=media_info.get("content_type"),
+        tempo_exibicao=tempo_exibicao,
+        peso=peso,
+        prioridade=prioridade
     )
     
     session.add(anuncio)
+    session.flush()  # Gerar o id antes de gravar os vínculos
+    sincronizar_condominios(session, anuncio)
     session.commit()
     session.refresh(anuncio)
     
@@ -108,21 +144,32 @@ async def create_anuncio(
 
 @router.put("/anuncios/{anuncio_id}", 
     summary="✏️ Atualizar Anúncio", 
-    description="Atualiza os dados de um anúncio existente (exceto a imagem)",
+    description="Atualiza os dados de um anúncio existente (exceto a imagem). Apenas os campos enviados são alterados.",
     response_description="Anúncio atualizado"
 )
-def update_anuncio(anuncio_id: int, anuncio_data: AnuncioCreate, session: Session = Depends(get_session)):
+def update_anuncio(anuncio_id: int, anuncio_data: AnuncioUpdate, session: Session = Depends(get_session)):
     db_anuncio = session.get(Anuncio, anuncio_id)
     if not db_anuncio:
         raise HTTPException(status_code=404, detail="Anúncio não encontrado")
     
-    db_anuncio.nome = anuncio_data.nome
-    db_anuncio.condominios_ids = anuncio_data.condominios_ids
-    db_anuncio.numero_anunciante = anuncio_data.numero_anunciante
-    db_anuncio.nome_anunciante = anuncio_data.nome_anunciante
-    db_anuncio.status = anuncio_data.status
-    db_anuncio.data_expiracao = anuncio_data.data_expiracao
-    db_anuncio.tempo_exibicao = anuncio_data.tempo_exibicao
+    # Campos omitidos mantêm o valor atual (peso, prioridade, programação...)
+    dados = anuncio_data.model_dump(exclude_unset=True)
+    if "janelas_exibicao" in dados:
+        try:
+            parse_janelas(dados["janelas_exibicao"])
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        dados["janelas_exibicao"] = dados["janelas_exibicao"] or None
+    
+    if "data_inicio" in dados:
+        dados["data_inicio"] = horario_local(dados["data_inicio"])
+    
+    for campo, valor in dados.items():
+        setattr(db_anuncio, campo, valor)
+    if "status" in dados or "data_inicio" in dados:
+        db_anuncio.status = status_inicial(db_anuncio.status, db_anuncio.data_inicio)
+    if "condominios_ids" in dados:
+        sincronizar_condominios(session, db_anuncio)
     # archive_url mantém o valor existente (para não perder a imagem)
     
     session.add(db_anuncio)
@@ -169,10 +216,13 @@ async def update_anuncio_image(
         
         # Upload nova imagem
         image_content = await image.read()
-        new_image_url = upload_image_to_r2(image_content, image.filename, image.content_type)
+        media_info = upload_media_with_info(image_content, image.filename, image.content_type)
         
-        # Atualizar URL
-        db_anuncio.archive_url = new_image_url
+        # Atualizar URL e metadados da mídia
+        db_anuncio.archive_url = media_info["url"]
+        db_anuncio.archive_size = media_info["size"]
+        db_anuncio.archive_hash = media_info["hash"]
+        db_anuncio.archive_content_type = media_info["content_type"]
         session.add(db_anuncio)
         session.commit()
         session.refresh(db_anuncio)
@@ -196,6 +246,7 @@ def delete_anuncio(anuncio_id: int, session: Session = Depends(get_session)):
     if db_anuncio.archive_url:
         delete_image_from_r2(db_anuncio.archive_url)
     
+    remover_vinculos(session, db_anuncio)
     session.delete(db_anuncio)
     session.commit()
     return {"ok": True}
@@ -1,89 +1,36 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, RedirectResponse, StreamingResponse
+from sqlmodel import Session, select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
 from typing import List, Optional, Union
-from app.db import engine
+from app.db import get_async_read_session, get_read_session
+from app.cache import TTLCache
 from app.models import Anuncio, Aviso, TV
+from app.services.playlist import build_playlist, estatisticas_playlist
+from app.services.ad_scheduler import JANELA_ROTACAO_SEGUNDOS, deslocamento_rotacao, planejar_rotacao
+from app.services.dayparting import filtrar_programados
+from app.services.content_links import do_condominio
+from app.storage import get_media_info
+from app.services.news import NewsItem, FEEDS, get_news, get_news_status
+from app.services.news_images import obter_imagem, url_origem
 from pydantic import BaseModel
-import requests
+from datetime import datetime
+import hashlib
+import json
 import logging
 
 router = APIRouter()
 
-def get_session():
-    with Session(engine) as session:
-        yield session
+# Endpoints das TVs: somente leitura e tolerantes ao atraso da réplica,
+# por isso usam as sessões de leitura (réplica, se configurada)
 
-class NewsItem(BaseModel):
-    title: str
-    description: Optional[str] = None
-    url: str
-    urlToImage: Optional[str] = None
-    publishedAt: str
-    source: str
+# Status considerados na playlist da TV ('Agendado' entra quando data_inicio chegar)
+STATUS_NO_AR = ("ativo", "agendado")
 
-def get_jovempan_news(limit: int = 15) -> List[NewsItem]:
-    """
-    Busca notícias APENAS da Jovem Pan
-    Retorna até 15 notícias por padrão
-    """
-    try:
-        from datetime import datetime
-        import re
-        
-        news_items = []
-        
-        # Buscar RSS da Jovem Pan
-        response = requests.get(
-            'https://api.rss2json.com/v1/api.json',
-            params={'rss_url': 'https://jovempan.com.br/feed/'},
-            timeout=10
-        )
-        
-        if response.status_code == 200:
-            data = response.json()
-            items = data.get('items', [])
-            
-            # A API retorna 10 por padrão, mas vamos pegar quantos vier
-            for item in items[:limit]:
-                # Limpar HTML da descrição
-                description = item.get('description', '')
-                description = re.sub('<[^<]+?>', '', description).strip()
-                
-                if len(description) > 200:
-                    description = description[:200] + "..."
-                
-                # Extrair imagem (está no content como HTML)
-                thumbnail = item.get('thumbnail', '')
-                
-                # Se não tiver thumbnail, buscar no content
-                if not thumbnail:
-                    content = item.get('content', '')
-                    # Buscar tag img src no HTML
-                    img_match = re.search(r'<img[^>]+src="([^"]+)"', content)
-                    if img_match:
-                        thumbnail = img_match.group(1)
-                
-                # Tentar enclosure se ainda não tiver imagem
-                if not thumbnail and 'enclosure' in item:
-                    thumbnail = item.get('enclosure', {}).get('link', '')
-                
-                news_item = NewsItem(
-                    title=item.get('title', '').strip(),
-                    description=description,
-                    url=item.get('link', ''),
-                    urlToImage=thumbnail,
-                    publishedAt=item.get('pubDate', datetime.now().isoformat() + "Z"),
-                    source='🎙️ Jovem Pan'
-                )
-                
-                if news_item.title:
-                    news_items.append(news_item)
-        
-        return news_items
-        
-    except Exception as e:
-        logging.error(f"Erro ao buscar notícias da Jovem Pan: {e}")
-        return []
+# Cache da resposta de /app/status
+STATUS_CACHE_TTL = 10
+_status_cache = TTLCache(maxsize=1, ttl=STATUS_CACHE_TTL)
 
 class AppContent(BaseModel):
     anuncios: List[Anuncio] = []
@@ -104,7 +51,7 @@ def get_app_content(
     status: Optional[str] = Query("Ativo", description="Status dos conteúdos (padrão: Ativo)"),
     include_news: bool = Query(True, description="Incluir notícias da Jovem Pan"),
     news_limit: int = Query(15, description="Número máximo de notícias (padrão: 15)"),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """
     Retorna conteúdo para o app mobile/TV
@@ -153,7 +100,7 @@ def get_app_content(
     # Buscar notícias se solicitado (sempre da Jovem Pan)
     news_items = []
     if include_news:
-        news_items = get_jovempan_news(limit=news_limit)
+        news_items = get_news(limit=news_limit)
     
     return AppContent(
         anuncios=anuncios_filtrados,
@@ -172,7 +119,7 @@ def get_app_content(
 def get_anuncios_condominio(
     condominio_id: int,
     status: Optional[str] = Query("Ativo", description="Status dos anúncios"),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """
     Retorna anúncios específicos de um condomínio
@@ -203,7 +150,7 @@ def get_anuncios_condominio(
 def get_avisos_condominio(
     condominio_id: int,
     status: Optional[str] = Query("Ativo", description="Status dos avisos"),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_read_session)
 ):
     """
     Retorna avisos específicos de um condomínio
@@ -225,59 +172,93 @@ def get_avisos_condominio(
     return {"avisos": avisos_filtrados, "total": len(avisos_filtrados)}
 
 @router.get("/app/news", 
-    summary="📰 Notícias Jovem Pan", 
-    description="Retorna notícias da Jovem Pan",
-    response_description="Lista de notícias da Jovem Pan"
+    summary="📰 Notícias", 
+    description="Retorna notícias agregadas de todos os feeds cadastrados (Jovem Pan e outros)",
+    response_description="Lista de notícias, da mais recente para a mais antiga"
 )
 def get_news_endpoint(
     limit: int = Query(10, description="Número máximo de notícias", ge=1, le=50)
 ):
     """
-    Retorna notícias APENAS da Jovem Pan
+    Retorna notícias do cache agregado (sem duplicadas, ordenadas por data)
     """
-    news_items = get_jovempan_news(limit=limit)
-    return {"news": news_items, "total": len(news_items), "source": "🎙️ Jovem Pan"}
+    news_items = get_news(limit=limit)
+    return {
+        "news": news_items,
+        "total": len(news_items),
+        "source": ", ".join(feed.nome for feed in FEEDS.values())
+    }
+
+@router.api_route("/app/news/image/{chave}.webp",
+    methods=["GET", "HEAD"],
+    summary="🖼️ Imagem de Notícia",
+    description="Thumbnail da notícia redimensionada para a TV e convertida para WebP (em cache)"
+)
+def get_news_image(chave: str):
+    """
+    Serve a imagem de uma notícia redimensionada em WebP
+    
+    Apenas imagens de notícias presentes no cache são aceitas. Se a origem
+    falhar, redireciona para a imagem original para a TV não ficar sem imagem.
+    """
+    try:
+        caminho = obter_imagem(chave)
+    except Exception as e:
+        logging.error(f"Erro ao processar imagem de notícia {chave}: {e}")
+        origem = url_origem(chave)
+        if origem:
+            return RedirectResponse(url=origem, status_code=307)
+        raise HTTPException(status_code=502, detail="Erro ao processar imagem")
+    
+    if not caminho:
+        raise HTTPException(status_code=404, detail="Imagem não encontrada")
+    
+    return FileResponse(
+        caminho,
+        media_type="image/webp",
+        headers={"Cache-Control": "public, max-age=86400, immutable"}
+    )
+
+async def contar_por_status(session: AsyncSession, model) -> dict:
+    """Total e ativos de uma tabela com um único COUNT(*) ... GROUP BY status"""
+    linhas = (await session.exec(select(model.status, func.count()).group_by(model.status))).all()
+    total = sum(quantidade for _, quantidade in linhas)
+    ativos = sum(quantidade for status, quantidade in linhas if (status or "").lower() == "ativo")
+    return {
+        "total": total,
+        "ativos": ativos,
+        "inativos": total - ativos
+    }
+
+def _status_noticias() -> dict:
+    """Disponibilidade de notícias: apenas o estado do cache (sem chamar os feeds)"""
+    news_status = get_news_status()
+    return {
+        "available": news_status["cached_items"] > 0,
+        "sample_count": min(news_status["cached_items"], 5),
+        **news_status
+    }
 
 @router.get("/app/status", 
     summary="📊 Status do Sistema", 
     description="Retorna estatísticas gerais do sistema",
     response_description="Estatísticas do sistema"
 )
-def get_app_status(session: Session = Depends(get_session)):
+async def get_app_status(session: AsyncSession = Depends(get_async_read_session)):
     """
     Retorna estatísticas do sistema incluindo disponibilidade de notícias
-    """
-    total_anuncios = len(session.exec(select(Anuncio)).all())
-    total_avisos = len(session.exec(select(Aviso)).all())
-    anuncios_ativos = len(session.exec(select(Anuncio).where(Anuncio.status == "Ativo")).all())
-    avisos_ativos = len(session.exec(select(Aviso).where(Aviso.status == "Ativo")).all())
-    
-    # Testar disponibilidade de notícias
-    news_available = True
-    news_count = 0
-    try:
-        news_items = get_jovempan_news(limit=5)
-        news_count = len(news_items)
-    except Exception as e:
-        news_available = False
-        logging.error(f"Erro ao verificar notícias: {e}")
     
-    return {
-        "anuncios": {
-            "total": total_anuncios,
-            "ativos": anuncios_ativos,
-            "inativos": total_anuncios - anuncios_ativos
-        },
-        "avisos": {
-            "total": total_avisos,
-            "ativos": avisos_ativos,
-            "inativos": total_avisos - avisos_ativos
-        },
-        "news": {
-            "available": news_available,
-            "sample_count": news_count
+    Resposta em cache por STATUS_CACHE_TTL segundos (seguro para polling de dashboard)
+    """
+    status = _status_cache.get("status")
+    if status is None:
+        status = {
+            "anuncios": await contar_por_status(session, Anuncio),
+            "avisos": await contar_por_status(session, Aviso),
+            "news": _status_noticias()
         }
-    }
+        _status_cache.set("status", status)
+    return status
 
 @router.get("/app/jovempan", 
     summary="🎙️ Notícias Jovem Pan", 
@@ -292,72 +273,119 @@ def get_jovempan_endpoint(
     
     Fonte: https://jovempan.com.br/feed/
     """
-    try:
-        from datetime import datetime
-        import re
-        
-        news_items = []
-        
-        # Buscar RSS da Jovem Pan
-        response = requests.get(
-            'https://api.rss2json.com/v1/api.json',
-            params={'rss_url': 'https://jovempan.com.br/feed/'},
-            timeout=10
+    news_items = get_news(limit=limit, feed_id="jovempan")
+    return {
+        "news": news_items,
+        "total": len(news_items),
+        "source": "Jovem Pan",
+        "feed_url": "https://jovempan.com.br/"
+    }
+
+def _filtros_no_ar(model, condominio_id: int) -> list:
+    """Conteúdo no ar (ativo/agendado) exibido no condomínio, pelos vínculos indexados"""
+    return [func.lower(model.status).in_(STATUS_NO_AR), do_condominio(model, condominio_id)]
+
+def montar_conteudo_tv(tv: TV, session: Session, agora: Optional[float] = None) -> dict:
+    """
+    Monta a playlist intercalada da TV (avisos, anúncios e notícias)
+    
+    Usado pelo bundle offline da TV (o endpoint de conteúdo usa montar_conteudo_tv_async)
+    """
+    avisos = session.exec(select(Aviso).where(*_filtros_no_ar(Aviso, tv.condominio_id))).all()
+    anuncios = session.exec(select(Anuncio).where(*_filtros_no_ar(Anuncio, tv.condominio_id))).all()
+    return montar_playlist_tv(tv, list(avisos), list(anuncios), agora)
+
+async def montar_conteudo_tv_async(tv: TV, session: AsyncSession) -> dict:
+    """montar_conteudo_tv com a AsyncSession (consultas sem bloquear o event loop)"""
+    avisos = (await session.exec(select(Aviso).where(*_filtros_no_ar(Aviso, tv.condominio_id)))).all()
+    anuncios = (await session.exec(select(Anuncio).where(*_filtros_no_ar(Anuncio, tv.condominio_id)))).all()
+    return montar_playlist_tv(tv, list(avisos), list(anuncios))
+
+def montar_playlist_tv(tv: TV, avisos: List[Aviso], anuncios: List[Anuncio], agora: Optional[float] = None) -> dict:
+    """
+    Aplica programação, proporções e rodízio sobre os avisos/anúncios já carregados
+    
+    Não acessa o banco: serve às versões síncrona e assíncrona.
+    `agora` (epoch) fixa a janela do rodízio; agora=0 dá a rotação canônica da TV.
+    """
+    # 1. Aplicar programação: início/fim e janelas semanais (índice pré-calculado por condomínio)
+    avisos, anuncios = filtrar_programados(tv.condominio_id, avisos, anuncios)
+    
+    # 2. Buscar notícias (se proporção configurada **e** template suportar notícias)
+    # Layout 1: NÃO exibe notícias no conteúdo principal (somente avisos/anúncios)
+    # Layout 2: Exibe notícias (rodapé/tela cheia, conforme o frontend)
+    # Notícias vêm do cache agregado (atualizado em background, sem latência para a TV)
+    noticias = []
+    pode_mostrar_noticias = (
+        tv.template is not None and str(tv.template).strip().lower() == "template 2".lower()
+    )
+
+    proporcao_noticias_efetiva = tv.proporcao_noticias if pode_mostrar_noticias else 0
+
+    if proporcao_noticias_efetiva > 0:
+        # Para TV, buscamos MAIS notícias do que a proporção para ter variedade,
+        # e usamos a proporção apenas para montar o ciclo de tipos.
+        # Ex.: proporcao_noticias=1 -> ainda assim buscamos pelo menos 10 notícias.
+        base_limit = max(10, proporcao_noticias_efetiva * 3)
+        logging.info(
+            f"TV {tv.nome}: Buscando até {base_limit} notícias (proporcao_noticias={proporcao_noticias_efetiva}, template={tv.template})"
         )
-        
-        if response.status_code == 200:
-            data = response.json()
-            items = data.get('items', [])
-            
-            for item in items[:limit]:
-                # Limpar HTML da descrição
-                description = item.get('description', '')
-                description = re.sub('<[^<]+?>', '', description)
-                description = description.strip()
-                
-                if len(description) > 200:
-                    description = description[:200] + "..."
-                
-                # Extrair imagem
-                thumbnail = item.get('thumbnail', '')
-                if not thumbnail and 'enclosure' in item:
-                    thumbnail = item.get('enclosure', {}).get('link', '')
-                
-                news_item = NewsItem(
-                    title=item.get('title', '').strip(),
-                    description=description,
-                    url=item.get('link', ''),
-                    urlToImage=thumbnail,
-                    publishedAt=item.get('pubDate', datetime.now().isoformat() + "Z"),
-                    source='🎙️ Jovem Pan'
-                )
-                
-                if news_item.title:
-                    news_items.append(news_item)
-        
-        return {
-            "news": news_items,
-            "total": len(news_items),
-            "source": "Jovem Pan",
-            "feed_url": "https://jovempan.com.br/"
-        }
-        
-    except Exception as e:
-        logging.error(f"Erro ao buscar notícias da Jovem Pan: {e}")
-        return {
-            "news": [],
-            "total": 0,
-            "source": "Jovem Pan",
-            "error": str(e)
+        noticias = get_news(limit=base_limit)
+        logging.info(f"TV {tv.nome}: {len(noticias)} notícias encontradas")
+    else:
+        logging.info(
+            f"TV {tv.nome}: Notícias desativadas para este template ou proporcao_noticias=0 (template={tv.template}, proporcao_noticias={tv.proporcao_noticias})"
+        )
+    
+    # 3. Planejar rodízio ponderado dos anúncios (peso/prioridade, início rotativo por TV)
+    slots_anuncios = estatisticas_playlist(
+        len(avisos), len(anuncios), len(noticias),
+        tv.proporcao_avisos, tv.proporcao_anuncios, proporcao_noticias_efetiva,
+    )["anuncios"]
+    anuncios, ordem_anuncios, inicio_anuncios = planejar_rotacao(anuncios, tv.id, slots_anuncios, agora)
+    
+    # 4. Intercalar conteúdo em sequência cíclica respeitando proporções
+    content, stats = build_playlist(
+        avisos,
+        anuncios,
+        noticias,
+        tv.proporcao_avisos,
+        tv.proporcao_anuncios,
+        proporcao_noticias_efetiva,
+        ordem_anuncios=ordem_anuncios,
+        inicio_anuncios=inicio_anuncios,
+    )
+    
+    return {
+        "success": True,
+        "tv": {
+            "id": tv.id,
+            "nome": tv.nome,
+            "codigo_conexao": tv.codigo_conexao,
+            "template": tv.template
+        },
+        "config": {
+            "proporcao_avisos": tv.proporcao_avisos,
+            "proporcao_anuncios": tv.proporcao_anuncios,
+            "proporcao_noticias": proporcao_noticias_efetiva,
+            "descricao": f"{tv.proporcao_avisos} aviso(s) : {tv.proporcao_anuncios} anúncio(s) : {proporcao_noticias_efetiva} notícia(s)"
+        },
+        "content": content,
+        "prefetch": montar_manifesto_prefetch(content),
+        "stats": stats,
+        "rotacao": {
+            "inicio_anuncios": inicio_anuncios,
+            "periodo_anuncios": len(ordem_anuncios) if ordem_anuncios else 0
         }
+    }
 
 @router.get("/app/tv/{codigo_conexao}/content",
     summary="📺 Conteúdo Intercalado por TV",
     description="Retorna conteúdo (avisos, anúncios, notícias) intercalado de acordo com a proporção configurada da TV"
 )
-def get_tv_intercalated_content(
+async def get_tv_intercalated_content(
     codigo_conexao: str,
-    session: Session = Depends(get_session)
+    session: AsyncSession = Depends(get_async_read_session)
 ):
     """
     Retorna conteúdo intercalado baseado nas configurações da TV
@@ -366,8 +394,9 @@ def get_tv_intercalated_content(
     1. Busca a TV pelo código de conexão
     2. Obtém as configurações de proporção (avisos:anúncios:notícias)
     3. Busca avisos e anúncios do condomínio da TV
-    4. Intercala o conteúdo na proporção configurada
-    5. Adiciona notícias no final (se configurado)
+    4. Aplica a programação (data_inicio, expiração e janelas_exibicao semanais)
+    5. Intercala o conteúdo na proporção configurada (anúncios em rodízio ponderado)
+    6. Adiciona notícias no final (se configurado)
     
     **Layout 1**: Notícias são exibidas em rodapé/banner
     **Layout 2**: Notícias são exibidas em tela cheia
@@ -384,6 +413,9 @@ def get_tv_intercalated_content(
     ```json
     {
         "content": [...],  // Lista intercalada de avisos, anúncios e notícias
+        "prefetch": [      // Mídias únicas da playlist para download antecipado
+            {"url": "...", "size": 123456, "hash": "<sha256>", "content_type": "video/mp4"}
+        ],
         "config": {
             "proporcao_avisos": 1,
             "proporcao_anuncios": 5,
@@ -403,211 +435,132 @@ def get_tv_intercalated_content(
     - **data**: Objeto com os dados do conteúdo
     """
     
-    # 1. Buscar TV
-    tv = session.exec(select(TV).where(TV.codigo_conexao == codigo_conexao)).first()
+    tv = (await session.exec(select(TV).where(TV.codigo_conexao == codigo_conexao))).first()
     if not tv:
         raise HTTPException(status_code=404, detail="TV não encontrada com este código")
     
-    # 2. Buscar avisos do condomínio
-    avisos_query = session.exec(
-        select(Aviso).where(
-            Aviso.status.ilike("Ativo"),
-            Aviso.condominios_ids.like(f"%{tv.condominio_id}%")
-        )
-    ).all()
-    
-    # Filtrar avisos que realmente contêm o condomínio
-    avisos = []
-    for aviso in avisos_query:
-        cond_ids = [int(id.strip()) for id in aviso.condominios_ids.split(",") if id.strip()]
-        if tv.condominio_id in cond_ids:
-            avisos.append(aviso)
-    
-    # 3. Buscar anúncios do condomínio
-    anuncios_query = session.exec(
-        select(Anuncio).where(
-            Anuncio.status == "Ativo",
-            Anuncio.condominios_ids.like(f"%{tv.condominio_id}%")
-        )
-    ).all()
-    
-    # Filtrar anúncios que realmente contêm o condomínio
-    anuncios = []
-    for anuncio in anuncios_query:
-        cond_ids = [int(id.strip()) for id in anuncio.condominios_ids.split(",") if id.strip()]
-        if tv.condominio_id in cond_ids:
-            anuncios.append(anuncio)
-    
-    # 4. Buscar notícias (se proporção configurada **e** template suportar notícias)
-    # Layout 1: NÃO exibe notícias no conteúdo principal (somente avisos/anúncios)
-    # Layout 2: Exibe notícias (rodapé/tela cheia, conforme o frontend)
-    # Usando APENAS notícias da Jovem Pan
-    noticias = []
-    pode_mostrar_noticias = (
-        tv.template is not None and str(tv.template).strip().lower() == "template 2".lower()
-    )
-
-    proporcao_noticias_efetiva = tv.proporcao_noticias if pode_mostrar_noticias else 0
+    return await montar_conteudo_tv_async(tv, session)
 
-    if proporcao_noticias_efetiva > 0:
-        # Para TV, buscamos MAIS notícias do que a proporção para ter variedade,
-        # e usamos a proporção apenas para montar o ciclo de tipos.
-        # Ex.: proporcao_noticias=1 -> ainda assim buscamos pelo menos 10 notícias.
-        base_limit = max(10, proporcao_noticias_efetiva * 3)
-        logging.info(
-            f"TV {tv.nome}: Buscando até {base_limit} notícias da Jovem Pan (proporcao_noticias={proporcao_noticias_efetiva}, template={tv.template})"
-        )
-        noticias = get_jovempan_news(limit=base_limit)
-        logging.info(f"TV {tv.nome}: {len(noticias)} notícias encontradas da Jovem Pan")
-    else:
-        logging.info(
-            f"TV {tv.nome}: Notícias desativadas para este template ou proporcao_noticias=0 (template={tv.template}, proporcao_noticias={tv.proporcao_noticias})"
-        )
+def montar_manifesto_prefetch(content: list) -> List[dict]:
+    """
+    Lista as mídias únicas referenciadas pela playlist, na ordem de aparição,
+    com tamanho, hash e tipo registrados no upload
     
-    # 5. Intercalar conteúdo em sequência cíclica respeitando proporções,
-    #    usando índices circulares para poder repetir itens quando necessário.
-    content = []
-
-    avisos_list = list(avisos)
-    anuncios_list = list(anuncios)
-    noticias_list = list(noticias)
-
-    # Se não há nenhum conteúdo, retorna vazio
-    if not avisos_list and not anuncios_list and not noticias_list:
-        return {
-            "success": True,
-            "tv": {
-                "id": tv.id,
-                "nome": tv.nome,
-                "codigo_conexao": tv.codigo_conexao,
-                "template": tv.template
-            },
-            "config": {
-                "proporcao_avisos": tv.proporcao_avisos,
-                "proporcao_anuncios": tv.proporcao_anuncios,
-                "proporcao_noticias": tv.proporcao_noticias,
-                "descricao": f"{tv.proporcao_avisos} aviso(s) : {tv.proporcao_anuncios} anúncio(s) : {tv.proporcao_noticias} notícia(s)"
-            },
-            "content": [],
-            "stats": {
-                "total_items": 0,
-                "avisos": 0,
-                "anuncios": 0,
-                "noticias": 0
+    A TV usa esta lista para baixar em segundo plano, deduplicar por hash e
+    despejar do cache local por tamanho. Mídias antigas (sem metadados) e
+    imagens de notícias vêm com size/hash nulos.
+    """
+    midias = {}
+    for item in content:
+        data = item["data"]
+        if item["type"] == "noticia":
+            url = data.urlToImage
+            info = {"url": url, "size": None, "hash": None, "content_type": None}
+        else:
+            url = data.archive_url
+            info = {
+                "url": url,
+                "size": data.archive_size,
+                "hash": data.archive_hash,
+                "content_type": data.archive_content_type
             }
-        }
-
-    # Sequência de tipos de um ciclo com base na configuração da TV
-    # Ex.: 1:3:1 -> ['aviso', 'anuncio', 'anuncio', 'anuncio', 'noticia']
-    tipo_ciclo = (
-        ["aviso"] * max(tv.proporcao_avisos, 0) +
-        ["anuncio"] * max(tv.proporcao_anuncios, 0) +
-        ["noticia"] * max(proporcao_noticias_efetiva, 0)
-    )
-
-    # Se proporções forem todas zero, apenas concatena as listas
-    if not tipo_ciclo:
-        for aviso in avisos_list:
-            content.append({"type": "aviso", "data": aviso})
-        for anuncio in anuncios_list:
-            content.append({"type": "anuncio", "data": anuncio})
-        for noticia in noticias_list:
-            content.append({"type": "noticia", "data": noticia})
-    else:
-        # Tamanho alvo da playlist: pelo menos 30 itens ou o total natural, o que for maior
-        total_natural = len(avisos_list) + len(anuncios_list) + len(noticias_list)
-        target_size = max(total_natural, 30)
-
-        # Índices circulares em cada lista
-        idx_aviso = 0
-        idx_anuncio = 0
-        idx_noticia = 0
-
-        # Loop até atingir o tamanho alvo
-        while len(content) < target_size:
-            adicionou_no_ciclo = False
-
-            for tipo in tipo_ciclo:
-                if tipo == "aviso" and avisos_list:
-                    # Se só existe 1 aviso e já usamos ele neste ciclo, pula para não repetir o MESMO
-                    if len(avisos_list) == 1 and adicionou_no_ciclo:
-                        continue
-                    content.append({
-                        "type": "aviso",
-                        "data": avisos_list[idx_aviso]
-                    })
-                    idx_aviso = (idx_aviso + 1) % len(avisos_list)
-                    adicionou_no_ciclo = True
-                elif tipo == "anuncio" and anuncios_list:
-                    if len(anuncios_list) == 1 and adicionou_no_ciclo:
-                        continue
-                    content.append({
-                        "type": "anuncio",
-                        "data": anuncios_list[idx_anuncio]
-                    })
-                    idx_anuncio = (idx_anuncio + 1) % len(anuncios_list)
-                    adicionou_no_ciclo = True
-                elif tipo == "noticia" and noticias_list:
-                    # Para notícias, permitimos repetir mesmo se houver apenas 1 item,
-                    # pois é melhor ter notícia aparecendo na TV do que sumir da playlist.
-                    content.append({
-                        "type": "noticia",
-                        "data": noticias_list[idx_noticia]
-                    })
-                    idx_noticia = (idx_noticia + 1) % len(noticias_list)
-                    adicionou_no_ciclo = True
-
-                if len(content) >= target_size:
-                    break
-
-            # Se neste ciclo não conseguimos adicionar nada (por exemplo só tem 1 item de um tipo),
-            # então permitimos repetir o mesmo item para não travar a geração.
-            if not adicionou_no_ciclo:
-                for tipo in tipo_ciclo:
-                    if tipo == "aviso" and avisos_list:
-                        content.append({
-                            "type": "aviso",
-                            "data": avisos_list[idx_aviso]
-                        })
-                        idx_aviso = (idx_aviso + 1) % len(avisos_list)
-                    elif tipo == "anuncio" and anuncios_list:
-                        content.append({
-                            "type": "anuncio",
-                            "data": anuncios_list[idx_anuncio]
-                        })
-                        idx_anuncio = (idx_anuncio + 1) % len(anuncios_list)
-                    elif tipo == "noticia" and noticias_list:
-                        content.append({
-                            "type": "noticia",
-                            "data": noticias_list[idx_noticia]
-                        })
-                        idx_noticia = (idx_noticia + 1) % len(noticias_list)
+        if url and url not in midias:
+            midias[url] = info
+    return list(midias.values())
 
-                    if len(content) >= target_size:
-                        break
+def versao_bundle(conteudo: dict, media_urls: List[str]) -> str:
+    """
+    Versão do bundle a partir de uma forma canônica, independente do rodízio:
+    itens distintos (tipo + dados, ordenados), configuração e conjunto de mídias
+    """
+    itens = {}
+    for item in conteudo["content"]:
+        itens.setdefault(id(item["data"]), (item["type"], item["data"]))
+    canonico = {
+        "itens": sorted(
+            json.dumps([tipo, jsonable_encoder(data)], sort_keys=True, ensure_ascii=False)
+            for tipo, data in itens.values()
+        ),
+        "config": conteudo["config"],
+        "media": sorted(media_urls)
+    }
+    return hashlib.sha256(json.dumps(canonico, sort_keys=True).encode("utf-8")).hexdigest()[:16]
 
-                if len(content) >= target_size:
-                    break
+@router.get("/app/tv/{codigo_conexao}/bundle",
+    summary="📦 Bundle Offline da TV",
+    description="Manifesto versionado com a playlist e todas as mídias referenciadas (tamanho e hash) para reprodução offline"
+)
+def get_tv_bundle(
+    codigo_conexao: str,
+    request: Request,
+    session: Session = Depends(get_read_session)
+):
+    """
+    Retorna o manifesto offline da TV
     
-    return {
-        "success": True,
-        "tv": {
-            "id": tv.id,
-            "nome": tv.nome,
-            "codigo_conexao": tv.codigo_conexao,
-            "template": tv.template
-        },
-        "config": {
-            "proporcao_avisos": tv.proporcao_avisos,
-            "proporcao_anuncios": tv.proporcao_anuncios,
-            "proporcao_noticias": proporcao_noticias_efetiva,
-            "descricao": f"{tv.proporcao_avisos} aviso(s) : {tv.proporcao_anuncios} anúncio(s) : {proporcao_noticias_efetiva} notícia(s)"
-        },
-        "content": content,
-        "stats": {
-            "total_items": len(content),
-            "avisos": sum(1 for item in content if item["type"] == "aviso"),
-            "anuncios": sum(1 for item in content if item["type"] == "anuncio"),
-            "noticias": sum(1 for item in content if item["type"] == "noticia")
+    A TV deve baixar todas as mídias listadas em `media`, guardar o manifesto
+    e continuar tocando a playlist localmente até a próxima sincronização.
+    
+    - **version**: muda quando os itens, a configuração ou as mídias mudam
+      (também enviado como `ETag`); não muda com o rodízio de anúncios
+    - **media_version**: muda apenas quando o conjunto de mídias muda
+    - **rotacao**: a playlist vem na rotação canônica da TV; `deslocamento_anuncios`
+      diz quantas posições de anúncio avançar para a janela atual
+      (recalcular a cada `janela_segundos`)
+    - Enviar `If-None-Match: "<version>"` retorna **304** se nada mudou
+    
+    A resposta é gerada em streaming; as mídias nunca passam pelo servidor,
+    apenas seus metadados (tamanho, hash e tipo).
+    """
+    tv = session.exec(select(TV).where(TV.codigo_conexao == codigo_conexao)).first()
+    if not tv:
+        raise HTTPException(status_code=404, detail="TV não encontrada com este código")
+    
+    # Rotação canônica: o conteúdo só muda quando os itens mudam
+    conteudo = montar_conteudo_tv(tv, session, agora=0)
+    midias = conteudo["prefetch"]
+    media_urls = [midia["url"] for midia in midias]
+    
+    versao = versao_bundle(conteudo, media_urls)
+    media_versao = hashlib.sha256("\n".join(sorted(media_urls)).encode("utf-8")).hexdigest()[:16]
+    etag = f'"{versao}"'
+    
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    
+    cabecalho = jsonable_encoder({
+        "version": versao,
+        "media_version": media_versao,
+        "generated_at": datetime.utcnow(),
+        "tv": conteudo["tv"],
+        "config": conteudo["config"],
+        "stats": conteudo["stats"],
+        "rotacao": {
+            "janela_segundos": JANELA_ROTACAO_SEGUNDOS,
+            "deslocamento_anuncios": deslocamento_rotacao(
+                conteudo["stats"]["anuncios"], conteudo["rotacao"]["periodo_anuncios"]
+            )
         }
-    }
+    })
+    
+    def gerar_manifesto():
+        yield json.dumps(cabecalho, ensure_ascii=False)[:-1]
+        yield ', "content": '
+        yield json.dumps(jsonable_encoder(conteudo["content"]), ensure_ascii=False)
+        yield ', "media": ['
+        
+        total_bytes = 0
+        for i, midia in enumerate(midias):
+            # Metadados registrados no upload; HEAD só para mídias antigas/externas
+            if midia["hash"] is None or midia["size"] is None:
+                midia = get_media_info(midia["url"]) or midia
+            total_bytes += midia["size"] or 0
+            yield ("," if i else "") + json.dumps(midia, ensure_ascii=False)
+        
+        yield f'], "total_media": {len(midias)}, "total_bytes": {total_bytes}}}'
+    
+    return StreamingResponse(
+        gerar_manifesto(),
+        media_type="application/json",
+        headers={"ETag": etag, "Cache-Control": "no-cache"}
+    )
@@ -1,13 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Header
+from fastapi import APIRouter, Depends, HTTPException, Request, status, Header
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm, HTTPBearer, HTTPAuthorizationCredentials
 from sqlmodel import Session, select
 from datetime import timedelta, datetime
 from typing import Optional, List
 from app.db import engine
 from app.models import User, Condominio
-from app.auth import verify_password, get_password_hash, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES, verify_token
-from app.email_service import send_password_reset_email, send_password_changed_notification
+from app.auth import (
+    verify_password, verify_password_async, get_password_hash, create_access_token, ACCESS_TOKEN_EXPIRE_MINUTES,
+    get_token_claims, get_cached_user, cache_user, token_revogado, revogar_tokens
+)
+from app.rate_limit import (
+    verificar_limites, LOGIN_POR_IP, LOGIN_POR_EMAIL, RECUPERACAO_POR_IP, RECUPERACAO_POR_EMAIL
+)
+from app.email_service import send_templated
 from pydantic import BaseModel, EmailStr
+import os
 import secrets
 
 router = APIRouter()
@@ -52,6 +60,49 @@ def authenticate_user(session: Session, email: str, password: str) -> Optional[U
         return None
     return user
 
+async def authenticate_user_async(session: Session, email: str, password: str) -> Optional[User]:
+    """
+    authenticate_user para endpoints async
+    
+    A consulta roda no threadpool e o bcrypt no pool dedicado, então nenhum
+    dos dois bloqueia o event loop (e o polling das TVs) durante logins.
+    """
+    user = await run_in_threadpool(
+        lambda: session.exec(select(User).where(User.email == email)).first()
+    )
+    if not user:
+        return None
+    if not await verify_password_async(password, user.senha):
+        return None
+    return user
+
+def get_user_from_token(session: Session, token: str) -> Optional[User]:
+    """
+    Usuário dono de um token JWT válido
+    
+    Usa os caches de claims (token) e de usuário (id): em requests repetidos
+    com o mesmo token não há decode de JWT nem consulta ao banco.
+    Tokens com 'ver' diferente de user.token_version foram revogados.
+    """
+    claims = get_token_claims(token)
+    if claims is None:
+        return None
+    
+    user_id = claims.get("user_id")
+    if user_id is not None:
+        user = get_cached_user(session, user_id)
+        if user is not None and user.email == claims["sub"]:
+            return None if token_revogado(claims, user) else user
+    
+    user = session.exec(select(User).where(User.email == claims["sub"])).first()
+    if user is None:
+        return None
+    
+    # Tokens antigos (/token) não têm user_id: guardar junto das claims
+    claims["user_id"] = user.id
+    cache_user(user)
+    return None if token_revogado(claims, user) else user
+
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     session: Session = Depends(get_session)
@@ -71,13 +122,7 @@ def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    token = credentials.credentials
-    email = verify_token(token)
-    
-    if email is None:
-        raise credentials_exception
-    
-    user = session.exec(select(User).where(User.email == email)).first()
+    user = get_user_from_token(session, credentials.credentials)
     if user is None:
         raise credentials_exception
     
@@ -101,18 +146,14 @@ def get_current_user_optional(
         if scheme.lower() != "bearer":
             return None
             
-        email = verify_token(token)
-        if email is None:
-            return None
-        
-        user = session.exec(select(User).where(User.email == email)).first()
-        return user
+        return get_user_from_token(session, token)
     except:
         return None
 
 @router.post("/token", summary="Login do usuário", description="Efetua login e retorna token JWT")
-async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
-    user = authenticate_user(session, form_data.username, form_data.password)
+async def login_for_access_token(http_request: Request, form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
+    verificar_limites(http_request, LOGIN_POR_IP, LOGIN_POR_EMAIL, form_data.username)
+    user = await authenticate_user_async(session, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -121,12 +162,9 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
         )
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
-        data={"sub": user.email}, expires_delta=access_token_expires
+        data={"sub": user.email, "user_id": user.id, "ver": user.token_version or 0},
+        expires_delta=access_token_expires
     )
-    # Atualizar token no banco
-    user.token = access_token
-    session.add(user)
-    session.commit()
     return {"access_token": access_token, "token_type": "bearer", "user": user}
 
 @router.post("/login", 
@@ -134,7 +172,7 @@ async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(
     description="Login com email e senha - retorna token JWT válido por 30 dias", 
     response_model=LoginResponse
 )
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
+async def login(http_request: Request, form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
     """
     Faz login com email e senha
     
@@ -154,8 +192,10 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Sessi
     - Token expira em 30 dias
     - Use formato: application/x-www-form-urlencoded
     - Campo 'username' deve conter o email
+    - Tentativas demais por IP/email retornam 429 (ver header Retry-After)
     """
-    user = authenticate_user(session, form_data.username, form_data.password)
+    verificar_limites(http_request, LOGIN_POR_IP, LOGIN_POR_EMAIL, form_data.username)
+    user = await authenticate_user_async(session, form_data.username, form_data.password)
     
     if not user:
         raise HTTPException(
@@ -170,23 +210,19 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Sessi
         data={
             "sub": user.email,
             "user_id": user.id,
-            "user_type": user.tipo
+            "user_type": user.tipo,
+            "ver": user.token_version or 0
         },
         expires_delta=access_token_expires
     )
     
-    # Atualizar token no banco
-    user.token = access_token
-    session.add(user)
-    session.commit()
-    
-    # Buscar condomínios ligados ao usuário
+    # Buscar condomínios ligados ao usuário (fora do event loop; login não grava no banco)
     condominios_ids = []
     condominios_data = []
     
-    condominios = session.exec(
-        select(Condominio).where(Condominio.sindico_id == user.id)
-    ).all()
+    condominios = await run_in_threadpool(
+        lambda: session.exec(select(Condominio).where(Condominio.sindico_id == user.id)).all()
+    )
     
     if condominios:
         condominios_ids = [condominio.id for condominio in condominios]
@@ -282,16 +318,13 @@ async def verify_token_endpoint(
     
     Retorna 200 se válido, 401 se inválido/expirado
     """
-    token = credentials.credentials
-    email = verify_token(token)
-    
-    if email is None:
+    if get_token_claims(credentials.credentials) is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Token inválido ou expirado"
         )
     
-    user = session.exec(select(User).where(User.email == email)).first()
+    user = get_user_from_token(session, credentials.credentials)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -306,6 +339,27 @@ async def verify_token_endpoint(
         "type": user.tipo
     }
 
+@router.post("/logout-all",
+    summary="🚪 Sair de Todos os Dispositivos",
+    description="Revoga todos os tokens JWT já emitidos para o usuário autenticado"
+)
+def logout_all(
+    current_user: User = Depends(get_current_user),
+    session: Session = Depends(get_session)
+):
+    """
+    Incrementa o token_version do usuário: todos os tokens emitidos até agora
+    (inclusive o usado nesta chamada) deixam de ser aceitos
+    """
+    revogar_tokens(current_user)
+    session.add(current_user)
+    session.commit()
+    
+    return {
+        "success": True,
+        "message": "Todos os tokens foram revogados. Faça login novamente."
+    }
+
 
 # ===== Schemas para Recuperação de Senha =====
 
@@ -326,6 +380,7 @@ class ResetPasswordRequest(BaseModel):
 )
 def forgot_password(
     request: ForgotPasswordRequest,
+    http_request: Request,
     session: Session = Depends(get_session)
 ):
     """
@@ -338,10 +393,13 @@ def forgot_password(
     Se o email existir:
     - Gera token único de recuperação
     - Define validade de 1 hora
-    - Envia email com link de redefinição
+    - Enfileira email com link de redefinição (enviado em background; a resposta não espera o SMTP)
     
     O link enviado será: {FRONTEND_URL}/reset-password?token={TOKEN}
+    
+    Solicitações demais por IP/email retornam 429 (ver header Retry-After)
     """
+    verificar_limites(http_request, RECUPERACAO_POR_IP, RECUPERACAO_POR_EMAIL, request.email)
     
     # Buscar usuário pelo email
     user = session.exec(select(User).where(User.email == request.email)).first()
@@ -359,28 +417,18 @@ def forgot_password(
         # Definir expiração (1 hora a partir de agora)
         expires_at = datetime.utcnow() + timedelta(hours=1)
         
-        # Salvar token e expiração no usuário
+        # Salvar token e expiração no usuário e enfileirar o email (mesma transação)
         user.reset_token = reset_token
         user.reset_token_expires = expires_at
         
         session.add(user)
+        send_templated("password_reset", {"user_name": user.nome, "reset_token": reset_token}, to_email=user.email, session=session)
         session.commit()
+        print(f"📧 Email de recuperação enfileirado para {user.email}")
         
-        # Enviar email
-        email_sent = send_password_reset_email(
-            to_email=user.email,
-            reset_token=reset_token,
-            user_name=user.nome
-        )
-        
-        if email_sent:
-            print(f"✅ Email de recuperação enviado para {user.email}")
-        else:
-            print(f"⚠️ Falha ao enviar email, mas token foi gerado: {reset_token}")
-            # Em desenvolvimento, incluir token na resposta
-            import os
-            if os.getenv("ENV") == "development":
-                response_message["dev_token"] = reset_token
+        # Em desenvolvimento, incluir token na resposta
+        if os.getenv("ENV") == "development":
+            response_message["dev_token"] = reset_token
     
     return response_message
 
@@ -407,7 +455,7 @@ def reset_password(
     Após sucesso:
     - Senha é alterada
     - Token é invalidado
-    - Email de confirmação é enviado
+    - Email de confirmação é enfileirado
     """
     
     # Validar senha
@@ -441,8 +489,9 @@ def reset_password(
             detail="Token expirado. Solicite uma nova recuperação de senha."
         )
     
-    # Alterar senha
+    # Alterar senha e revogar os tokens emitidos com a senha antiga
     user.senha = get_password_hash(request.new_password)
+    revogar_tokens(user)
     
     # Invalidar token de reset
     user.reset_token = None
@@ -452,10 +501,10 @@ def reset_password(
     user.data_update = datetime.utcnow()
     
     session.add(user)
-    session.commit()
     
-    # Enviar email de confirmação
-    send_password_changed_notification(user.email, user.nome)
+    # Email de confirmação (enviado em background)
+    send_templated("password_changed", {"user_name": user.nome}, to_email=user.email, session=session)
+    session.commit()
     
     return {
         "success": True,
@@ -497,15 +546,16 @@ def change_password(
             detail="A nova senha deve ter no mínimo 6 caracteres"
         )
     
-    # Alterar senha
+    # Alterar senha e revogar os tokens emitidos com a senha antiga
     current_user.senha = get_password_hash(new_password)
+    revogar_tokens(current_user)
     current_user.data_update = datetime.utcnow()
     
     session.add(current_user)
-    session.commit()
     
-    # Enviar notificação
-    send_password_changed_notification(current_user.email, current_user.nome)
+    # Notificação (enviada em background)
+    send_templated("password_changed", {"user_name": current_user.nome}, to_email=current_user.email, session=session)
+    session.commit()
     
     return {
         "success": True,
@@ -1,10 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Response
+from sqlmodel import Session, func
 from app.db import engine
-from app.models import Aviso, Condominio, User
-from app.schemas import AvisoCreate
-from app.storage import upload_image_to_r2, delete_image_from_r2
-from typing import Optional, List
+from app.queries import LIMITE_MAXIMO, paginar, parse_fields
+from app.models import Aviso
+from app.storage import upload_media_with_info, delete_image_from_r2
+from app.services.dayparting import horario_local, parse_janelas, status_inicial
+from app.services.content_links import (
+    avisos_do_sindico, do_condominio, ids_csv, remover_vinculos, sincronizar_condominios, sincronizar_sindicos
+)
+from app.services.aviso_quota import (
+    LimiteAvisosExcedido, ajustar_contadores, sindicos_contados, sindicos_dos_condominios, verificar_limite
+)
+from typing import Optional
 from datetime import datetime
 from pydantic import BaseModel
 
@@ -29,30 +36,30 @@ class AvisoWithSindico(BaseModel):
 
 @router.get("/avisos", 
     summary="📋 Listar Avisos", 
-    description="Lista todos os avisos cadastrados no sistema com ID do síndico responsável",
-    response_description="Lista de avisos com síndicos",
-    response_model=List[AvisoWithSindico]
+    description="Lista os avisos cadastrados no sistema com ID do síndico responsável (paginação por cursor, filtros e seleção de campos)",
+    response_description="Lista de avisos com síndicos (próximo cursor no header X-Next-After-Id)"
 )
-def get_all_avisos(session: Session = Depends(get_session)):
-    avisos = session.exec(select(Aviso)).all()
-    
-    # Para cada aviso, retornar com sindico_ids do banco
-    avisos_with_sindico = []
-    for aviso in avisos:
-        avisos_with_sindico.append(AvisoWithSindico(
-            id=aviso.id,
-            nome=aviso.nome,
-            condominios_ids=aviso.condominios_ids,
-            sindico_ids=aviso.sindico_ids,  # Pegar direto do banco
-            numero_anunciante=aviso.numero_anunciante,
-            nome_anunciante=aviso.nome_anunciante,
-            status=aviso.status,
-            data_expiracao=aviso.data_expiracao,
-            archive_url=aviso.archive_url,
-            mensagem=aviso.mensagem
-        ))
+def get_all_avisos(
+    response: Response,
+    status: Optional[str] = Query(None, description="Filtrar por status (ex.: Ativo)"),
+    condominio_id: Optional[int] = Query(None, description="Filtrar avisos exibidos neste condomínio"),
+    sindico_id: Optional[int] = Query(None, description="Filtrar avisos deste síndico"),
+    after_id: Optional[int] = Query(None, description="Cursor: retorna apenas registros com id maior que este"),
+    limit: Optional[int] = Query(None, description="Tamanho da página (sem limite se omitido)", ge=1, le=LIMITE_MAXIMO),
+    fields: Optional[str] = Query(None, description="Campos a retornar, separados por vírgula (ex.: id,nome,status)"),
+    session: Session = Depends(get_session)
+):
+    filtros = []
+    if status:
+        filtros.append(func.lower(Aviso.status) == status.lower())
+    if condominio_id is not None:
+        filtros.append(do_condominio(Aviso, condominio_id))
+    if sindico_id is not None:
+        filtros.append(avisos_do_sindico(sindico_id))
     
-    return avisos_with_sindico
+    # Sem ?fields= seleciona só as colunas de AvisoWithSindico (mesmo formato de antes)
+    campos = parse_fields(Aviso, fields) or list(AvisoWithSindico.model_fields)
+    return paginar(session, Aviso, response, filtros, after_id, limit, campos)
 
 @router.get("/avisos/{aviso_id}", 
     summary="🔍 Buscar Aviso", 
@@ -80,40 +87,26 @@ def get_aviso(aviso_id: int, session: Session = Depends(get_session)):
 
 @router.get("/avisos/sindico/{sindico_id}", 
     summary="👤 Avisos por Síndico", 
-    description="Busca todos os avisos que um síndico específico é responsável",
-    response_description="Lista de avisos do síndico",
-    response_model=List[AvisoWithSindico]
+    description="Busca os avisos pelos quais um síndico específico é responsável (paginação por cursor)",
+    response_description="Lista de avisos do síndico (próximo cursor no header X-Next-After-Id)"
 )
-def get_avisos_by_sindico(sindico_id: int, session: Session = Depends(get_session)):
+def get_avisos_by_sindico(
+    sindico_id: int,
+    response: Response,
+    after_id: Optional[int] = Query(None, description="Cursor: retorna apenas avisos com id maior que este"),
+    limit: Optional[int] = Query(None, description="Tamanho da página (sem limite se omitido)", ge=1, le=LIMITE_MAXIMO),
+    session: Session = Depends(get_session)
+):
     """
-    Retorna todos os avisos que um síndico específico é responsável.
-    Busca pelo campo sindico_ids no banco de dados.
+    Retorna os avisos pelos quais um síndico específico é responsável.
+    Busca pela tabela indexada aviso_sindico (espelho de sindico_ids).
     """
-    
-    # Buscar todos os avisos
-    todos_avisos = session.exec(select(Aviso)).all()
-    
-    # Filtrar avisos que incluem o sindico_id
-    avisos_do_sindico = []
-    for aviso in todos_avisos:
-        # Verificar se o sindico_id está presente no campo sindico_ids
-        if aviso.sindico_ids:
-            sindico_ids_list = [int(id.strip()) for id in aviso.sindico_ids.split(",") if id.strip()]
-            if sindico_id in sindico_ids_list:
-                avisos_do_sindico.append(AvisoWithSindico(
-                    id=aviso.id,
-                    nome=aviso.nome,
-                    condominios_ids=aviso.condominios_ids,
-                    sindico_ids=aviso.sindico_ids,
-                    numero_anunciante=aviso.numero_anunciante,
-                    nome_anunciante=aviso.nome_anunciante,
-                    status=aviso.status,
-                    data_expiracao=aviso.data_expiracao,
-                    archive_url=aviso.archive_url,
-                    mensagem=aviso.mensagem
-                ))
-    
-    return avisos_do_sindico
+    return paginar(
+        session, Aviso, response,
+        [avisos_do_sindico(sindico_id)],
+        after_id, limit,
+        list(AvisoWithSindico.model_fields)
+    )
 
 @router.post("/avisos", 
     summary="➕ Criar Aviso", 
@@ -130,6 +123,8 @@ async def create_aviso(
     nome_anunciante: Optional[str] = Form(None, description="Nome completo do anunciante", example="João Silva"),
     status: str = Form(..., description="Status do aviso", example="Ativo"),
     data_expiracao: Optional[datetime] = Form(None, description="Data de expiração do aviso (formato ISO)", example="2025-12-31T23:59:59"),
+    data_inicio: Optional[datetime] = Form(None, description="Início da exibição (formato ISO) - fica 'Agendado' até lá", example="2025-12-01T00:00:00"),
+    janelas_exibicao: Optional[str] = Form(None, description="Janelas semanais de exibição (separadas por ';')", example="seg-sex 06:00-12:00"),
     mensagem: Optional[str] = Form(None, description="Mensagem do aviso (opcional)", example="Esta é uma mensagem importante para os moradores"),
     media: Optional[UploadFile] = File(
         None, 
@@ -149,6 +144,8 @@ async def create_aviso(
     - **nome_anunciante**: Nome do responsável (opcional)
     - **status**: Status do aviso (ex: "Ativo", "Inativo")
     - **data_expiracao**: Data de vencimento (opcional)
+    - **data_inicio**: Início da exibição (opcional, fica 'Agendado' até lá)
+    - **janelas_exibicao**: Janelas semanais, ex.: "seg-sex 06:00-12:00; sab,dom 08:00-20:00" (opcional)
     - **mensagem**: Conteúdo da mensagem do aviso (opcional)
     - **media**: Arquivo de imagem ou vídeo (opcional)
     
@@ -159,63 +156,30 @@ async def create_aviso(
     - Vídeos: MP4, MOV, AVI, WebM, MPEG (máx 50MB)
     """
     
-    # 1. Validar limite de avisos por síndico
-    # Extrair IDs dos condomínios
-    condominio_ids_list = [int(id.strip()) for id in condominios_ids.split(",") if id.strip()]
+    try:
+        parse_janelas(janelas_exibicao)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    # Buscar síndicos responsáveis pelos condomínios
-    sindicos_responsaveis = set()
-    for cond_id in condominio_ids_list:
-        condominio = session.get(Condominio, cond_id)
-        if not condominio:
+    # 1. Validar condomínios e pré-verificar o limite (sem bloqueio: evita upload inútil)
+    dono_condominio = sindicos_dos_condominios(session, condominios_ids)
+    for cond_id in ids_csv(condominios_ids):
+        if cond_id not in dono_condominio:
             raise HTTPException(
                 status_code=404, 
                 detail=f"Condomínio com ID {cond_id} não encontrado"
             )
-        if condominio.sindico_id:
-            sindicos_responsaveis.add(condominio.sindico_id)
     
-    # Validar limite de cada síndico
-    from app.models import User
-    for sindico_id in sindicos_responsaveis:
-        # Buscar o síndico
-        sindico = session.get(User, sindico_id)
-        if not sindico:
-            continue
-            
-        # Contar apenas avisos ATIVOS do síndico (case-insensitive)
-        avisos_do_sindico = []
-        avisos_ativos = session.exec(
-            select(Aviso).where(Aviso.status.ilike("Ativo"))  # Case-insensitive
-        ).all()
-        
-        print(f"🔍 DEBUG - Síndico ID {sindico_id} ({sindico.nome}):")
-        print(f"   Total de avisos ativos no sistema: {len(avisos_ativos)}")
-        
-        for aviso in avisos_ativos:
-            aviso_cond_ids = [int(id.strip()) for id in aviso.condominios_ids.split(",") if id.strip()]
-            print(f"   Aviso #{aviso.id}: condominios_ids = {aviso_cond_ids}, status = {aviso.status}")
-            
-            # Verificar se algum condomínio do aviso pertence ao síndico
-            for cond_id in aviso_cond_ids:
-                cond = session.get(Condominio, cond_id)
-                if cond and cond.sindico_id == sindico_id:
-                    avisos_do_sindico.append(aviso)
-                    print(f"      ✓ Condomínio {cond_id} pertence ao síndico!")
-                    break
-        
-        print(f"   Total de avisos do síndico: {len(avisos_do_sindico)}")
-        print(f"   Limite permitido: {sindico.limite_avisos}")
-        
-        # Verificar se excede o limite
-        if len(avisos_do_sindico) >= sindico.limite_avisos:
-            raise HTTPException(
-                status_code=403,
-                detail=f"Síndico '{sindico.nome}' atingiu o limite de {sindico.limite_avisos} avisos permitidos. Atualmente possui {len(avisos_do_sindico)} avisos."
-            )
+    sindicos_responsaveis = {s for s in dono_condominio.values() if s}
+    try:
+        verificar_limite(session, sindicos_responsaveis, bloquear=False)
+    except LimiteAvisosExcedido as e:
+        raise HTTPException(status_code=403, detail=str(e))
+    session.rollback()  # Devolve a conexão ao pool durante o upload
     
-    # 2. Fazer upload da mídia (imagem ou vídeo) se fornecida
+    # 2. Fazer upload da mídia (imagem ou vídeo) se fornecida, fora de qualquer transação
     archive_url = None
+    media_info = {}
     if media and media.filename:
         # Tipos de mídia permitidos
         allowed_image_types = ['image/png', 'image/jpeg', 'image/jpg', 'image/webp', 'image/gif']
@@ -248,25 +212,50 @@ async def create_aviso(
         try:
             # Ler o conteúdo do arquivo
             file_content = await media.read()
-            # Fazer upload usando a função de imagem (funciona para vídeo também)
-            archive_url = upload_image_to_r2(file_content, media.filename, media.content_type)
+            # Fazer upload (imagem ou vídeo) registrando tamanho, hash e tipo
+            media_info = upload_media_with_info(file_content, media.filename, media.content_type)
+            archive_url = media_info["url"]
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Erro ao fazer upload da mídia: {str(e)}")
     
+    # 3. Transação curta: bloquear os síndicos, conferir o limite (contador O(1)), gravar e commitar
+    try:
+        verificar_limite(session, sindicos_responsaveis)
+    except LimiteAvisosExcedido as e:
+        session.rollback()
+        if archive_url:
+            delete_image_from_r2(archive_url)
+        raise HTTPException(status_code=403, detail=str(e))
+    
     db_aviso = Aviso(
         nome=nome,
         condominios_ids=condominios_ids,
         sindico_ids=sindico_ids,  # Salvar os IDs dos síndicos enviados
         numero_anunciante=numero_anunciante,
         nome_anunciante=nome_anunciante,
-        status=status,
+        status=status_inicial(status, data_inicio),
         data_expiracao=data_expiracao,
+        data_inicio=horario_local(data_inicio),
+        janelas_exibicao=janelas_exibicao,
         archive_url=archive_url,
+        archive_size=media_info.get("size"),
+        archive_hash=media_info.get("hash"),
+        archive_content_type=media_info.get("content_type"),
         mensagem=mensagem
     )
     
-    session.add(db_aviso)
-    session.commit()
+    try:
+        session.add(db_aviso)
+        session.flush()  # Gerar o id antes de gravar os vínculos
+        sincronizar_sindicos(session, db_aviso)
+        sincronizar_condominios(session, db_aviso)
+        ajustar_contadores(session, set(), sindicos_contados(session, db_aviso.status, db_aviso.condominios_ids))
+        session.commit()
+    except Exception:
+        session.rollback()
+        if archive_url:
+            delete_image_from_r2(archive_url)  # Não deixar mídia órfã no R2
+        raise
     session.refresh(db_aviso)
     
     return db_aviso
@@ -285,6 +274,8 @@ def update_aviso(
     nome_anunciante: Optional[str] = Form(None, description="Nome completo do anunciante"),
     status: Optional[str] = Form(None, description="Status do aviso"),
     data_expiracao: Optional[datetime] = Form(None, description="Data de expiração do aviso"),
+    data_inicio: Optional[datetime] = Form(None, description="Início da exibição"),
+    janelas_exibicao: Optional[str] = Form(None, description="Janelas semanais de exibição (vazio remove)"),
     mensagem: Optional[str] = Form(None, description="Mensagem do aviso"),
     session: Session = Depends(get_session)
 ):
@@ -293,17 +284,23 @@ def update_aviso(
     Apenas os campos enviados serão atualizados.
     """
     
-    db_aviso = session.get(Aviso, aviso_id)
+    # Linha bloqueada até o commit: PUT, DELETE e o monitor de expiração
+    # concorrentes não aplicam o mesmo ±1 no contador dos síndicos
+    db_aviso = session.get(Aviso, aviso_id, with_for_update=True)
     if not db_aviso:
         raise HTTPException(status_code=404, detail="Aviso não encontrado")
     
+    contados_antes = sindicos_contados(session, db_aviso.status, db_aviso.condominios_ids)
+    
     # Atualizar apenas os campos fornecidos
     if nome is not None:
         db_aviso.nome = nome
     if condominios_ids is not None:
         db_aviso.condominios_ids = condominios_ids
+        sincronizar_condominios(session, db_aviso)
     if sindico_ids is not None:
         db_aviso.sindico_ids = sindico_ids
+        sincronizar_sindicos(session, db_aviso)
     if numero_anunciante is not None:
         db_aviso.numero_anunciante = numero_anunciante
     if nome_anunciante is not None:
@@ -312,8 +309,27 @@ def update_aviso(
         db_aviso.status = status
     if data_expiracao is not None:
         db_aviso.data_expiracao = data_expiracao
+    if data_inicio is not None:
+        db_aviso.data_inicio = horario_local(data_inicio)
+    if janelas_exibicao is not None:
+        try:
+            parse_janelas(janelas_exibicao)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        db_aviso.janelas_exibicao = janelas_exibicao or None
     if mensagem is not None:
         db_aviso.mensagem = mensagem
+    if status is not None or data_inicio is not None:
+        db_aviso.status = status_inicial(db_aviso.status, db_aviso.data_inicio)
+    
+    # Ativar o aviso ou ampliar os condomínios passa a contar para novos síndicos
+    contados_depois = sindicos_contados(session, db_aviso.status, db_aviso.condominios_ids)
+    try:
+        verificar_limite(session, contados_depois - contados_antes)
+    except LimiteAvisosExcedido as e:
+        session.rollback()
+        raise HTTPException(status_code=403, detail=str(e))
+    ajustar_contadores(session, contados_antes, contados_depois)
     
     session.add(db_aviso)
     session.commit()
@@ -353,8 +369,12 @@ async def update_aviso_image(
         # Ler o conteúdo do arquivo
         file_content = await image.read()
         # Fazer upload com os parâmetros corretos
-        new_archive_url = upload_image_to_r2(file_content, image.filename, image.content_type)
+        media_info = upload_media_with_info(file_content, image.filename, image.content_type)
+        new_archive_url = media_info["url"]
         db_aviso.archive_url = new_archive_url
+        db_aviso.archive_size = media_info["size"]
+        db_aviso.archive_hash = media_info["hash"]
+        db_aviso.archive_content_type = media_info["content_type"]
         
         session.add(db_aviso)
         session.commit()
@@ -375,19 +395,22 @@ def delete_aviso(aviso_id: int, session: Session = Depends(get_session)):
     Deleta um aviso do sistema e remove sua imagem do armazenamento.
     """
     
-    db_aviso = session.get(Aviso, aviso_id)
+    db_aviso = session.get(Aviso, aviso_id, with_for_update=True)
     if not db_aviso:
         raise HTTPException(status_code=404, detail="Aviso não encontrado")
+    archive_url = db_aviso.archive_url
     
-    # Deletar imagem do R2 se existir
-    if db_aviso.archive_url:
+    # Deletar aviso do banco de dados (com os vínculos e o contador dos síndicos)
+    ajustar_contadores(session, sindicos_contados(session, db_aviso.status, db_aviso.condominios_ids), set())
+    remover_vinculos(session, db_aviso)
+    session.delete(db_aviso)
+    session.commit()
+    
+    # Deletar imagem do R2 se existir (depois do commit: sem segurar o bloqueio)
+    if archive_url:
         try:
-            delete_image_from_r2(db_aviso.archive_url)
+            delete_image_from_r2(archive_url)
         except Exception as e:
             print(f"Erro ao deletar imagem do R2: {e}")
     
-    # Deletar aviso do banco de dados
-    session.delete(db_aviso)
-    session.commit()
-    
     return {"message": "Aviso deletado com sucesso", "id": aviso_id}
@@ -1,9 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.orm import joinedload, selectinload
 from sqlmodel import Session, select
 from app.db import engine
-from app.models import Condominio, User, TV, Anuncio
+from app.queries import LIMITE_MAXIMO, paginar, parse_fields
+from app.services.aviso_quota import recontar_avisos_ativos
+from app.models import Condominio, User
 from app.schemas import CondominioCreate
 from datetime import datetime
+from typing import Optional
 
 router = APIRouter()
 
@@ -11,10 +15,20 @@ def get_session():
     with Session(engine) as session:
         yield session
 
-@router.get("/condominios", summary="Listar condomínios", description="Lista todos os condomínios do sistema")
-def get_all_condominios(session: Session = Depends(get_session)):
-    condominios = session.exec(select(Condominio)).all()
-    return condominios
+@router.get("/condominios", summary="Listar condomínios", description="Lista os condomínios do sistema (paginação por cursor, filtros e seleção de campos)")
+def get_all_condominios(
+    response: Response,
+    sindico_id: Optional[int] = Query(None, description="Filtrar condomínios deste síndico"),
+    after_id: Optional[int] = Query(None, description="Cursor: retorna apenas registros com id maior que este"),
+    limit: Optional[int] = Query(None, description="Tamanho da página (sem limite se omitido)", ge=1, le=LIMITE_MAXIMO),
+    fields: Optional[str] = Query(None, description="Campos a retornar, separados por vírgula (ex.: id,nome,status)"),
+    session: Session = Depends(get_session)
+):
+    filtros = []
+    if sindico_id is not None:
+        filtros.append(Condominio.sindico_id == sindico_id)
+    
+    return paginar(session, Condominio, response, filtros, after_id, limit, parse_fields(Condominio, fields))
 
 @router.post("/condominios", summary="Criar condomínio", description="Cria um novo condomínio")
 def create_condominio(condominio_data: CondominioCreate, session: Session = Depends(get_session)):
@@ -36,6 +50,8 @@ def update_condominio(condominio_id: int, condominio_data: CondominioCreate, ses
     if not db_condominio:
         raise HTTPException(status_code=404, detail="Condomínio não encontrado")
     
+    sindico_alterado = db_condominio.sindico_id != condominio_data.sindico_id
+    
     db_condominio.nome = condominio_data.nome
     db_condominio.sindico_id = condominio_data.sindico_id
     db_condominio.localizacao = condominio_data.localizacao
@@ -43,6 +59,11 @@ def update_condominio(condominio_id: int, condominio_data: CondominioCreate, ses
     
     session.add(db_condominio)
     session.commit()
+    
+    # Avisos do condomínio passam a contar para o novo síndico
+    if sindico_alterado:
+        recontar_avisos_ativos(session)
+    
     session.refresh(db_condominio)
     return db_condominio
 
@@ -53,28 +74,32 @@ def delete_condominio(condominio_id: int, session: Session = Depends(get_session
         raise HTTPException(status_code=404, detail="Condomínio não encontrado")
     session.delete(db_condominio)
     session.commit()
+    recontar_avisos_ativos(session)  # Avisos do condomínio deixam de contar para o síndico
     return {"ok": True}
 
-@router.get("/condominios/{condominio_id}", summary="Detalhes do condomínio", description="Busca condomínio com suas TVs, anúncios e informações do síndico")
+@router.get("/condominios/{condominio_id}", summary="Detalhes do condomínio", description="Busca condomínio com suas TVs, anúncios, avisos e informações do síndico")
 def get_condominio_detail(condominio_id: int, session: Session = Depends(get_session)):
-    condominio = session.get(Condominio, condominio_id)
+    # Condomínio + síndico em um JOIN; TVs, anúncios e avisos em uma consulta cada (IN pelos índices)
+    condominio = session.exec(
+        select(Condominio)
+        .where(Condominio.id == condominio_id)
+        .options(
+            joinedload(Condominio.sindico),
+            selectinload(Condominio.tvs),
+            selectinload(Condominio.anuncios),
+            selectinload(Condominio.avisos)
+        )
+    ).first()
     if not condominio:
         raise HTTPException(status_code=404, detail="Condomínio não encontrado")
     
-    # Buscar informações do síndico
-    sindico = session.get(User, condominio.sindico_id)
-    
-    # Buscar TVs do condomínio
-    tvs = session.exec(select(TV).where(TV.condominio_id == condominio_id)).all()
-    
-    # Buscar anúncios que contenham este condomínio_id na string condominios_ids
-    anuncios = session.exec(select(Anuncio).where(Anuncio.condominios_ids.contains(str(condominio_id)))).all()
-    
     return {
         "condominio": condominio, 
-        "sindico": sindico,
-        "tvs": tvs, 
-        "anuncios": anuncios
+        "sindico": condominio.sindico,
+        "tvs": condominio.tvs, 
+        "tvs_online": sum(1 for tv in condominio.tvs if tv.status == "online"),
+        "anuncios": condominio.anuncios,
+        "avisos": condominio.avisos
     }
 
 @router.get("/sindico/{user_id}/condominios", summary="Condomínios do síndico", description="Lista condomínios de um síndico específico")
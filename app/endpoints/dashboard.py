@@ -0,0 +1,131 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import and_, case
+from sqlmodel import Session, select, func
+from typing import Optional
+from datetime import datetime, timedelta
+from app.db import get_read_session
+from app.cache import TTLCache
+from app.models import Anuncio, AnuncioCondominio, Aviso, AvisoCondominio, Condominio, TV, User
+
+router = APIRouter()
+
+# Cache do resumo (seguro para polling do painel)
+DASHBOARD_CACHE_TTL = 15
+_resumo_cache = TTLCache(maxsize=64, ttl=DASHBOARD_CACHE_TTL)
+
+def _do_sindico(query, coluna_condominio, sindico_id: Optional[int]):
+    """Restringe um agregado por condomínio aos condomínios do síndico (se informado)"""
+    if sindico_id is None:
+        return query
+    return query.join(Condominio, Condominio.id == coluna_condominio).where(Condominio.sindico_id == sindico_id)
+
+def _conteudo_por_condominio(session: Session, model, link_model, coluna, limite_expiracao: datetime, sindico_id: Optional[int] = None) -> dict:
+    """
+    {condominio_id: (ativos, expirando)} de anúncios/avisos, com um único GROUP BY
+    sobre a tabela de vínculo (índice de condominio_id)
+    """
+    agora = datetime.now()
+    expirando = and_(model.data_expiracao != None, model.data_expiracao > agora, model.data_expiracao <= limite_expiracao)  # noqa: E711
+    query = (
+        select(
+            link_model.condominio_id,
+            func.count(),
+            func.sum(case((expirando, 1), else_=0))
+        )
+        .join(model, model.id == coluna)
+        .where(func.lower(model.status) == "ativo")
+    )
+    linhas = session.exec(
+        _do_sindico(query, link_model.condominio_id, sindico_id).group_by(link_model.condominio_id)
+    ).all()
+    return {cond_id: (ativos, int(expirando or 0)) for cond_id, ativos, expirando in linhas}
+
+def montar_resumo(session: Session, dias_expiracao: int, sindico_id: Optional[int] = None) -> dict:
+    """Resumo da frota a partir de agregados agrupados (um punhado de consultas, independente do nº de TVs)"""
+    limite_expiracao = datetime.now() + timedelta(days=dias_expiracao)
+
+    # Condomínios com o nome do síndico (1 consulta)
+    query = select(Condominio.id, Condominio.nome, Condominio.sindico_id, User.nome).outerjoin(User, User.id == Condominio.sindico_id)
+    if sindico_id is not None:
+        query = query.where(Condominio.sindico_id == sindico_id)
+    condominios = session.exec(query.order_by(Condominio.id)).all()
+
+    # TVs por condomínio e status (1 consulta)
+    tvs = {}
+    query = _do_sindico(select(TV.condominio_id, TV.status, func.count()), TV.condominio_id, sindico_id)
+    for cond_id, status, quantidade in session.exec(query.group_by(TV.condominio_id, TV.status)).all():
+        chave = "online" if status == "online" else "offline"
+        tvs.setdefault(cond_id, {"online": 0, "offline": 0})[chave] += quantidade
+
+    # Conteúdo ativo e expirando por condomínio (1 consulta por tipo)
+    anuncios = _conteudo_por_condominio(session, Anuncio, AnuncioCondominio, AnuncioCondominio.anuncio_id, limite_expiracao, sindico_id)
+    avisos = _conteudo_por_condominio(session, Aviso, AvisoCondominio, AvisoCondominio.aviso_id, limite_expiracao, sindico_id)
+
+    itens = []
+    sindicos = {}
+    for cond_id, nome, cond_sindico_id, sindico_nome in condominios:
+        tv = tvs.get(cond_id, {"online": 0, "offline": 0})
+        anuncios_ativos, anuncios_expirando = anuncios.get(cond_id, (0, 0))
+        avisos_ativos, avisos_expirando = avisos.get(cond_id, (0, 0))
+
+        itens.append({
+            "id": cond_id,
+            "nome": nome,
+            "sindico_id": cond_sindico_id,
+            "sindico_nome": sindico_nome,
+            "tvs": {**tv, "total": tv["online"] + tv["offline"]},
+            "anuncios_ativos": anuncios_ativos,
+            "avisos_ativos": avisos_ativos,
+            "expirando": anuncios_expirando + avisos_expirando
+        })
+
+        sindico = sindicos.setdefault(cond_sindico_id, {
+            "id": cond_sindico_id,
+            "nome": sindico_nome,
+            "condominios": 0,
+            "tvs_online": 0,
+            "tvs_offline": 0,
+            "anuncios_ativos": 0,
+            "avisos_ativos": 0,
+            "expirando": 0
+        })
+        sindico["condominios"] += 1
+        sindico["tvs_online"] += tv["online"]
+        sindico["tvs_offline"] += tv["offline"]
+        # Somas por condomínio (um anúncio em 2 condomínios conta 2x, como na lista de condomínios)
+        sindico["anuncios_ativos"] += anuncios_ativos
+        sindico["avisos_ativos"] += avisos_ativos
+        sindico["expirando"] += anuncios_expirando + avisos_expirando
+
+    return {
+        "generated_at": datetime.utcnow(),
+        "dias_expiracao": dias_expiracao,
+        "totais": {
+            "condominios": len(itens),
+            "tvs_online": sum(c["tvs"]["online"] for c in itens),
+            "tvs_offline": sum(c["tvs"]["offline"] for c in itens),
+            "expirando": sum(c["expirando"] for c in itens)
+        },
+        "sindicos": list(sindicos.values()),
+        "condominios": itens
+    }
+
+@router.get("/dashboard/summary",
+    summary="📊 Resumo da Frota",
+    description="TVs online/offline, conteúdo ativo e itens expirando por condomínio e por síndico",
+    response_description="Resumo agregado do painel"
+)
+def get_dashboard_summary(
+    dias_expiracao: int = Query(7, description="Janela (em dias) para considerar um item 'expirando'", ge=1, le=90),
+    sindico_id: Optional[int] = Query(None, description="Restringe aos condomínios deste síndico"),
+    session: Session = Depends(get_read_session)
+):
+    """
+    Resumo da frota calculado com consultas agrupadas (COUNT ... GROUP BY)
+
+    Resposta em cache por DASHBOARD_CACHE_TTL segundos. Lida da réplica, se configurada.
+    """
+    return _resumo_cache.get_or_set(
+        (dias_expiracao, sindico_id),
+        lambda: montar_resumo(session, dias_expiracao, sindico_id)
+    )
@@ -1,6 +1,11 @@
 from fastapi import APIRouter
+from sqlmodel import Session
+from app.db import engine
 from app.services.expiration_monitor import check_expired_content
+from app.services.aviso_quota import recontar_avisos_ativos
 from app.services.tv_monitor import check_offline_tvs
+from app.services.email_outbox import estatisticas_fila, processar_fila
+from app.services.notificacoes import JANELA_MINUTOS, enviar_digests
 
 router = APIRouter()
 
@@ -28,6 +33,45 @@ def force_check_tvs():
     check_offline_tvs()
     return {"message": "Verificação de TVs executada com sucesso"}
 
+@router.post("/monitor/recount-avisos", 
+    summary="🔢 Recalcular Contadores de Avisos", 
+    description="Recalcula o contador de avisos ativos de cada síndico (usado na cota limite_avisos)",
+    response_description="Contadores recalculados"
+)
+def force_recount_avisos():
+    """
+    Recalcula os contadores de avisos ativos a partir dos avisos no banco
+    """
+    with Session(engine) as session:
+        contagem = recontar_avisos_ativos(session)
+    return {"message": "Contadores recalculados com sucesso", "sindicos": contagem}
+
+@router.post("/monitor/send-emails", 
+    summary="📧 Enviar Emails da Fila", 
+    description="Força o envio dos emails pendentes na fila (outbox)",
+    response_description="Emails processados"
+)
+def force_send_emails():
+    """
+    Processa manualmente a fila de emails
+    """
+    processados = processar_fila()
+    with Session(engine) as session:
+        fila = estatisticas_fila(session)
+    return {"message": "Fila de emails processada", "processados": processados, "fila": fila}
+
+@router.post("/monitor/send-digests", 
+    summary="🔔 Enviar Resumos de Alertas", 
+    description="Força o envio dos resumos de alertas pendentes (um email por síndico)",
+    response_description="Resumos enfileirados"
+)
+def force_send_digests():
+    """
+    Enfileira agora os resumos de alertas pendentes, sem esperar a janela
+    """
+    enfileirados = enviar_digests()
+    return {"message": "Resumos de alertas enfileirados", "emails": enfileirados}
+
 @router.get("/monitor/status", 
     summary="📊 Status dos Monitores", 
     description="Retorna informações sobre os monitores em execução",
@@ -47,5 +91,15 @@ def get_monitor_status():
             "active": True,
             "interval": "1 hora",
             "description": "Verifica e inativa avisos/anúncios expirados"
+        },
+        "email_outbox": {
+            "active": True,
+            "interval": "1 minuto (e a cada email enfileirado)",
+            "description": "Envia os emails pendentes da fila, com novas tentativas em backoff"
+        },
+        "digest_sender": {
+            "active": True,
+            "interval": f"{JANELA_MINUTOS} minutos",
+            "description": "Envia a cada síndico um resumo das TVs offline e avisos expirando/expirados"
         }
     }
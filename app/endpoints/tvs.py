@@ -1,6 +1,9 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlmodel import Session, select
-from app.db import engine
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlmodel import Session, select, func
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import update
+from app.db import engine, get_async_session
+from app.queries import LIMITE_MAXIMO, paginar, parse_fields
 from app.models import TV
 from app.schemas import TVCreate
 from datetime import datetime
@@ -20,10 +23,23 @@ class TVConfigProporcao(BaseModel):
     proporcao_anuncios: Optional[int] = None
     proporcao_noticias: Optional[int] = None
 
-@router.get("/tvs", summary="Listar TVs", description="Lista todas as TVs do sistema")
-def get_all_tvs(session: Session = Depends(get_session)):
-    tvs = session.exec(select(TV)).all()
-    return tvs
+@router.get("/tvs", summary="Listar TVs", description="Lista as TVs do sistema (paginação por cursor, filtros e seleção de campos)")
+def get_all_tvs(
+    response: Response,
+    status: Optional[str] = Query(None, description="Filtrar por status (online/offline)"),
+    condominio_id: Optional[int] = Query(None, description="Filtrar TVs deste condomínio"),
+    after_id: Optional[int] = Query(None, description="Cursor: retorna apenas registros com id maior que este"),
+    limit: Optional[int] = Query(None, description="Tamanho da página (sem limite se omitido)", ge=1, le=LIMITE_MAXIMO),
+    fields: Optional[str] = Query(None, description="Campos a retornar, separados por vírgula (ex.: id,nome,status)"),
+    session: Session = Depends(get_session)
+):
+    filtros = []
+    if status:
+        filtros.append(func.lower(TV.status) == status.lower())
+    if condominio_id is not None:
+        filtros.append(TV.condominio_id == condominio_id)
+    
+    return paginar(session, TV, response, filtros, after_id, limit, parse_fields(TV, fields))
 
 @router.get("/tvs/{tv_id}", summary="Buscar TV", description="Busca uma TV específica por ID")
 def get_tv(tv_id: int, session: Session = Depends(get_session)):
@@ -72,19 +88,18 @@ def delete_tv(tv_id: int, session: Session = Depends(get_session)):
     return {"ok": True}
 
 @router.post("/tvs/{codigo_conexao}/status", summary="Conectar TV", description="Marca TV como online usando código de conexão")
-def update_tv_status(codigo_conexao: str, session: Session = Depends(get_session)):
-    tv = session.exec(select(TV).where(TV.codigo_conexao == codigo_conexao)).first()
+async def update_tv_status(codigo_conexao: str, session: AsyncSession = Depends(get_async_session)):
+    tv = (await session.exec(select(TV).where(TV.codigo_conexao == codigo_conexao))).first()
     if not tv:
         raise HTTPException(status_code=404, detail="TV não encontrada")
     tv.status = "online"
     tv.last_ping = datetime.now()  # Atualizar timestamp do último ping
     session.add(tv)
-    session.commit()
-    session.refresh(tv)
+    await session.commit()
     return tv
 
 @router.post("/tvs/{codigo_conexao}/ping", summary="💓 Heartbeat da TV", description="Endpoint que a TV deve chamar a cada 1-2 minutos para manter status online")
-def tv_heartbeat(codigo_conexao: str, session: Session = Depends(get_session)):
+async def tv_heartbeat(codigo_conexao: str, session: AsyncSession = Depends(get_async_session)):
     """
     Endpoint de heartbeat/ping para TVs
     
@@ -98,28 +113,31 @@ def tv_heartbeat(codigo_conexao: str, session: Session = Depends(get_session)):
     
     Returns:
         Status da TV e timestamp do ping
-    """
-    tv = session.exec(select(TV).where(TV.codigo_conexao == codigo_conexao)).first()
-    if not tv:
-        raise HTTPException(status_code=404, detail="TV não encontrada com este código")
     
+    Assíncrono e com um único UPDATE (sem SELECT nem refresh): o polling
+    das TVs não ocupa threads do threadpool.
+    """
     # Atualizar status e último ping
-    tv.status = "online"
-    tv.last_ping = datetime.now()
-    session.add(tv)
-    session.commit()
-    session.refresh(tv)
+    last_ping = datetime.now()
+    resultado = await session.exec(
+        update(TV).where(TV.codigo_conexao == codigo_conexao).values(status="online", last_ping=last_ping)
+    )
+    await session.commit()
+    if resultado.rowcount == 0:
+        raise HTTPException(status_code=404, detail="TV não encontrada com este código")
     
     return {
         "success": True,
-        "status": tv.status,
-        "last_ping": tv.last_ping,
+        "status": "online",
+        "last_ping": last_ping,
         "message": "Heartbeat registrado com sucesso"
     }
 
 @router.get("/tvs/{codigo_conexao}/status", summary="Status da TV", description="Verifica status da TV pelo código de conexão")
-def get_tv_status(codigo_conexao: str, session: Session = Depends(get_session)):
-    tv = session.exec(select(TV).where(TV.codigo_conexao == codigo_conexao)).first()
+async def get_tv_status(codigo_conexao: str, session: AsyncSession = Depends(get_async_session)):
+    tv = (await session.exec(
+        select(TV.status, TV.last_ping, TV.nome).where(TV.codigo_conexao == codigo_conexao)
+    )).first()
     if not tv:
         raise HTTPException(status_code=404, detail="TV não encontrada")
     return {
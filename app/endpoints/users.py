@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlmodel import Session, select
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Query, Response
+from sqlmodel import Session, func
 from app.db import engine
+from app.queries import LIMITE_MAXIMO, paginar, parse_fields
 from app.models import User
 from app.schemas import UserCreate, UserUpdate, PasswordChange
 from app.storage import upload_image_to_r2, delete_image_from_r2
-from app.auth import get_password_hash, verify_password
+from app.auth import get_password_hash, verify_password, revogar_tokens
 from datetime import datetime
+from typing import Optional
 
 router = APIRouter()
 
@@ -13,10 +15,20 @@ def get_session():
     with Session(engine) as session:
         yield session
 
-@router.get("/users/", summary="Listar usuários", description="Lista todos os usuários do sistema")
-def get_all_users(session: Session = Depends(get_session)):
-    users = session.exec(select(User)).all()
-    return users
+@router.get("/users/", summary="Listar usuários", description="Lista os usuários do sistema (paginação por cursor, filtros e seleção de campos)")
+def get_all_users(
+    response: Response,
+    tipo: Optional[str] = Query(None, description="Filtrar por tipo (ADM ou SINDICO)"),
+    after_id: Optional[int] = Query(None, description="Cursor: retorna apenas registros com id maior que este"),
+    limit: Optional[int] = Query(None, description="Tamanho da página (sem limite se omitido)", ge=1, le=LIMITE_MAXIMO),
+    fields: Optional[str] = Query(None, description="Campos a retornar, separados por vírgula (ex.: id,nome,status)"),
+    session: Session = Depends(get_session)
+):
+    filtros = []
+    if tipo:
+        filtros.append(func.upper(User.tipo) == tipo.upper())
+    
+    return paginar(session, User, response, filtros, after_id, limit, parse_fields(User, fields))
 
 @router.get("/users/{user_id}", summary="Buscar usuário", description="Busca um usuário específico por ID")
 def get_user(user_id: int, session: Session = Depends(get_session)):
@@ -264,8 +276,9 @@ def change_password(
             detail="A nova senha deve ter no mínimo 6 caracteres"
         )
     
-    # Atualizar senha
+    # Atualizar senha e revogar os tokens emitidos com a senha antiga
     db_user.senha = get_password_hash(password_data.senha_nova)
+    revogar_tokens(db_user)
     db_user.data_update = datetime.utcnow()
     
     session.add(db_user)
@@ -6,6 +6,7 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import RedirectResponse
 import os
 
+from app.db import SQLITE, criar_schema
 from app.endpoints.users import router as users_router
 from app.endpoints.condominios import router as condominios_router
 from app.endpoints.tvs import router as tvs_router
@@ -14,6 +15,7 @@ from app.endpoints.avisos import router as avisos_router
 from app.endpoints.auth import router as auth_router
 from app.endpoints.app import router as app_router
 from app.endpoints.monitor import router as monitor_router
+from app.endpoints.dashboard import router as dashboard_router
 
 app = FastAPI(
     title="EXPO-TV API",
@@ -46,6 +48,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],  # Permite todos os métodos (GET, POST, PUT, DELETE, etc.)
     allow_headers=["*"],  # Permite todos os headers
+    expose_headers=["X-Next-After-Id", "ETag"],  # Cursor da paginação e versão do bundle
 )
 
 # Health check endpoint
@@ -92,17 +95,36 @@ app.include_router(anuncios_router, tags=["Anúncios"])
 app.include_router(avisos_router, tags=["Avisos"])
 app.include_router(app_router, tags=["📱 App Mobile/TV"])
 app.include_router(monitor_router, tags=["🔧 Monitores"])
+app.include_router(dashboard_router, tags=["📊 Dashboard"])
 
 # Iniciar monitores em background
 @app.on_event("startup")
 async def startup_event():
     """
     Evento executado quando a aplicação inicia
-    Inicia os serviços de monitoramento em background
+    Cria o schema no modo SQLite e inicia os serviços de monitoramento em background
     """
+    # SQLite embutido (DATABASE_URL=sqlite:///...): tabelas, colunas e índices criados aqui
+    if SQLITE:
+        novas = criar_schema()
+        if novas & {"aviso_sindico", "anuncio_condominio", "aviso_condominio"}:
+            # Banco de versão anterior: preencher os vínculos e contadores (como as Migrações 7-9)
+            from sqlmodel import Session
+            from app.db import engine
+            from app.services.content_links import backfill_condominios, backfill_sindicos
+            from app.services.aviso_quota import recontar_avisos_ativos
+            with Session(engine) as session:
+                backfill_sindicos(session)
+                backfill_condominios(session)
+                recontar_avisos_ativos(session)
+        print("🗄️ Schema SQLite verificado (WAL)")
+    
     try:
         from app.services.tv_monitor import start_tv_monitor
         from app.services.expiration_monitor import start_expiration_monitor
+        from app.services.news import start_news_refresher
+        from app.services.email_outbox import start_email_outbox
+        from app.services.notificacoes import start_digest_sender
         
         # Iniciar monitor de TVs (verifica a cada 1 minuto)
         start_tv_monitor()
@@ -110,6 +132,15 @@ async def startup_event():
         # Iniciar monitor de expiração (verifica a cada 1 hora)
         start_expiration_monitor()
         
+        # Iniciar atualização do cache de notícias (a cada 5 minutos)
+        start_news_refresher()
+        
+        # Iniciar envio de emails da fila (a cada 1 minuto e a cada email enfileirado)
+        start_email_outbox()
+        
+        # Iniciar resumo de alertas dos síndicos (um email por síndico por janela)
+        start_digest_sender()
+        
         print("🚀 Monitores em background iniciados com sucesso!")
     except Exception as e:
         print(f"⚠️ Aviso: Erro ao iniciar monitores: {e}")
@@ -1,4 +1,5 @@
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Column, Index, Text
 from typing import Optional, List
 from datetime import datetime
 
@@ -6,18 +7,32 @@ class User(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     tipo: str  # 'ADM' ou 'SINDICO'
     nome: str
-    email: str
+    email: str = Field(unique=True, index=True)
     senha: str
-    token: Optional[str] = None
+    token: Optional[str] = None  # Legado: o login não grava mais o JWT (ver token_version)
+    token_version: int = Field(default=0)  # Versão dos tokens; incrementar revoga todos os JWTs emitidos
     data_criacao: datetime = Field(default_factory=datetime.utcnow)
     data_update: Optional[datetime] = None
     telefone: Optional[str] = None
     foto_url: Optional[str] = None
     limite_avisos: int = Field(default=10)  # Quantidade de avisos permitidos para o síndico
+    avisos_ativos: int = Field(default=0)  # Contador de avisos ativos (mantido por app.services.aviso_quota)
     reset_token: Optional[str] = None  # Token para recuperação de senha
     reset_token_expires: Optional[datetime] = None  # Expiração do token de recuperação
     condominios: List["Condominio"] = Relationship(back_populates="sindico")
 
+# Vínculos conteúdo ↔ condomínio (espelho indexado de condominios_ids)
+# Definidos antes de Condominio por serem usados como link_model
+class AnuncioCondominio(SQLModel, table=True):
+    __tablename__ = "anuncio_condominio"
+    anuncio_id: int = Field(foreign_key="anuncio.id", primary_key=True, ondelete="CASCADE")
+    condominio_id: int = Field(primary_key=True, index=True)  # Sem FK: condominios_ids pode ter IDs antigos
+
+class AvisoCondominio(SQLModel, table=True):
+    __tablename__ = "aviso_condominio"
+    aviso_id: int = Field(foreign_key="aviso.id", primary_key=True, ondelete="CASCADE")
+    condominio_id: int = Field(primary_key=True, index=True)
+
 class Condominio(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     nome: str
@@ -27,6 +42,23 @@ class Condominio(SQLModel, table=True):
     data_registro: datetime = Field(default_factory=datetime.utcnow)
     sindico: Optional[User] = Relationship(back_populates="condominios")
     tvs: List["TV"] = Relationship(back_populates="condominio")
+    # Somente leitura: os vínculos são gravados por app.services.content_links
+    anuncios: List["Anuncio"] = Relationship(
+        link_model=AnuncioCondominio,
+        sa_relationship_kwargs={
+            "viewonly": True,
+            "primaryjoin": "Condominio.id == foreign(AnuncioCondominio.condominio_id)",
+            "secondaryjoin": "Anuncio.id == foreign(AnuncioCondominio.anuncio_id)",
+        }
+    )
+    avisos: List["Aviso"] = Relationship(
+        link_model=AvisoCondominio,
+        sa_relationship_kwargs={
+            "viewonly": True,
+            "primaryjoin": "Condominio.id == foreign(AvisoCondominio.condominio_id)",
+            "secondaryjoin": "Aviso.id == foreign(AvisoCondominio.aviso_id)",
+        }
+    )
 
 class TV(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -53,8 +85,15 @@ class Anuncio(SQLModel, table=True):
     nome_anunciante: Optional[str] = None
     status: str
     data_expiracao: Optional[datetime] = None
+    data_inicio: Optional[datetime] = None  # Início da exibição (status 'Agendado' até lá)
+    janelas_exibicao: Optional[str] = None  # Janelas semanais, ex.: "seg-sex 06:00-12:00"
     archive_url: Optional[str] = None
+    archive_size: Optional[int] = None  # Tamanho da mídia em bytes (registrado no upload)
+    archive_hash: Optional[str] = None  # SHA-256 da mídia (registrado no upload)
+    archive_content_type: Optional[str] = None  # Tipo MIME da mídia
     tempo_exibicao: int = Field(default=10)  # Tempo em segundos para exibir o anúncio (padrão: 10s)
+    peso: int = Field(default=1)  # Peso no rodízio de anúncios (1-10)
+    prioridade: int = Field(default=0)  # Nível de prioridade (0-3), cada nível dobra o peso
 
 class Aviso(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -65,5 +104,44 @@ class Aviso(SQLModel, table=True):
     nome_anunciante: Optional[str] = None
     status: str
     data_expiracao: Optional[datetime] = None
+    data_inicio: Optional[datetime] = None  # Início da exibição (status 'Agendado' até lá)
+    janelas_exibicao: Optional[str] = None  # Janelas semanais, ex.: "seg-sex 06:00-12:00"
     archive_url: Optional[str] = None
+    archive_size: Optional[int] = None  # Tamanho da mídia em bytes (registrado no upload)
+    archive_hash: Optional[str] = None  # SHA-256 da mídia (registrado no upload)
+    archive_content_type: Optional[str] = None  # Tipo MIME da mídia
     mensagem: Optional[str] = None  # Campo adicional para avisos (opcional)
+
+class AvisoSindico(SQLModel, table=True):
+    """Vínculo aviso ↔ síndico (espelho indexado de Aviso.sindico_ids)"""
+    __tablename__ = "aviso_sindico"
+    aviso_id: int = Field(foreign_key="aviso.id", primary_key=True, ondelete="CASCADE")
+    sindico_id: int = Field(primary_key=True, index=True)  # Sem FK: sindico_ids pode ter IDs antigos
+
+class EmailOutbox(SQLModel, table=True):
+    """Fila de emails (enviados em background por app.services.email_outbox)"""
+    __tablename__ = "email_outbox"
+    __table_args__ = (Index("ix_email_outbox_fila", "status", "proxima_tentativa"),)  # Busca dos emails a enviar
+    id: Optional[int] = Field(default=None, primary_key=True)
+    destinatario: str
+    assunto: str
+    texto: str = Field(sa_column=Column(Text, nullable=False))
+    html: Optional[str] = Field(default=None, sa_column=Column(Text))
+    status: str = Field(default="pendente")  # 'pendente', 'enviado' ou 'falhou'
+    tentativas: int = Field(default=0)
+    proxima_tentativa: datetime = Field(default_factory=datetime.utcnow)
+    ultimo_erro: Optional[str] = None
+    data_criacao: datetime = Field(default_factory=datetime.utcnow)
+    data_envio: Optional[datetime] = None
+
+class NotificacaoEvento(SQLModel, table=True):
+    """Evento para o resumo (digest) de alertas do síndico (enviado por app.services.notificacoes)"""
+    __tablename__ = "notificacao_evento"
+    __table_args__ = (Index("ix_notificacao_evento_pendente", "enviado_em", "sindico_id"),)  # Eventos a enviar
+    id: Optional[int] = Field(default=None, primary_key=True)
+    sindico_id: int
+    tipo: str  # 'tv_offline', 'aviso_expirando' ou 'aviso_expirado'
+    referencia: str = Field(index=True)  # Identifica o evento (evita alertas repetidos), ex.: "tv:12"
+    descricao: str
+    data_criacao: datetime = Field(default_factory=datetime.utcnow)
+    enviado_em: Optional[datetime] = None
@@ -0,0 +1,87 @@
+"""
+Helpers de consulta compartilhados pelos endpoints de listagem
+- Paginação por cursor (keyset: id > after_id)
+- Projeção de campos (?fields=) selecionando só as colunas pedidas
+"""
+
+from fastapi import HTTPException, Response
+from sqlmodel import Session, select
+from typing import Any, Iterable, List, Optional, Sequence
+
+# Limite máximo de itens por página
+LIMITE_MAXIMO = 500
+
+
+def parse_fields(model, fields: Optional[str]) -> Optional[List[str]]:
+    """
+    Converte ?fields=a,b,c em lista de colunas do modelo (id sempre incluído)
+
+    Raises:
+        HTTPException 400: Se algum campo não existir no modelo
+    """
+    if not fields:
+        return None
+
+    campos = [campo.strip() for campo in fields.split(",") if campo.strip()]
+    invalidos = [campo for campo in campos if campo not in model.__table__.columns]
+    if invalidos:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Campos inválidos: {', '.join(invalidos)}"
+        )
+
+    if "id" not in campos:
+        campos.insert(0, "id")
+    return campos
+
+
+def paginar(
+    session: Session,
+    model,
+    response: Response,
+    filtros: Iterable[Any] = (),
+    after_id: Optional[int] = None,
+    limit: Optional[int] = None,
+    campos: Optional[Sequence[str]] = None,
+) -> list:
+    """
+    Lista registros ordenados por id com paginação por cursor
+
+    Sem `limit` retorna todos (compatível com o comportamento anterior).
+    Quando a página vem cheia, o cursor da próxima é enviado no header
+    X-Next-After-Id.
+
+    Args:
+        filtros: Condições SQL aplicadas com WHERE
+        after_id: Retorna apenas registros com id maior que este
+        limit: Tamanho da página
+        campos: Colunas a selecionar; retorna dicts em vez de objetos do modelo
+
+    Returns:
+        Lista de objetos do modelo ou de dicts (quando há projeção)
+    """
+    if campos:
+        query = select(*(getattr(model, campo) for campo in campos))
+    else:
+        query = select(model)
+
+    for filtro in filtros:
+        query = query.where(filtro)
+    if after_id is not None:
+        query = query.where(model.id > after_id)
+
+    query = query.order_by(model.id)
+    if limit:
+        query = query.limit(limit)
+
+    resultado = session.exec(query).all()
+    if campos and len(campos) == 1:
+        resultado = [{campos[0]: valor} for valor in resultado]  # select de uma coluna devolve escalares
+    elif campos:
+        resultado = [dict(linha._mapping) for linha in resultado]
+
+    if limit and len(resultado) == limit:
+        ultimo = resultado[-1]
+        response.headers["X-Next-After-Id"] = str(ultimo["id"] if campos else ultimo.id)
+
+    return resultado
@@ -0,0 +1,134 @@
+"""
+Limite de tentativas (token bucket) por IP e por email
+Protege /login, /token e /forgot-password contra força bruta e contra o
+custo de CPU do bcrypt / envios de SMTP em massa. A verificação acontece
+antes de qualquer consulta ao banco ou hash de senha.
+
+O estado fica em um store plugável: por padrão em memória (um processo);
+com várias máquinas basta configurar um store compartilhado com
+configurar_store().
+"""
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass
+from threading import Lock
+from typing import Optional, Tuple
+import math
+import time
+
+from fastapi import HTTPException, Request, status
+
+
+class RateLimitStore(ABC):
+    """
+    Interface do armazenamento dos buckets
+
+    Implementações compartilhadas (ex.: Redis com script Lua) precisam fazer
+    a leitura + atualização do bucket de forma atômica.
+    """
+
+    @abstractmethod
+    def consumir(self, chave: str, capacidade: int, por_segundo: float) -> float:
+        """
+        Tenta consumir 1 ficha do bucket da chave
+
+        Returns:
+            0 se permitido; senão, segundos até haver uma ficha disponível
+        """
+
+
+class MemoryRateLimitStore(RateLimitStore):
+    """Buckets em memória do processo (LRU limitado a maxsize chaves)"""
+
+    def __init__(self, maxsize: int = 50000):
+        self.maxsize = maxsize
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = Lock()
+
+    def consumir(self, chave: str, capacidade: int, por_segundo: float) -> float:
+        agora = time.monotonic()
+        with self._lock:
+            fichas, atualizado_em = self._buckets.get(chave, (float(capacidade), agora))
+            fichas = min(capacidade, fichas + (agora - atualizado_em) * por_segundo)
+
+            if fichas >= 1:
+                fichas -= 1
+                espera = 0.0
+            else:
+                espera = (1 - fichas) / por_segundo
+
+            self._buckets[chave] = (fichas, agora)
+            self._buckets.move_to_end(chave)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+            return espera
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+
+_store: RateLimitStore = MemoryRateLimitStore()
+
+
+def configurar_store(store: RateLimitStore):
+    """Troca o armazenamento dos buckets (ex.: store compartilhado entre máquinas)"""
+    global _store
+    _store = store
+
+
+@dataclass(frozen=True)
+class Limite:
+    """
+    Bucket de `capacidade` tentativas, reabastecido com `por_minuto` fichas por minuto
+
+    Args:
+        nome: Prefixo das chaves (separa os buckets de cada regra)
+        capacidade: Rajada máxima permitida
+        por_minuto: Ritmo sustentado permitido
+    """
+    nome: str
+    capacidade: int
+    por_minuto: float
+
+    def consumir(self, chave: str) -> float:
+        return _store.consumir(f"{self.nome}:{chave}", self.capacidade, self.por_minuto / 60)
+
+
+# Regras de autenticação
+LOGIN_POR_IP = Limite("login-ip", capacidade=20, por_minuto=10)
+LOGIN_POR_EMAIL = Limite("login-email", capacidade=5, por_minuto=2)
+RECUPERACAO_POR_IP = Limite("forgot-ip", capacidade=5, por_minuto=1)
+RECUPERACAO_POR_EMAIL = Limite("forgot-email", capacidade=2, por_minuto=0.1)
+
+
+def ip_cliente(request: Request) -> str:
+    """IP real do cliente atrás do proxy do Fly.io"""
+    ip = request.headers.get("fly-client-ip")
+    if not ip:
+        encaminhado = request.headers.get("x-forwarded-for")
+        if encaminhado:
+            ip = encaminhado.split(",")[0].strip()
+    if not ip and request.client:
+        ip = request.client.host
+    return ip or "desconhecido"
+
+
+def verificar_limites(request: Request, limite_ip: Limite, limite_email: Limite, email: Optional[str]):
+    """
+    Consome uma tentativa do IP e, se liberado, do email
+
+    Raises:
+        HTTPException 429: Se algum dos buckets estiver vazio (com Retry-After)
+    """
+    espera = limite_ip.consumir(ip_cliente(request))
+    if espera == 0 and email:
+        espera = limite_email.consumir(email.strip().lower())
+
+    if espera > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Muitas tentativas. Aguarde alguns instantes e tente novamente.",
+            headers={"Retry-After": str(math.ceil(espera))},
+        )
@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
 from typing import Optional
 from datetime import datetime
 
@@ -40,7 +40,35 @@ class AnuncioCreate(BaseModel):
     nome_anunciante: Optional[str] = None
     status: str
     data_expiracao: Optional[datetime] = None
-    tempo_exibicao: int = 10  # Tempo em segundos (padrão: 10s)
+    data_inicio: Optional[datetime] = None  # Início da exibição
+    janelas_exibicao: Optional[str] = None  # Janelas semanais, ex.: "seg-sex 06:00-12:00"
+    tempo_exibicao: int = Field(10, ge=1, le=300)  # Tempo em segundos (padrão: 10s)
+    peso: int = Field(1, ge=1, le=10)  # Peso no rodízio de anúncios (1-10)
+    prioridade: int = Field(0, ge=0, le=3)  # Nível de prioridade (0-3)
+
+class AnuncioUpdate(BaseModel):
+    """Atualização parcial: apenas os campos enviados são alterados (null limpa os opcionais)"""
+    nome: Optional[str] = None
+    condominios_ids: Optional[str] = None
+    numero_anunciante: Optional[str] = None
+    nome_anunciante: Optional[str] = None
+    status: Optional[str] = None
+    data_expiracao: Optional[datetime] = None
+    data_inicio: Optional[datetime] = None
+    janelas_exibicao: Optional[str] = None  # Vazio remove as janelas
+    tempo_exibicao: Optional[int] = Field(None, ge=1, le=300)
+    peso: Optional[int] = Field(None, ge=1, le=10)
+    prioridade: Optional[int] = Field(None, ge=0, le=3)
+
+    @model_validator(mode="after")
+    def _obrigatorios_nao_nulos(self):
+        nulos = [
+            campo for campo in ("nome", "condominios_ids", "status", "tempo_exibicao", "peso", "prioridade")
+            if campo in self.model_fields_set and getattr(self, campo) is None
+        ]
+        if nulos:
+            raise ValueError(f"Campos não podem ser nulos: {', '.join(nulos)}")
+        return self
 
 class AvisoCreate(BaseModel):
     nome: str
@@ -50,4 +78,6 @@ class AvisoCreate(BaseModel):
     nome_anunciante: Optional[str] = None
     status: str
     data_expiracao: Optional[datetime] = None
+    data_inicio: Optional[datetime] = None  # Início da exibição
+    janelas_exibicao: Optional[str] = None  # Janelas semanais, ex.: "seg-sex 06:00-12:00"
     mensagem: Optional[str] = None  # Campo adicional para avisos (opcional)
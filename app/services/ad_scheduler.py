@@ -0,0 +1,109 @@
+"""
+Agendamento ponderado de anúncios nas TVs
+Distribui as posições de anúncio da playlist de forma proporcional ao peso
+e à prioridade de cada anúncio, rotacionando o ponto de partida por TV e
+por janela de tempo para que todos recebam sua fatia de exibições
+"""
+
+from functools import lru_cache, reduce
+from math import gcd
+from typing import Any, List, Optional, Sequence, Tuple
+import time
+
+# Duração de cada janela de rotação (a cada janela a playlist "continua" a sequência)
+JANELA_ROTACAO_SEGUNDOS = 300
+
+PESO_MINIMO = 1
+PESO_MAXIMO = 10
+PRIORIDADE_MAXIMA = 3
+
+# Constante usada para espalhar o ponto de partida entre TVs diferentes
+_DESLOCAMENTO_POR_TV = 7919
+
+
+def peso_efetivo(peso: Optional[int], prioridade: Optional[int]) -> int:
+    """
+    Peso usado no rodízio: cada nível de prioridade dobra o peso do anúncio
+
+    Ex.: peso 3 / prioridade 0 -> 3; peso 3 / prioridade 2 -> 12
+    """
+    peso = min(max(peso or PESO_MINIMO, PESO_MINIMO), PESO_MAXIMO)
+    prioridade = min(max(prioridade or 0, 0), PRIORIDADE_MAXIMA)
+    return peso << prioridade
+
+
+@lru_cache(maxsize=256)
+def sequencia_ponderada(pesos: Tuple[int, ...]) -> Tuple[int, ...]:
+    """
+    Gera um período completo do rodízio ponderado suave
+
+    Variante por "tempo virtual" do smooth weighted round robin: o j-ésimo
+    turno do item i acontece em (j + 0.5) / peso_i. Ordenando esses instantes,
+    cada item aparece exatamente `peso` vezes no período e as aparições de um
+    mesmo item ficam espaçadas uniformemente. Empates favorecem o menor índice
+    (a lista já vem ordenada por prioridade).
+
+    Args:
+        pesos: Pesos inteiros (>= 1) de cada item
+
+    Returns:
+        Tupla de índices com tamanho sum(pesos) / mdc(pesos)
+    """
+    if not pesos:
+        return ()
+
+    divisor = reduce(gcd, pesos)
+    turnos = sorted(
+        ((2 * j + 1) / (2 * peso), indice)
+        for indice, peso in enumerate(p // divisor for p in pesos)
+        for j in range(peso)
+    )
+    return tuple(indice for _, indice in turnos)
+
+
+def deslocamento_rotacao(slots_por_playlist: int, periodo: int, agora: Optional[float] = None) -> int:
+    """
+    Quantas posições a rotação da janela atual está à frente da janela 0
+
+    planejar_rotacao com agora=0 é a rotação canônica da TV; somando este
+    deslocamento ao ponto de partida dela obtém-se a rotação de agora.
+    """
+    if periodo < 2:
+        return 0
+    janela = int((agora if agora is not None else time.time()) // JANELA_ROTACAO_SEGUNDOS)
+    return janela * max(slots_por_playlist, 1) % periodo
+
+
+def planejar_rotacao(
+    anuncios: Sequence[Any],
+    tv_id: int,
+    slots_por_playlist: int,
+    agora: Optional[float] = None,
+) -> Tuple[List[Any], Optional[Sequence[int]], int]:
+    """
+    Planeja a rotação de anúncios de uma playlist
+
+    O ponto de partida avança `slots_por_playlist` posições a cada janela de
+    JANELA_ROTACAO_SEGUNDOS, então playlists consecutivas continuam de onde a
+    anterior parou; TVs diferentes começam em pontos diferentes do período.
+
+    Args:
+        anuncios: Anúncios ativos (com `peso` e `prioridade`)
+        tv_id: ID da TV
+        slots_por_playlist: Quantas posições de anúncio a playlist terá
+        agora: Timestamp (epoch) de referência; padrão: time.time()
+
+    Returns:
+        Tupla (anuncios_ordenados, ordem_anuncios, inicio_anuncios) para
+        repassar a build_playlist
+    """
+    if len(anuncios) < 2:
+        return list(anuncios), None, 0
+
+    ordenados = sorted(anuncios, key=lambda a: (-(a.prioridade or 0), a.id or 0))
+    ordem = sequencia_ponderada(tuple(peso_efetivo(a.peso, a.prioridade) for a in ordenados))
+
+    deslocamento = deslocamento_rotacao(slots_por_playlist, len(ordem), agora)
+    inicio = (deslocamento + (tv_id or 0) * _DESLOCAMENTO_POR_TV) % len(ordem)
+
+    return ordenados, ordem, inicio
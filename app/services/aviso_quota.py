@@ -0,0 +1,134 @@
+"""
+Cota de avisos ativos por síndico
+Mantém o contador User.avisos_ativos atualizado na mesma transação que
+grava o aviso, para que a verificação de limite_avisos seja O(1)
+
+Um aviso ativo conta uma vez para cada síndico dono de algum dos
+condomínios em condominios_ids.
+"""
+
+from sqlalchemy import case, update
+from sqlmodel import Session, select
+from typing import Dict, Iterable, Optional, Set
+import logging
+
+from app.auth import invalidate_users
+from app.models import Aviso, Condominio, User
+from app.services.content_links import ids_csv
+
+logger = logging.getLogger(__name__)
+
+
+class LimiteAvisosExcedido(Exception):
+    """Síndico já possui limite_avisos avisos ativos"""
+
+    def __init__(self, sindico: User):
+        self.sindico = sindico
+        super().__init__(
+            f"Síndico '{sindico.nome}' atingiu o limite de {sindico.limite_avisos} avisos permitidos. "
+            f"Atualmente possui {sindico.avisos_ativos} avisos."
+        )
+
+
+def conta_como_ativo(status: Optional[str]) -> bool:
+    return (status or "").lower() == "ativo"
+
+
+def sindicos_dos_condominios(session: Session, condominios_ids: Optional[str]) -> Dict[int, Optional[int]]:
+    """
+    Mapa {condominio_id: sindico_id} dos condomínios do CSV, em uma única consulta
+
+    Condomínios inexistentes ficam de fora do mapa.
+    """
+    ids = ids_csv(condominios_ids)
+    if not ids:
+        return {}
+    linhas = session.exec(select(Condominio.id, Condominio.sindico_id).where(Condominio.id.in_(ids))).all()
+    return {cond_id: sindico_id for cond_id, sindico_id in linhas}
+
+
+def sindicos_contados(session: Session, status: Optional[str], condominios_ids: Optional[str]) -> Set[int]:
+    """Síndicos cujo contador inclui um aviso com este status/condomínios"""
+    if not conta_como_ativo(status):
+        return set()
+    return {s for s in sindicos_dos_condominios(session, condominios_ids).values() if s}
+
+
+def verificar_limite(session: Session, sindico_ids: Iterable[int], bloquear: bool = True):
+    """
+    Bloqueia (SELECT ... FOR UPDATE) os síndicos e confere o limite de cada um
+
+    As linhas ficam bloqueadas até o commit, então duas criações simultâneas
+    para o mesmo síndico não passam as duas pelo limite. Com bloquear=False
+    é só uma pré-verificação (ex.: antes de um upload demorado), que precisa
+    ser repetida com bloqueio na transação que grava o aviso.
+
+    Raises:
+        LimiteAvisosExcedido: Se algum síndico já estiver no limite
+    """
+    ids = sorted(set(sindico_ids))  # Ordem fixa evita deadlock entre transações
+    if not ids:
+        return
+    # populate_existing: relê o contador mesmo se o síndico já estiver na sessão
+    # (ajustar_contadores altera a linha por UPDATE, sem atualizar o objeto)
+    query = select(User).where(User.id.in_(ids)).order_by(User.id).execution_options(populate_existing=True)
+    if bloquear:
+        query = query.with_for_update()
+    sindicos = session.exec(query).all()
+    for sindico in sindicos:
+        if (sindico.avisos_ativos or 0) >= sindico.limite_avisos:
+            raise LimiteAvisosExcedido(sindico)
+
+
+def ajustar_contadores(session: Session, antes: Set[int], depois: Set[int]):
+    """
+    Aplica a diferença entre os síndicos que contavam o aviso antes e depois
+    (UPDATE atômico no banco; não faz commit)
+
+    O UPDATE Core não passa pelos eventos do ORM: o cache de usuários de
+    app.auth é invalidado explicitamente.
+    """
+    entrou = depois - antes
+    saiu = antes - depois
+    if entrou or saiu:
+        invalidate_users(session, entrou | saiu)
+    if entrou:
+        session.exec(
+            update(User).where(User.id.in_(entrou)).values(avisos_ativos=User.avisos_ativos + 1)
+        )
+    if saiu:
+        session.exec(
+            update(User).where(User.id.in_(saiu)).values(
+                avisos_ativos=case((User.avisos_ativos > 0, User.avisos_ativos - 1), else_=0)
+            )
+        )
+
+
+def recontar_avisos_ativos(session: Session) -> Dict[int, int]:
+    """
+    Recalcula todos os contadores a partir dos avisos ativos
+
+    Necessário quando o síndico de um condomínio muda (os avisos passam a
+    contar para outro síndico) ou para corrigir divergências.
+
+    Returns:
+        Mapa {sindico_id: avisos_ativos} dos síndicos com avisos
+    """
+    dono = dict(session.exec(select(Condominio.id, Condominio.sindico_id)).all())
+    avisos = session.exec(
+        select(Aviso.status, Aviso.condominios_ids).where(Aviso.status.ilike("Ativo"))
+    ).all()
+
+    contagem: Dict[int, int] = {}
+    for _, condominios_ids in avisos:
+        for sindico_id in {dono.get(cond_id) for cond_id in ids_csv(condominios_ids)} - {None}:
+            contagem[sindico_id] = contagem.get(sindico_id, 0) + 1
+
+    invalidate_users(session)
+    session.exec(update(User).values(avisos_ativos=0))
+    for sindico_id, total in contagem.items():
+        session.exec(update(User).where(User.id == sindico_id).values(avisos_ativos=total))
+    session.commit()
+
+    logger.info(f"🔢 Contadores de avisos ativos recalculados ({len(contagem)} síndicos)")
+    return contagem
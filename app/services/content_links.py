@@ -0,0 +1,117 @@
+"""
+Tabelas de vínculo dos conteúdos
+Mantém as tabelas indexadas sincronizadas com as colunas CSV legadas
+(sindico_ids, condominios_ids), que continuam sendo a fonte exibida pela API
+"""
+
+from sqlmodel import Session, delete, select
+from typing import List, Optional, Union
+
+from app.models import Anuncio, AnuncioCondominio, Aviso, AvisoCondominio, AvisoSindico
+
+# Tabela de vínculo com condomínios e coluna do conteúdo, por modelo
+_VINCULOS_CONDOMINIO = {
+    Anuncio: (AnuncioCondominio, AnuncioCondominio.anuncio_id),
+    Aviso: (AvisoCondominio, AvisoCondominio.aviso_id),
+}
+
+
+def ids_csv(texto: Optional[str]) -> List[int]:
+    """Converte '1, 2,3' em [1, 2, 3] (ignora valores não numéricos e repetidos)"""
+    ids = []
+    for parte in (texto or "").split(","):
+        parte = parte.strip()
+        if parte.isdigit() and int(parte) not in ids:
+            ids.append(int(parte))
+    return ids
+
+
+def sincronizar_sindicos(session: Session, aviso: Aviso):
+    """
+    Reescreve os vínculos aviso ↔ síndico a partir de aviso.sindico_ids
+
+    Não faz commit: deve rodar na mesma transação que grava o aviso
+    (o aviso precisa ter id, então chame após session.flush() em criações).
+    """
+    session.exec(delete(AvisoSindico).where(AvisoSindico.aviso_id == aviso.id))
+    for sindico_id in ids_csv(aviso.sindico_ids):
+        session.add(AvisoSindico(aviso_id=aviso.id, sindico_id=sindico_id))
+
+
+def sincronizar_condominios(session: Session, item: Union[Anuncio, Aviso]):
+    """
+    Reescreve os vínculos conteúdo ↔ condomínio a partir de item.condominios_ids
+
+    Mesmas regras de sincronizar_sindicos (sem commit, item com id).
+    """
+    link_model, coluna = _VINCULOS_CONDOMINIO[type(item)]
+    session.exec(delete(link_model).where(coluna == item.id))
+    for condominio_id in ids_csv(item.condominios_ids):
+        session.add(link_model(**{coluna.key: item.id, "condominio_id": condominio_id}))
+
+
+def remover_vinculos(session: Session, item: Union[Anuncio, Aviso]):
+    """Remove todos os vínculos de um anúncio/aviso (antes de deletá-lo)"""
+    link_model, coluna = _VINCULOS_CONDOMINIO[type(item)]
+    session.exec(delete(link_model).where(coluna == item.id))
+    if isinstance(item, Aviso):
+        session.exec(delete(AvisoSindico).where(AvisoSindico.aviso_id == item.id))
+
+
+def avisos_do_sindico(sindico_id: int):
+    """
+    Condição 'Aviso pertence ao síndico' para usar em WHERE
+
+    Vira um semi-join pelo índice de aviso_sindico.sindico_id, então o custo
+    depende só dos avisos daquele síndico
+    """
+    return Aviso.id.in_(
+        select(AvisoSindico.aviso_id).where(AvisoSindico.sindico_id == sindico_id)
+    )
+
+
+def do_condominio(model, condominio_id: int):
+    """
+    Condição 'conteúdo (Anuncio/Aviso) exibido no condomínio' para usar em WHERE
+
+    Casa o id exato pelo índice de condominio_id (1 não casa com 11 ou 21)
+    """
+    link_model, coluna = _VINCULOS_CONDOMINIO[model]
+    return model.id.in_(
+        select(coluna).where(link_model.condominio_id == condominio_id)
+    )
+
+
+def backfill_condominios(session: Session) -> int:
+    """
+    Preenche anuncio_condominio e aviso_condominio a partir de condominios_ids
+
+    Idempotente: os vínculos de cada conteúdo são reescritos.
+
+    Returns:
+        Número de anúncios + avisos processados
+    """
+    total = 0
+    for model in _VINCULOS_CONDOMINIO:
+        itens = session.exec(select(model)).all()
+        for item in itens:
+            sincronizar_condominios(session, item)
+        total += len(itens)
+    session.commit()
+    return total
+
+
+def backfill_sindicos(session: Session) -> int:
+    """
+    Preenche aviso_sindico a partir da coluna sindico_ids de todos os avisos
+
+    Idempotente: os vínculos de cada aviso são reescritos.
+
+    Returns:
+        Número de avisos processados
+    """
+    avisos = session.exec(select(Aviso).where(Aviso.sindico_ids != None)).all()  # noqa: E711
+    for aviso in avisos:
+        sincronizar_sindicos(session, aviso)
+    session.commit()
+    return len(avisos)
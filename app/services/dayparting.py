@@ -0,0 +1,239 @@
+"""
+Programação por horário (dayparting) de Avisos e Anúncios
+Interpreta janelas semanais recorrentes (ex.: "seg-sex 06:00-12:00") e mantém
+um índice de intervalos pré-calculado por condomínio, para que a TV descubra
+o que está no ar com uma busca binária no momento do poll
+"""
+
+from bisect import bisect_right
+from datetime import datetime
+from threading import Lock
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, List, Optional, Sequence, Tuple
+from zoneinfo import ZoneInfo
+import os
+
+# Carregar variáveis de ambiente do .env
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass  # Em produção, variáveis já estarão no ambiente
+
+# Fuso horário usado para avaliar as janelas (horário local dos condomínios)
+APP_TIMEZONE = ZoneInfo(os.getenv("APP_TIMEZONE", "America/Sao_Paulo"))
+
+STATUS_AGENDADO = "Agendado"
+
+MINUTOS_DIA = 24 * 60
+MINUTOS_SEMANA = 7 * MINUTOS_DIA
+
+# Segunda = 0 ... Domingo = 6 (mesmo padrão de datetime.weekday())
+DIAS_SEMANA = {
+    "seg": 0, "ter": 1, "qua": 2, "qui": 3, "sex": 4, "sab": 5, "sáb": 5, "dom": 6,
+}
+
+
+def _parse_hora(texto: str) -> int:
+    """Converte 'HH:MM' em minutos desde 00:00"""
+    horas, minutos = texto.strip().split(":")
+    horas, minutos = int(horas), int(minutos)
+    if not (0 <= horas <= 24 and 0 <= minutos < 60) or (horas == 24 and minutos):
+        raise ValueError(f"Horário inválido: '{texto}'")
+    return horas * 60 + minutos
+
+
+def _parse_dias(texto: str) -> List[int]:
+    """Converte 'seg-sex', 'sab,dom' ou 'todos' na lista de dias da semana"""
+    texto = texto.strip().lower()
+    if texto in ("", "todos"):
+        return list(range(7))
+
+    dias = []
+    for parte in texto.split(","):
+        parte = parte.strip()
+        if "-" in parte:
+            inicio, fim = (DIAS_SEMANA[d.strip()] for d in parte.split("-", 1))
+            dia = inicio
+            dias.append(dia)
+            while dia != fim:
+                dia = (dia + 1) % 7
+                dias.append(dia)
+        else:
+            dias.append(DIAS_SEMANA[parte])
+    return dias
+
+
+def parse_janelas(texto: Optional[str]) -> List[Tuple[int, int]]:
+    """
+    Converte a descrição das janelas em intervalos de minuto-da-semana
+
+    Formato: janelas separadas por ';', cada uma com dias opcionais e horário.
+    Ex.: "seg-sex 06:00-12:00; sab,dom 08:00-20:00" ou "22:00-02:00"
+    (sem dias = todos os dias; fim <= início atravessa a meia-noite)
+
+    Returns:
+        Lista de intervalos [início, fim) em minutos desde segunda 00:00
+
+    Raises:
+        ValueError: Se a descrição for inválida
+    """
+    if not texto or not texto.strip():
+        return []
+
+    intervalos = []
+    for janela in texto.split(";"):
+        janela = janela.strip()
+        if not janela:
+            continue
+        try:
+            dias_texto, _, horario = janela.rpartition(" ")
+            hora_inicio, hora_fim = (_parse_hora(h) for h in horario.split("-"))
+            dias = _parse_dias(dias_texto)
+        except (KeyError, ValueError) as e:
+            raise ValueError(f"Janela de exibição inválida: '{janela}'") from e
+
+        duracao = (hora_fim - hora_inicio) % MINUTOS_DIA or MINUTOS_DIA
+        for dia in dias:
+            inicio = dia * MINUTOS_DIA + hora_inicio
+            fim = inicio + duracao
+            if fim <= MINUTOS_SEMANA:
+                intervalos.append((inicio, fim))
+            else:
+                # Domingo atravessando para segunda: divide o intervalo
+                intervalos.append((inicio, MINUTOS_SEMANA))
+                intervalos.append((0, fim - MINUTOS_SEMANA))
+
+    return intervalos
+
+
+def horario_local(data: Optional[datetime]) -> Optional[datetime]:
+    """
+    Converte datas com fuso (ex.: '2030-01-01T00:00:00Z') para naive no horário
+    do servidor, o mesmo padrão das datas gravadas no banco
+    """
+    if data is not None and data.tzinfo is not None:
+        return data.astimezone().replace(tzinfo=None)
+    return data
+
+
+def minuto_da_semana(agora: Optional[datetime] = None) -> int:
+    """Minuto-da-semana (segunda 00:00 = 0) no fuso APP_TIMEZONE"""
+    local = agora.astimezone(APP_TIMEZONE) if agora else datetime.now(APP_TIMEZONE)
+    return local.weekday() * MINUTOS_DIA + local.hour * 60 + local.minute
+
+
+class IndiceJanelas:
+    """
+    Índice de intervalos semanais: divide a semana nos pontos de início/fim
+    de todas as janelas e guarda, para cada segmento, o conjunto de chaves
+    no ar. A consulta é uma busca binária sobre as fronteiras.
+    """
+
+    def __init__(self, janelas: Iterable[Tuple[Hashable, Sequence[Tuple[int, int]]]]):
+        eventos: Dict[int, List[Tuple[int, Hashable]]] = {}
+        for chave, intervalos in janelas:
+            for inicio, fim in intervalos:
+                eventos.setdefault(inicio, []).append((1, chave))
+                eventos.setdefault(fim, []).append((-1, chave))
+
+        self.fronteiras: List[int] = sorted(set(eventos) | {0})
+        self.segmentos: List[FrozenSet[Hashable]] = []
+
+        ativos: Dict[Hashable, int] = {}
+        for ponto in self.fronteiras:
+            for delta, chave in eventos.get(ponto, ()):
+                ativos[chave] = ativos.get(chave, 0) + delta
+            self.segmentos.append(frozenset(chave for chave, n in ativos.items() if n > 0))
+
+    def ativos_em(self, minuto: int) -> FrozenSet[Hashable]:
+        """Chaves no ar no minuto-da-semana informado"""
+        return self.segmentos[bisect_right(self.fronteiras, minuto) - 1]
+
+
+# Cache de índices por condomínio: {condominio_id: (assinatura, índice)}
+_indices: Dict[int, Tuple[Tuple, IndiceJanelas]] = {}
+_indices_lock = Lock()
+
+
+def indice_condominio(condominio_id: int, itens: Iterable[Tuple[Hashable, str]]) -> IndiceJanelas:
+    """
+    Retorna o índice de janelas do condomínio, reconstruindo-o apenas quando
+    o conjunto (chave, janelas) dos conteúdos mudar
+    """
+    assinatura = tuple(sorted(itens, key=repr))
+
+    with _indices_lock:
+        em_cache = _indices.get(condominio_id)
+        if em_cache and em_cache[0] == assinatura:
+            return em_cache[1]
+
+    indice = IndiceJanelas((chave, parse_janelas(texto)) for chave, texto in assinatura)
+
+    with _indices_lock:
+        _indices[condominio_id] = (assinatura, indice)
+    return indice
+
+
+def filtrar_programados(
+    condominio_id: int,
+    avisos: Sequence[Any],
+    anuncios: Sequence[Any],
+    agora: Optional[datetime] = None,
+) -> Tuple[List[Any], List[Any]]:
+    """
+    Mantém apenas avisos/anúncios que estão no ar agora
+
+    - data_inicio no futuro: ainda não começou
+    - data_expiracao no passado: já terminou (antes do monitor inativar)
+    - janelas_exibicao: precisa estar dentro de alguma janela semanal
+
+    Returns:
+        Tupla (avisos, anuncios) filtrada
+    """
+    agora = agora or datetime.now()
+    # Datas do banco são naive no horário do servidor (mesmo padrão do monitor de expiração)
+    agora_local = horario_local(agora)
+
+    def no_periodo(item) -> bool:
+        if item.data_inicio and item.data_inicio > agora_local:
+            return False
+        if item.data_expiracao and item.data_expiracao <= agora_local:
+            return False
+        return True
+
+    avisos = [a for a in avisos if no_periodo(a)]
+    anuncios = [a for a in anuncios if no_periodo(a)]
+
+    com_janela = [(("aviso", a.id), a.janelas_exibicao) for a in avisos if a.janelas_exibicao] + \
+                 [(("anuncio", a.id), a.janelas_exibicao) for a in anuncios if a.janelas_exibicao]
+    if not com_janela:
+        return avisos, anuncios
+
+    try:
+        no_ar = indice_condominio(condominio_id, com_janela).ativos_em(minuto_da_semana(agora))
+    except ValueError:
+        # Janela inválida gravada no banco: não derruba a TV, exibe sem restrição
+        return avisos, anuncios
+
+    avisos = [a for a in avisos if not a.janelas_exibicao or ("aviso", a.id) in no_ar]
+    anuncios = [a for a in anuncios if not a.janelas_exibicao or ("anuncio", a.id) in no_ar]
+    return avisos, anuncios
+
+
+def status_inicial(status: str, data_inicio: Optional[datetime], agora: Optional[datetime] = None) -> str:
+    """
+    Conteúdo salvo como 'Ativo' com início no futuro fica 'Agendado';
+    o monitor de expiração ativa quando data_inicio chegar. 'Agendado' sem
+    início futuro (data removida ou antecipada) volta a ser 'Ativo'.
+
+    Aceita datas com ou sem fuso (ver horario_local)
+    """
+    data_inicio = horario_local(data_inicio)
+    agora = horario_local(agora or datetime.now())
+    futuro = data_inicio is not None and data_inicio > agora
+
+    if status and status.lower() == "ativo" and futuro:
+        return STATUS_AGENDADO
+    if status == STATUS_AGENDADO and not futuro:
+        return "Ativo"
+    return status
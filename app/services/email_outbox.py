@@ -0,0 +1,291 @@
+"""
+Fila de emails (outbox)
+Os endpoints só gravam o email na tabela email_outbox, na mesma transação da
+alteração que o motivou, e respondem na hora. Um job em background envia os
+pendentes em lotes reutilizando uma única conexão SMTP autenticada, com novas
+tentativas em backoff exponencial.
+
+Cada lote é reservado numa transação curta (proxima_tentativa avança
+RESERVA_LOTE segundos), enviado fora de transação e tem o resultado gravado
+numa segunda transação curta: nenhuma linha fica bloqueada durante o SMTP.
+"""
+
+from datetime import datetime, timedelta
+from threading import Event
+from typing import Dict, List, Optional
+import logging
+import smtplib
+
+from sqlalchemy import delete, event, func
+from sqlalchemy.orm import Session as OrmSession
+from sqlmodel import Session, select
+
+from app.db import engine
+from app.email_service import conectar_smtp, montar_mensagem, smtp_configurado
+from app.models import EmailOutbox
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+STATUS_PENDENTE = "pendente"
+STATUS_ENVIADO = "enviado"
+STATUS_FALHOU = "falhou"
+
+JOB_ID = "email_outbox"
+
+# Emails por lote (uma conexão SMTP por lote)
+TAMANHO_LOTE = 50
+
+# Reserva de um lote em envio: se o processo cair no meio, os emails voltam
+# para a fila depois deste prazo (bem acima do tempo de envio de um lote)
+RESERVA_LOTE = 600
+
+# Novas tentativas: 30s, 1min, 2min, ... até 1h entre tentativas
+MAX_TENTATIVAS = 8
+BACKOFF_INICIAL = 30
+BACKOFF_MAXIMO = 3600
+
+# O enfileiramento acorda o job; o intervalo é só uma rede de segurança
+INTERVALO_VERIFICACAO = 60
+
+# Emails enviados ficam na tabela por este período
+DIAS_RETENCAO = 30
+
+_scheduler = None
+_acordado = Event()
+
+
+def enfileirar_email(session: Session, destinatario: str, assunto: str, texto: str, html: Optional[str] = None) -> EmailOutbox:
+    """
+    Adiciona um email à fila (não faz commit: vai junto com a transação de quem chama)
+
+    O job de envio é acordado assim que a transação for commitada.
+    """
+    email = EmailOutbox(destinatario=destinatario, assunto=assunto, texto=texto, html=html)
+    session.add(email)
+    session.info["email_enfileirado"] = True
+    return email
+
+
+@event.listens_for(OrmSession, "after_commit")
+def _acordar_apos_commit(session):
+    if session.info.pop("email_enfileirado", False):
+        acordar_envio()
+
+
+def acordar_envio():
+    """Antecipa a próxima execução do job de envio para agora"""
+    _acordado.set()
+    if _scheduler is not None:
+        try:
+            _scheduler.modify_job(JOB_ID, next_run_time=datetime.now())
+        except Exception as e:
+            logger.warning(f"⚠️ Não foi possível acordar o envio de emails: {e}")
+
+
+def _backoff(tentativas: int) -> int:
+    return min(BACKOFF_INICIAL * 2 ** (tentativas - 1), BACKOFF_MAXIMO)
+
+
+def _registrar_falha(email: EmailOutbox, erro: Exception, agora: datetime):
+    email.tentativas += 1
+    email.ultimo_erro = str(erro)[:255]
+    if email.tentativas >= MAX_TENTATIVAS:
+        email.status = STATUS_FALHOU
+        logger.error(f"❌ Email {email.id} para {email.destinatario} descartado após {email.tentativas} tentativas: {erro}")
+    else:
+        email.proxima_tentativa = agora + timedelta(seconds=_backoff(email.tentativas))
+        logger.warning(f"⚠️ Falha ao enviar email {email.id} (tentativa {email.tentativas}): {erro}")
+
+
+def _reservar_lote(agora: datetime) -> List[EmailOutbox]:
+    """
+    Reserva até TAMANHO_LOTE emails pendentes e faz commit
+
+    As linhas são lidas com FOR UPDATE SKIP LOCKED e têm proxima_tentativa
+    adiada por RESERVA_LOTE segundos, então outra máquina não pega o mesmo
+    lote depois do commit. O bloqueio dura só esta transação curta.
+    """
+    with Session(engine, expire_on_commit=False) as session:
+        emails = session.exec(
+            select(EmailOutbox)
+            .where(EmailOutbox.status == STATUS_PENDENTE, EmailOutbox.proxima_tentativa <= agora)
+            .order_by(EmailOutbox.id)
+            .limit(TAMANHO_LOTE)
+            .with_for_update(skip_locked=True)
+        ).all()
+        for email in emails:
+            email.proxima_tentativa = agora + timedelta(seconds=RESERVA_LOTE)
+            session.add(email)
+        session.commit()
+    return emails
+
+
+def _enviar_lote(emails: List[EmailOutbox]) -> Dict[int, Optional[Exception]]:
+    """
+    Envia os emails reservados com uma única conexão SMTP (fora de transação)
+
+    Returns:
+        Resultado por id do email: None se enviado, senão o erro
+    """
+    resultados: Dict[int, Optional[Exception]] = {}
+    server = None
+    try:
+        for posicao, email in enumerate(emails):
+            if server is None:
+                try:
+                    server = conectar_smtp()
+                except Exception as e:
+                    logger.error(f"❌ Erro ao conectar no SMTP: {e}")
+                    for restante in emails[posicao:]:
+                        resultados[restante.id] = e
+                    break
+
+            try:
+                server.send_message(montar_mensagem(email.destinatario, email.assunto, email.texto, email.html))
+            except (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused) as e:
+                # O servidor recusou este email; a conexão continua válida
+                resultados[email.id] = e
+                continue
+            except Exception as e:
+                # Conexão perdida: reconecta no próximo email
+                resultados[email.id] = e
+                try:
+                    server.close()
+                finally:
+                    server = None
+                continue
+
+            resultados[email.id] = None
+    finally:
+        if server is not None:
+            try:
+                server.quit()
+            except Exception:
+                server.close()
+    return resultados
+
+
+def _registrar_resultados(resultados: Dict[int, Optional[Exception]], agora: datetime) -> int:
+    """
+    Grava o resultado de um lote (enviado ou reagendado) numa transação curta
+
+    Returns:
+        Quantidade de emails enviados
+    """
+    enviados = 0
+    with Session(engine) as session:
+        emails = session.exec(
+            select(EmailOutbox).where(EmailOutbox.id.in_(resultados)).order_by(EmailOutbox.id).with_for_update()
+        ).all()
+        for email in emails:
+            erro = resultados[email.id]
+            if erro is None:
+                email.status = STATUS_ENVIADO
+                email.data_envio = datetime.utcnow()
+                email.ultimo_erro = None
+                enviados += 1
+            else:
+                _registrar_falha(email, erro, agora)
+            session.add(email)
+        session.commit()
+    if enviados:
+        logger.info(f"📧 {enviados}/{len(resultados)} emails enviados")
+    return enviados
+
+
+def processar_fila() -> int:
+    """
+    Envia os emails pendentes, lote a lote, até esvaziar a fila
+
+    Returns:
+        Quantidade de emails processados (enviados ou reagendados)
+    """
+    if not smtp_configurado():
+        logger.warning("⚠️ SMTP não configurado. Emails permanecem na fila.")
+        return 0
+
+    total = 0
+    while True:
+        _acordado.clear()
+        agora = datetime.utcnow()
+        try:
+            emails = _reservar_lote(agora)
+        except Exception as e:
+            logger.error(f"❌ Erro ao reservar emails da fila: {e}")
+            break
+        if not emails:
+            break
+
+        resultados = _enviar_lote(emails)
+        try:
+            _registrar_resultados(resultados, agora)
+        except Exception as e:
+            # Os emails continuam reservados e voltam para a fila após RESERVA_LOTE
+            logger.error(f"❌ Erro ao registrar o envio de emails: {e}")
+            break
+        total += len(emails)
+
+        # Lote incompleto e nada novo enfileirado durante o envio: fila vazia
+        if len(emails) < TAMANHO_LOTE and not _acordado.is_set():
+            break
+    return total
+
+
+def limpar_enviados() -> int:
+    """Remove da fila os emails enviados há mais de DIAS_RETENCAO dias"""
+    limite = datetime.utcnow() - timedelta(days=DIAS_RETENCAO)
+    with Session(engine) as session:
+        resultado = session.exec(
+            delete(EmailOutbox).where(EmailOutbox.status == STATUS_ENVIADO, EmailOutbox.data_envio < limite)
+        )
+        session.commit()
+    if resultado.rowcount:
+        logger.info(f"🧹 {resultado.rowcount} emails antigos removidos da fila")
+    return resultado.rowcount
+
+
+def estatisticas_fila(session: Session) -> Dict[str, int]:
+    """Quantidade de emails por status"""
+    linhas = session.exec(
+        select(EmailOutbox.status, func.count()).group_by(EmailOutbox.status)
+    ).all()
+    return {status: quantidade for status, quantidade in linhas}
+
+
+def start_email_outbox():
+    """
+    Inicia o envio de emails em background
+    Verifica a fila a cada INTERVALO_VERIFICACAO segundos e sempre que um email é enfileirado
+    """
+    global _scheduler
+    from apscheduler.schedulers.background import BackgroundScheduler
+
+    scheduler = BackgroundScheduler()
+
+    scheduler.add_job(
+        processar_fila,
+        'interval',
+        seconds=INTERVALO_VERIFICACAO,
+        id=JOB_ID,
+        name='Envio de Emails (outbox)',
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True,
+        next_run_time=datetime.now()  # Envia o que ficou pendente antes do restart
+    )
+
+    scheduler.add_job(
+        limpar_enviados,
+        'interval',
+        hours=24,
+        id='email_outbox_cleanup',
+        name='Limpeza da Fila de Emails',
+        replace_existing=True
+    )
+
+    scheduler.start()
+    _scheduler = scheduler
+    logger.info(f"📧 Envio de emails iniciado - Verificando a fila a cada {INTERVALO_VERIFICACAO}s")
+
+    return scheduler
@@ -1,12 +1,16 @@
 """
 Serviço de monitoramento de expiração de Avisos e Anúncios
-Verifica automaticamente se avisos/anúncios expiraram e os inativa
+Verifica automaticamente se avisos/anúncios expiraram e os inativa,
+e ativa conteúdos 'Agendado' quando a data de início chega
 """
 
 from datetime import datetime
 from sqlmodel import Session, select
 from app.db import engine
 from app.models import Aviso, Anuncio
+from app.services.dayparting import STATUS_AGENDADO
+from app.services.aviso_quota import LimiteAvisosExcedido, ajustar_contadores, sindicos_contados, verificar_limite
+from app.services.notificacoes import registrar_avisos_expirados, registrar_avisos_expirando
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -15,24 +19,29 @@ logger = logging.getLogger(__name__)
 def check_expired_content():
     """
     Verifica avisos e anúncios expirados e os inativa automaticamente
+    Avisos expirados e prestes a expirar entram no resumo de alertas dos síndicos
     """
     with Session(engine) as session:
         try:
             current_time = datetime.now()
-            avisos_inativados = 0
+            avisos_expirados = []
             anuncios_inativados = 0
             
             # 1. Verificar Avisos Expirados
-            avisos_ativos = session.exec(
-                select(Aviso).where(Aviso.status == "Ativo")
+            # (linhas bloqueadas até o commit, como no PUT/DELETE: o contador não é ajustado duas vezes)
+            avisos_vencidos = session.exec(
+                select(Aviso)
+                .where(Aviso.status == "Ativo", Aviso.data_expiracao <= current_time)
+                .order_by(Aviso.id)
+                .with_for_update()
             ).all()
             
-            for aviso in avisos_ativos:
-                if aviso.data_expiracao and aviso.data_expiracao <= current_time:
-                    aviso.status = "Inativo"
-                    session.add(aviso)
-                    avisos_inativados += 1
-                    logger.info(f"📋 Aviso ID {aviso.id} ('{aviso.nome}') expirado e inativado")
+            for aviso in avisos_vencidos:
+                ajustar_contadores(session, sindicos_contados(session, aviso.status, aviso.condominios_ids), set())
+                aviso.status = "Inativo"
+                session.add(aviso)
+                avisos_expirados.append(aviso)
+                logger.info(f"📋 Aviso ID {aviso.id} ('{aviso.nome}') expirado e inativado")
             
             # 2. Verificar Anúncios Expirados
             anuncios_ativos = session.exec(
@@ -46,10 +55,44 @@ def check_expired_content():
                     anuncios_inativados += 1
                     logger.info(f"📢 Anúncio ID {anuncio.id} ('{anuncio.nome}') expirado e inativado")
             
-            # 3. Commit das mudanças
-            if avisos_inativados > 0 or anuncios_inativados > 0:
+            # 3. Ativar (ou inativar, se já expirados) conteúdos agendados cujo início chegou
+            ativados = 0
+            for model in (Aviso, Anuncio):
+                agendados = session.exec(
+                    select(model).where(
+                        model.status == STATUS_AGENDADO,
+                        model.data_inicio <= current_time
+                    ).order_by(model.id).with_for_update()
+                ).all()
+                
+                for item in agendados:
+                    if item.data_expiracao and item.data_expiracao <= current_time:
+                        item.status = "Inativo"
+                        logger.info(f"⏭️ {model.__name__} ID {item.id} ('{item.nome}') expirou antes de iniciar e foi inativado")
+                    else:
+                        if model is Aviso:
+                            contados = sindicos_contados(session, "Ativo", item.condominios_ids)
+                            try:
+                                verificar_limite(session, contados)
+                            except LimiteAvisosExcedido as e:
+                                # Continua 'Agendado': é ativado quando o síndico liberar espaço
+                                logger.warning(f"⏸️ Aviso ID {item.id} ('{item.nome}') não ativado: {e}")
+                                continue
+                            ajustar_contadores(session, set(), contados)
+                        item.status = "Ativo"
+                        ativados += 1
+                        logger.info(f"▶️ {model.__name__} ID {item.id} ('{item.nome}') agendado e ativado")
+                    session.add(item)
+            
+            # 4. Alertas para o resumo dos síndicos
+            registrar_avisos_expirados(session, avisos_expirados)
+            alertas_expirando = registrar_avisos_expirando(session, current_time)
+            
+            # 5. Commit das mudanças
+            avisos_inativados = len(avisos_expirados)
+            if avisos_inativados > 0 or anuncios_inativados > 0 or ativados > 0 or alertas_expirando > 0:
                 session.commit()
-                logger.info(f"✅ Verificação completa: {avisos_inativados} avisos e {anuncios_inativados} anúncios inativados")
+                logger.info(f"✅ Verificação completa: {avisos_inativados} avisos e {anuncios_inativados} anúncios inativados, {ativados} agendados ativados")
             else:
                 logger.info("✅ Verificação completa: Nenhum conteúdo expirado encontrado")
                 
@@ -0,0 +1,485 @@
+"""
+Serviço de notícias
+Mantém um registro de feeds, busca todos em paralelo (com timeout por feed),
+remove duplicadas e guarda uma lista única ordenada por data em cache.
+O caminho da TV apenas lê o cache (stale-while-revalidate); a atualização
+roda em background e cada feed tem um circuit breaker próprio.
+"""
+
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from html import unescape
+from threading import Lock, Thread
+from typing import Callable, Dict, List, Optional
+from pydantic import BaseModel
+import logging
+import re
+import time
+import unicodedata
+import xml.etree.ElementTree as ET
+import requests
+
+from app.services.news_images import NEWS_IMAGE_PROXY, registrar_imagens
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Intervalo de atualização do cache de notícias
+NEWS_REFRESH_MINUTES = 5
+
+# Quantidade máxima de notícias mantidas no cache agregado
+NEWS_CACHE_LIMIT = 100
+
+# Idade a partir da qual o cache é considerado velho e revalidado em background
+NEWS_STALE_SECONDS = NEWS_REFRESH_MINUTES * 60
+
+# Circuit breaker: falhas seguidas para abrir e espera entre tentativas (dobra a cada falha)
+BREAKER_LIMITE_FALHAS = 3
+BREAKER_ESPERA_INICIAL = 30
+BREAKER_ESPERA_MAXIMA = 30 * 60
+
+_RE_HTML_TAG = re.compile(r'<[^<]+?>')
+_RE_IMG_SRC = re.compile(r'<img[^>]+src="([^"]+)"')
+_RE_NAO_ALFANUMERICO = re.compile(r'[^a-z0-9]+')
+
+
+class NewsItem(BaseModel):
+    title: str
+    description: Optional[str] = None
+    url: str
+    urlToImage: Optional[str] = None
+    publishedAt: str
+    source: str
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker de um feed
+
+    - fechado: chamadas normais
+    - aberto: após BREAKER_LIMITE_FALHAS falhas seguidas, o feed não é chamado
+      até o fim da espera (que dobra a cada nova falha, até BREAKER_ESPERA_MAXIMA)
+    - semi-aberto: espera terminou; a próxima atualização faz uma tentativa de teste
+      (get_news dispara essa atualização sem esperar NEWS_STALE_SECONDS, então
+      as esperas de 30s, 1min, 2min... valem mesmo sendo menores que o refresh)
+    """
+
+    def __init__(self):
+        self.falhas = 0
+        self.aberto_ate: Optional[float] = None  # time.monotonic()
+        self.ultimo_erro: Optional[str] = None
+        self.ultimo_sucesso: Optional[datetime] = None
+
+    @property
+    def estado(self) -> str:
+        if self.aberto_ate is None:
+            return "fechado"
+        return "aberto" if time.monotonic() < self.aberto_ate else "semi-aberto"
+
+    def permite(self) -> bool:
+        """Se o feed pode ser chamado agora"""
+        return self.estado != "aberto"
+
+    def sucesso(self):
+        self.falhas = 0
+        self.aberto_ate = None
+        self.ultimo_erro = None
+        self.ultimo_sucesso = datetime.now(timezone.utc)
+
+    def falha(self, erro: str):
+        self.falhas += 1
+        self.ultimo_erro = erro
+        if self.falhas >= BREAKER_LIMITE_FALHAS:
+            espera = min(BREAKER_ESPERA_INICIAL * 2 ** (self.falhas - BREAKER_LIMITE_FALHAS), BREAKER_ESPERA_MAXIMA)
+            self.aberto_ate = time.monotonic() + espera
+
+    def to_dict(self) -> dict:
+        restante = max(self.aberto_ate - time.monotonic(), 0) if self.aberto_ate else 0
+        return {
+            "state": self.estado,
+            "consecutive_failures": self.falhas,
+            "retry_in_seconds": round(restante),
+            "last_error": self.ultimo_erro,
+            "last_success": self.ultimo_sucesso
+        }
+
+
+class FeedSource:
+    """Feed registrado no agregador"""
+
+    def __init__(self, id: str, nome: str, url: str, fetch: Callable[["FeedSource"], Optional[List[NewsItem]]], timeout: float = 10):
+        self.id = id
+        self.nome = nome
+        self.url = url
+        self.fetch = fetch  # Retorna as notícias, ou None se o feed não mudou
+        self.timeout = timeout
+        # Validadores da última resposta (requisição condicional)
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.breaker = CircuitBreaker()
+
+
+# Registro de feeds: {id: FeedSource}
+FEEDS: Dict[str, FeedSource] = {}
+
+# Estado do cache
+_lock = Lock()
+_refresh_lock = Lock()
+_por_feed: Dict[str, List[NewsItem]] = {}
+_agregado: List[NewsItem] = []
+_atualizado_em: Optional[datetime] = None  # Último refresh com pelo menos um feed respondendo
+_tentado_em: Optional[datetime] = None  # Último refresh (mesmo com todos os feeds falhando)
+
+
+def register_feed(feed: FeedSource) -> FeedSource:
+    """Registra (ou substitui) um feed no agregador"""
+    FEEDS[feed.id] = feed
+    return feed
+
+
+def limpar_descricao(texto: str, limite: int = 200) -> str:
+    """Remove HTML e limita o tamanho da descrição"""
+    texto = _RE_HTML_TAG.sub('', texto or '').strip()
+    if len(texto) > limite:
+        texto = texto[:limite] + "..."
+    return texto
+
+
+def _titulo_normalizado(titulo: str) -> str:
+    """Título sem acentos, caixa e pontuação (para detectar a mesma notícia em feeds diferentes)"""
+    texto = unicodedata.normalize("NFKD", titulo.lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return _RE_NAO_ALFANUMERICO.sub(" ", texto).strip()
+
+
+def _data_publicacao(item: NewsItem) -> datetime:
+    """Converte publishedAt (RFC 822, ISO 8601 ou 'YYYY-MM-DD HH:MM:SS') em datetime UTC"""
+    valor = (item.publishedAt or "").strip()
+    try:
+        data = parsedate_to_datetime(valor)
+    except (TypeError, ValueError):
+        try:
+            data = datetime.fromisoformat(valor.replace("Z", "+00:00"))
+        except ValueError:
+            return datetime.min.replace(tzinfo=timezone.utc)
+    if data.tzinfo is None:
+        data = data.replace(tzinfo=timezone.utc)
+    return data
+
+
+def _mesclar(listas: List[List[NewsItem]]) -> List[NewsItem]:
+    """Remove duplicadas (URL ou título normalizado) e ordena da mais recente para a mais antiga"""
+    todos = sorted(
+        (item for lista in listas for item in lista),
+        key=_data_publicacao,
+        reverse=True
+    )
+
+    urls = set()
+    titulos = set()
+    resultado = []
+    for item in todos:
+        titulo = _titulo_normalizado(item.title)
+        if item.url in urls or titulo in titulos:
+            continue
+        urls.add(item.url)
+        titulos.add(titulo)
+        resultado.append(item)
+        if len(resultado) >= NEWS_CACHE_LIMIT:
+            break
+    return resultado
+
+
+# Namespaces usados por feeds RSS 2.0 / Atom
+_NS_ATOM = "{http://www.w3.org/2005/Atom}"
+_NS_CONTENT = "{http://purl.org/rss/1.0/modules/content/}"
+_NS_MEDIA = "{http://search.yahoo.com/mrss/}"
+
+_TAGS_ITEM = ("item", f"{_NS_ATOM}entry")
+
+USER_AGENT = "EXPO-TV/1.0 (+https://expotv.com.br)"
+
+
+def _texto(elem, *tags: str) -> str:
+    """Texto do primeiro filho encontrado entre as tags informadas"""
+    for tag in tags:
+        filho = elem.find(tag)
+        if filho is not None and filho.text:
+            return filho.text.strip()
+    return ""
+
+
+def _imagem(elem, html: str) -> str:
+    """Imagem da notícia: media:content/thumbnail, enclosure de imagem ou <img> no HTML"""
+    for tag in (f"{_NS_MEDIA}content", f"{_NS_MEDIA}thumbnail"):
+        filho = elem.find(tag)
+        if filho is not None and filho.get("url"):
+            return filho.get("url")
+
+    enclosure = elem.find("enclosure")
+    if enclosure is not None and (enclosure.get("type") or "").startswith("image/"):
+        return enclosure.get("url", "")
+
+    img_match = _RE_IMG_SRC.search(html)
+    return img_match.group(1) if img_match else ""
+
+
+def _link(elem) -> str:
+    """Link da notícia (RSS: <link>texto</link>; Atom: <link rel="alternate" href=...>)"""
+    link = _texto(elem, "link")
+    if link:
+        return link
+    for filho in elem.findall(f"{_NS_ATOM}link"):
+        if filho.get("rel", "alternate") == "alternate" and filho.get("href"):
+            return filho.get("href")
+    return ""
+
+
+def parse_feed(stream, fonte: str) -> List[NewsItem]:
+    """
+    Lê um feed RSS 2.0 ou Atom de forma incremental (iterparse)
+
+    Cada <item>/<entry> é convertido assim que termina e descartado da árvore,
+    então a memória não cresce com o tamanho do feed.
+
+    Args:
+        stream: Arquivo/stream com o XML do feed
+        fonte: Nome exibido como source das notícias
+    """
+    news_items = []
+    for _, elem in ET.iterparse(stream, events=("end",)):
+        if elem.tag not in _TAGS_ITEM:
+            continue
+
+        html = _texto(elem, f"{_NS_CONTENT}encoded", f"{_NS_ATOM}content")
+        descricao = _texto(elem, "description", f"{_NS_ATOM}summary") or html
+
+        news_item = NewsItem(
+            title=unescape(_texto(elem, "title", f"{_NS_ATOM}title")),
+            description=limpar_descricao(unescape(descricao)),
+            url=_link(elem),
+            urlToImage=_imagem(elem, html or descricao),
+            publishedAt=_texto(elem, "pubDate", f"{_NS_ATOM}published", f"{_NS_ATOM}updated") or datetime.now().isoformat() + "Z",
+            source=fonte
+        )
+        elem.clear()
+
+        if news_item.title:
+            news_items.append(news_item)
+
+    return news_items
+
+
+def _fetch_rss(feed: FeedSource) -> Optional[List[NewsItem]]:
+    """
+    Busca o feed diretamente na origem usando requisição condicional
+
+    Envia If-None-Match / If-Modified-Since com os valores da última resposta;
+    se o feed não mudou, a origem responde 304 e nada é baixado ou parseado.
+
+    Returns:
+        Lista de notícias, ou None se o feed não mudou (304)
+    """
+    headers = {"User-Agent": USER_AGENT}
+    if feed.etag:
+        headers["If-None-Match"] = feed.etag
+    if feed.last_modified:
+        headers["If-Modified-Since"] = feed.last_modified
+
+    with requests.get(feed.url, headers=headers, timeout=feed.timeout, stream=True) as response:
+        if response.status_code == 304:
+            return None
+        response.raise_for_status()
+
+        response.raw.decode_content = True  # Descompactar gzip/deflate durante a leitura
+        news_items = parse_feed(response.raw, feed.nome)
+
+        feed.etag = response.headers.get("ETag")
+        feed.last_modified = response.headers.get("Last-Modified")
+
+    return news_items
+
+
+register_feed(FeedSource(
+    id="jovempan",
+    nome="🎙️ Jovem Pan",
+    url="https://jovempan.com.br/feed/",
+    fetch=_fetch_rss
+))
+
+
+def refresh_news() -> int:
+    """
+    Atualiza o cache buscando todos os feeds em paralelo
+
+    Cada feed tem seu próprio timeout; um feed lento ou com erro mantém as
+    últimas notícias obtidas dele e não atrasa os demais. Feeds com o
+    circuit breaker aberto não são chamados.
+
+    O horário de atualização (idade/stale em /app/status) só avança quando
+    pelo menos um feed responde; com todos falhando o cache continua velho.
+
+    Returns:
+        Total de notícias no cache após a atualização
+    """
+    global _agregado, _atualizado_em, _tentado_em
+
+    if not _refresh_lock.acquire(blocking=False):
+        return len(_agregado)  # Já existe uma atualização em andamento
+
+    try:
+        feeds = list(FEEDS.values())
+        if not feeds:
+            return 0
+
+        chamados = [feed for feed in feeds if feed.breaker.permite()]
+        for feed in feeds:
+            if feed not in chamados:
+                logger.info(f"📰 Feed '{feed.id}': circuit breaker aberto, mantendo cache")
+
+        executor = ThreadPoolExecutor(max_workers=max(len(chamados), 1), thread_name_prefix="news")
+        inicio = time.monotonic()
+        futures = [(executor.submit(feed.fetch, feed), feed) for feed in chamados]
+        respondidos = 0
+
+        for future, feed in futures:
+            # Prazo de cada feed conta a partir do disparo (todos rodam em paralelo)
+            restante = max(inicio + feed.timeout - time.monotonic(), 0)
+            try:
+                items = future.result(timeout=restante)
+                feed.breaker.sucesso()
+                respondidos += 1
+                if items is None:
+                    logger.info(f"📰 Feed '{feed.id}': não modificado (304)")
+                    continue
+                with _lock:
+                    _por_feed[feed.id] = items
+                logger.info(f"📰 Feed '{feed.id}': {len(items)} notícias")
+            except FuturesTimeout:
+                feed.breaker.falha(f"timeout de {feed.timeout}s")
+                logger.warning(f"📰 Feed '{feed.id}' excedeu o timeout de {feed.timeout}s")
+            except Exception as e:
+                feed.breaker.falha(str(e))
+                logger.error(f"❌ Erro ao buscar feed '{feed.id}': {e}")
+
+        # Não espera feeds travados: as threads terminam sozinhas pelo timeout do requests
+        executor.shutdown(wait=False)
+
+        with _lock:
+            agregado = _mesclar([_por_feed.get(feed.id, []) for feed in feeds])
+
+        if NEWS_IMAGE_PROXY:
+            # Imagens servidas redimensionadas pelo proxy (/app/news/image/{chave}.webp)
+            proxies = registrar_imagens(item.urlToImage for item in agregado)
+            agregado = [
+                item.model_copy(update={"urlToImage": proxies[item.urlToImage]})
+                if item.urlToImage in proxies else item
+                for item in agregado
+            ]
+
+        with _lock:
+            _agregado = agregado
+            _tentado_em = datetime.now(timezone.utc)
+            if respondidos:
+                _atualizado_em = _tentado_em
+            else:
+                logger.warning("📰 Nenhum feed respondeu; mantendo as últimas notícias (cache desatualizado)")
+            return len(_agregado)
+    finally:
+        _refresh_lock.release()
+
+
+def _refresh_em_background():
+    Thread(target=refresh_news, name="news-refresh", daemon=True).start()
+
+
+def _idade(momento: Optional[datetime]) -> Optional[float]:
+    """Segundos desde o momento (None se nunca aconteceu)"""
+    if momento is None:
+        return None
+    return (datetime.now(timezone.utc) - momento).total_seconds()
+
+
+def _idade_cache() -> Optional[float]:
+    """Segundos desde a última atualização bem-sucedida (None se nunca carregado)"""
+    return _idade(_atualizado_em)
+
+
+def get_news(limit: int = 15, feed_id: Optional[str] = None) -> List[NewsItem]:
+    """
+    Retorna notícias do cache (nunca faz requisição externa no caminho da chamada)
+
+    Stale-while-revalidate: se a última atualização foi há mais de
+    NEWS_STALE_SECONDS (ou o cache ainda não foi carregado), devolve o que tem
+    e dispara a atualização em background. Falhas dos feeds nunca apagam as últimas notícias boas.
+    Um feed com o circuit breaker semi-aberto também dispara a atualização,
+    que faz a tentativa de teste assim que a espera do breaker termina.
+
+    Args:
+        limit: Número máximo de notícias
+        feed_id: Restringe a um feed específico (ex.: 'jovempan')
+    """
+    with _lock:
+        # Ritmo das tentativas: com os feeds fora do ar, não dispara um refresh por chamada
+        idade = _idade(_tentado_em)
+        if feed_id:
+            nome = FEEDS[feed_id].nome if feed_id in FEEDS else None
+            items = [item for item in _agregado if item.source == nome]
+        else:
+            items = _agregado
+
+    velho = idade is None or idade > NEWS_STALE_SECONDS
+    testar_feed = any(feed.breaker.estado == "semi-aberto" for feed in FEEDS.values())
+    if (velho or testar_feed) and not _refresh_lock.locked():
+        _refresh_em_background()
+
+    return items[:limit]
+
+
+def get_news_status() -> dict:
+    """Informações do cache de notícias (para status/monitoramento)"""
+    with _lock:
+        idade = _idade_cache()
+        return {
+            "cached_items": len(_agregado),
+            "updated_at": _atualizado_em,
+            "age_seconds": round(idade) if idade is not None else None,
+            "stale": idade is None or idade > NEWS_STALE_SECONDS,
+            "refreshing": _refresh_lock.locked(),
+            "feeds": {
+                feed.id: {
+                    "name": feed.nome,
+                    "cached_items": len(_por_feed.get(feed.id, [])),
+                    "breaker": feed.breaker.to_dict()
+                }
+                for feed in FEEDS.values()
+            }
+        }
+
+
+def start_news_refresher():
+    """
+    Inicia a atualização periódica das notícias em background
+    Atualiza a cada NEWS_REFRESH_MINUTES minutos
+    """
+    from apscheduler.schedulers.background import BackgroundScheduler
+
+    scheduler = BackgroundScheduler()
+
+    scheduler.add_job(
+        refresh_news,
+        'interval',
+        minutes=NEWS_REFRESH_MINUTES,
+        id='news_refresher',
+        name='Atualização do Cache de Notícias',
+        replace_existing=True
+    )
+
+    # Carregar imediatamente ao iniciar (em background para não atrasar o startup)
+    _refresh_em_background()
+
+    scheduler.start()
+    logger.info(f"📰 Atualização de notícias iniciada - A cada {NEWS_REFRESH_MINUTES} minutos")
+
+    return scheduler
@@ -0,0 +1,181 @@
+"""
+Proxy de imagens das notícias
+Baixa cada thumbnail uma única vez, redimensiona para o tamanho da TV,
+converte para WebP e guarda em um cache LRU em disco. As URLs das notícias
+são reescritas para apontar para o endpoint /app/news/image/{chave}.webp
+"""
+
+from io import BytesIO
+from pathlib import Path
+from threading import Lock
+from typing import Dict, Iterable, Optional
+import hashlib
+import logging
+import os
+import tempfile
+
+from PIL import Image, ImageOps
+import requests
+
+# Carregar variáveis de ambiente do .env
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except ImportError:
+    pass  # Em produção, variáveis já estarão no ambiente
+
+logger = logging.getLogger(__name__)
+
+# URL pública do backend (usada para montar as URLs do proxy)
+BACKEND_URL = os.getenv("BACKEND_URL", "https://expotv-backend.fly.dev").rstrip("/")
+
+# Desligar com NEWS_IMAGE_PROXY=false para manter as URLs originais das notícias
+NEWS_IMAGE_PROXY = os.getenv("NEWS_IMAGE_PROXY", "true").lower() == "true"
+
+# Diretório e tamanho máximo do cache em disco
+NEWS_IMAGE_DIR = Path(os.getenv("NEWS_IMAGE_DIR", os.path.join(tempfile.gettempdir(), "expotv-news-images")))
+NEWS_IMAGE_CACHE_MAX_BYTES = int(os.getenv("NEWS_IMAGE_CACHE_MAX_MB", "200")) * 1024 * 1024
+
+# Dimensões máximas (mantém a proporção) e qualidade do WebP
+LARGURA_MAXIMA = 960
+ALTURA_MAXIMA = 540
+QUALIDADE_WEBP = 75
+
+# Limite de download da imagem original
+TAMANHO_MAXIMO_ORIGEM = 15 * 1024 * 1024
+TIMEOUT_ORIGEM = 10
+
+# Chave -> URL original; só imagens presentes no cache de notícias podem ser buscadas
+_origens: Dict[str, str] = {}
+_origens_lock = Lock()
+
+# Um lock por chave evita baixar/converter a mesma imagem em paralelo
+_locks_chave: Dict[str, Lock] = {}
+_cache_lock = Lock()
+_tamanho_cache: Optional[int] = None
+
+
+def chave_imagem(url: str) -> str:
+    """Chave estável (hash) da URL original"""
+    return hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+
+
+def url_proxy(chave: str) -> str:
+    return f"{BACKEND_URL}/app/news/image/{chave}.webp"
+
+
+def registrar_imagens(urls: Iterable[str]) -> Dict[str, str]:
+    """
+    Substitui o registro de imagens conhecidas pelas URLs informadas
+
+    Returns:
+        Mapa {url_original: url_proxy}
+    """
+    origens = {chave_imagem(url): url for url in urls if url and url.startswith(("http://", "https://"))}
+    with _origens_lock:
+        _origens.clear()
+        _origens.update(origens)
+    return {url: url_proxy(chave) for chave, url in origens.items()}
+
+
+def url_origem(chave: str) -> Optional[str]:
+    with _origens_lock:
+        return _origens.get(chave)
+
+
+def _caminho(chave: str) -> Path:
+    return NEWS_IMAGE_DIR / f"{chave}.webp"
+
+
+def _baixar(url: str) -> bytes:
+    """Baixa a imagem original respeitando TAMANHO_MAXIMO_ORIGEM"""
+    with requests.get(url, timeout=TIMEOUT_ORIGEM, stream=True) as response:
+        response.raise_for_status()
+        conteudo = bytearray()
+        for bloco in response.iter_content(64 * 1024):
+            conteudo.extend(bloco)
+            if len(conteudo) > TAMANHO_MAXIMO_ORIGEM:
+                raise ValueError(f"Imagem maior que {TAMANHO_MAXIMO_ORIGEM // (1024 * 1024)}MB")
+        return bytes(conteudo)
+
+
+def converter_webp(conteudo: bytes) -> bytes:
+    """Redimensiona para LARGURA_MAXIMA x ALTURA_MAXIMA (sem ampliar) e converte para WebP"""
+    with Image.open(BytesIO(conteudo)) as imagem:
+        imagem = ImageOps.exif_transpose(imagem)
+        imagem.thumbnail((LARGURA_MAXIMA, ALTURA_MAXIMA))
+        if imagem.mode not in ("RGB", "RGBA"):
+            imagem = imagem.convert("RGBA" if "transparency" in imagem.info else "RGB")
+
+        saida = BytesIO()
+        imagem.save(saida, "WEBP", quality=QUALIDADE_WEBP, method=4)
+        return saida.getvalue()
+
+
+def _limpar_cache(novo_arquivo: int):
+    """Soma o arquivo novo ao total e remove os menos usados se passar do limite"""
+    global _tamanho_cache
+
+    with _cache_lock:
+        if _tamanho_cache is None:
+            _tamanho_cache = sum(p.stat().st_size for p in NEWS_IMAGE_DIR.glob("*.webp"))
+        else:
+            _tamanho_cache += novo_arquivo
+
+        if _tamanho_cache <= NEWS_IMAGE_CACHE_MAX_BYTES:
+            return
+
+        # LRU: o mtime é atualizado a cada acesso
+        arquivos = sorted(NEWS_IMAGE_DIR.glob("*.webp"), key=lambda p: p.stat().st_mtime)
+        for arquivo in arquivos:
+            if _tamanho_cache <= NEWS_IMAGE_CACHE_MAX_BYTES * 0.9:
+                break
+            try:
+                tamanho = arquivo.stat().st_size
+                arquivo.unlink()
+                _tamanho_cache -= tamanho
+            except FileNotFoundError:
+                pass
+
+
+def obter_imagem(chave: str) -> Optional[Path]:
+    """
+    Caminho do WebP em cache, baixando e convertendo na primeira vez
+
+    Returns:
+        Path do arquivo, ou None se a chave não pertence a nenhuma notícia
+
+    Raises:
+        Exception: Se não for possível baixar ou converter a imagem
+    """
+    if len(chave) != 32 or not all(c in "0123456789abcdef" for c in chave):
+        return None
+
+    caminho = _caminho(chave)
+    if caminho.exists():
+        os.utime(caminho)  # Marca como usado recentemente
+        return caminho
+
+    url = url_origem(chave)
+    if not url:
+        return None
+
+    with _cache_lock:
+        lock = _locks_chave.setdefault(chave, Lock())
+
+    with lock:
+        if not caminho.exists():
+            webp = converter_webp(_baixar(url))
+
+            NEWS_IMAGE_DIR.mkdir(parents=True, exist_ok=True)
+            temporario = caminho.with_suffix(".tmp")
+            temporario.write_bytes(webp)
+            os.replace(temporario, caminho)
+
+            logger.info(f"🖼️ Imagem de notícia em cache: {chave} ({len(webp) // 1024}KB)")
+            _limpar_cache(len(webp))
+
+    with _cache_lock:
+        _locks_chave.pop(chave, None)
+
+    return caminho
@@ -0,0 +1,291 @@
+"""
+Resumo (digest) de alertas para os síndicos
+Os monitores registram eventos (TV offline, aviso expirando/expirado) na
+tabela notificacao_evento, na mesma transação em que alteram o status. Um job
+periódico agrupa os eventos pendentes por síndico e enfileira um único email
+por síndico por janela na fila de emails (enviada em lotes com uma conexão
+SMTP), em vez de um email por evento.
+"""
+
+from datetime import datetime, timedelta
+from html import escape
+from typing import Dict, Iterable, List, Set, Tuple
+import logging
+import os
+
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from app.db import engine
+from app.email_service import Bloco, send_templated
+from app.models import Aviso, Condominio, NotificacaoEvento, TV, User
+from app.services.content_links import ids_csv
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TIPO_TV_OFFLINE = "tv_offline"
+TIPO_AVISO_EXPIRANDO = "aviso_expirando"
+TIPO_AVISO_EXPIRADO = "aviso_expirado"
+
+# Ordem e título das seções do email
+SECOES = [
+    (TIPO_TV_OFFLINE, "📺 TVs offline"),
+    (TIPO_AVISO_EXPIRANDO, "⏳ Avisos que expiram nas próximas 24h"),
+    (TIPO_AVISO_EXPIRADO, "📋 Avisos expirados e inativados"),
+]
+
+# Janela do resumo: no máximo um email por síndico a cada DIGEST_WINDOW_MINUTES
+JANELA_MINUTOS = int(os.getenv("DIGEST_WINDOW_MINUTES", "60"))
+
+# Avisos que expiram dentro deste prazo geram alerta (uma vez por data de expiração)
+ANTECEDENCIA_EXPIRACAO = timedelta(hours=24)
+
+# Itens listados por seção (o restante aparece como "... e mais N")
+MAX_ITENS_POR_SECAO = 30
+
+# Eventos já enviados ficam na tabela por este período
+DIAS_RETENCAO = 30
+
+
+def _condominios(session: Session, ids: Iterable[int]) -> Dict[int, Tuple[int, str]]:
+    """Mapa {condominio_id: (sindico_id, nome)} em uma única consulta"""
+    ids = set(ids)
+    if not ids:
+        return {}
+    linhas = session.exec(
+        select(Condominio.id, Condominio.sindico_id, Condominio.nome).where(Condominio.id.in_(ids))
+    ).all()
+    return {cond_id: (sindico_id, nome) for cond_id, sindico_id, nome in linhas}
+
+
+def registrar_tvs_offline(session: Session, tvs: Iterable[TV]) -> int:
+    """
+    Registra um evento por TV que ficou offline (não faz commit)
+
+    Returns:
+        Quantidade de eventos registrados
+    """
+    tvs = list(tvs)
+    condominios = _condominios(session, (tv.condominio_id for tv in tvs))
+
+    registrados = 0
+    for tv in tvs:
+        sindico_id, nome_condominio = condominios.get(tv.condominio_id, (None, None))
+        if not sindico_id:
+            continue
+        ultimo_sinal = tv.last_ping.strftime("%d/%m %H:%M") if tv.last_ping else "nunca"
+        session.add(NotificacaoEvento(
+            sindico_id=sindico_id,
+            tipo=TIPO_TV_OFFLINE,
+            referencia=f"tv:{tv.id}",
+            descricao=f"TV '{tv.nome}' - {nome_condominio} (último sinal: {ultimo_sinal})"
+        ))
+        registrados += 1
+    return registrados
+
+
+def _registrar_avisos(session: Session, avisos: List[Aviso], tipo: str, referencia, descricao) -> int:
+    """Um evento por aviso e síndico dono de algum dos seus condomínios"""
+    condominios = _condominios(session, (cond_id for aviso in avisos for cond_id in ids_csv(aviso.condominios_ids)))
+
+    registrados = 0
+    for aviso in avisos:
+        por_sindico: Dict[int, List[str]] = {}
+        for cond_id in ids_csv(aviso.condominios_ids):
+            if cond_id in condominios:
+                sindico_id, nome_condominio = condominios[cond_id]
+                por_sindico.setdefault(sindico_id, []).append(nome_condominio)
+
+        for sindico_id, nomes in por_sindico.items():
+            session.add(NotificacaoEvento(
+                sindico_id=sindico_id,
+                tipo=tipo,
+                referencia=referencia(aviso),
+                descricao=f"{descricao(aviso)} - {', '.join(nomes)}"
+            ))
+            registrados += 1
+    return registrados
+
+
+def registrar_avisos_expirados(session: Session, avisos: Iterable[Aviso]) -> int:
+    """Registra os avisos inativados por expiração (não faz commit)"""
+    return _registrar_avisos(
+        session, list(avisos), TIPO_AVISO_EXPIRADO,
+        referencia=lambda aviso: f"aviso:{aviso.id}",
+        descricao=lambda aviso: f"Aviso '{aviso.nome}' expirou em {aviso.data_expiracao:%d/%m %H:%M}"
+    )
+
+
+def registrar_avisos_expirando(session: Session, agora: datetime) -> int:
+    """
+    Registra os avisos ativos que expiram em até ANTECEDENCIA_EXPIRACAO (não faz commit)
+
+    Cada aviso gera alerta uma única vez por data de expiração (a referência
+    inclui a data), mesmo com o monitor rodando de hora em hora.
+    """
+    avisos = session.exec(
+        select(Aviso).where(
+            Aviso.status == "Ativo",
+            Aviso.data_expiracao > agora,
+            Aviso.data_expiracao <= agora + ANTECEDENCIA_EXPIRACAO
+        )
+    ).all()
+    if not avisos:
+        return 0
+
+    def referencia(aviso: Aviso) -> str:
+        return f"aviso:{aviso.id}:{aviso.data_expiracao:%Y%m%d%H%M}"
+
+    ja_registrados = set(session.exec(
+        select(NotificacaoEvento.referencia).where(
+            NotificacaoEvento.tipo == TIPO_AVISO_EXPIRANDO,
+            NotificacaoEvento.referencia.in_([referencia(aviso) for aviso in avisos])
+        )
+    ).all())
+
+    return _registrar_avisos(
+        session, [aviso for aviso in avisos if referencia(aviso) not in ja_registrados], TIPO_AVISO_EXPIRANDO,
+        referencia=referencia,
+        descricao=lambda aviso: f"Aviso '{aviso.nome}' expira em {aviso.data_expiracao:%d/%m %H:%M}"
+    )
+
+
+def _tvs_recuperadas(session: Session, eventos: List[NotificacaoEvento]) -> Set[str]:
+    """Referências ("tv:{id}") dos eventos de TV offline cuja TV já voltou a ficar online"""
+    ids = {
+        int(evento.referencia.split(":", 1)[1])
+        for evento in eventos
+        if evento.tipo == TIPO_TV_OFFLINE and evento.referencia.split(":", 1)[1].isdigit()
+    }
+    if not ids:
+        return set()
+    online = session.exec(select(TV.id).where(TV.id.in_(ids), TV.status == "online")).all()
+    return {f"tv:{tv_id}" for tv_id in online}
+
+
+def montar_secoes(eventos: List[NotificacaoEvento]) -> Tuple[int, Bloco]:
+    """
+    Agrupa os eventos por tipo (sem repetir a mesma referência)
+
+    Returns:
+        (total de alertas, seções em texto e HTML)
+    """
+    por_tipo: Dict[str, Dict[str, str]] = {}
+    for evento in eventos:
+        por_tipo.setdefault(evento.tipo, {})[evento.referencia] = evento.descricao
+
+    texto = []
+    html = []
+    total = 0
+    for tipo, titulo in SECOES:
+        descricoes = list(por_tipo.get(tipo, {}).values())
+        if not descricoes:
+            continue
+        total += len(descricoes)
+        listados = descricoes[:MAX_ITENS_POR_SECAO]
+        restantes = len(descricoes) - len(listados)
+
+        texto.append(f"{titulo} ({len(descricoes)})")
+        texto.extend(f"  - {descricao}" for descricao in listados)
+        html.append(f"<h3>{escape(titulo)} ({len(descricoes)})</h3>")
+        html.append("<ul>" + "".join(f"<li>{escape(descricao)}</li>" for descricao in listados) + "</ul>")
+        if restantes:
+            texto.append(f"  ... e mais {restantes}")
+            html.append(f"<p>... e mais {restantes}</p>")
+        texto.append("")
+
+    return total, Bloco("\n".join(texto).rstrip(), "\n".join(html))
+
+
+def enviar_digests() -> int:
+    """
+    Enfileira um email de resumo para cada síndico com eventos pendentes
+
+    Returns:
+        Quantidade de emails enfileirados
+    """
+    agora = datetime.utcnow()
+    with Session(engine) as session:
+        try:
+            # SKIP LOCKED: duas máquinas não enviam o mesmo resumo
+            eventos = session.exec(
+                select(NotificacaoEvento)
+                .where(NotificacaoEvento.enviado_em == None)  # noqa: E711
+                .order_by(NotificacaoEvento.sindico_id, NotificacaoEvento.id)
+                .with_for_update(skip_locked=True)
+            ).all()
+            if not eventos:
+                return 0
+
+            por_sindico: Dict[int, List[NotificacaoEvento]] = {}
+            for evento in eventos:
+                por_sindico.setdefault(evento.sindico_id, []).append(evento)
+            sindicos = {
+                user.id: user
+                for user in session.exec(select(User).where(User.id.in_(por_sindico.keys()))).all()
+            }
+
+            # TV que voltou antes do envio: o alerta é descartado (marcado como enviado)
+            recuperadas = _tvs_recuperadas(session, eventos)
+
+            enfileirados = 0
+            for sindico_id, eventos_sindico in por_sindico.items():
+                sindico = sindicos.get(sindico_id)
+                pendentes = [
+                    evento for evento in eventos_sindico
+                    if not (evento.tipo == TIPO_TV_OFFLINE and evento.referencia in recuperadas)
+                ]
+                if pendentes and sindico and sindico.email:
+                    total, secoes = montar_secoes(pendentes)
+                    send_templated(
+                        "digest",
+                        {"user_name": sindico.nome, "total": total, "secoes": secoes},
+                        to_email=sindico.email,
+                        session=session
+                    )
+                    enfileirados += 1
+                for evento in eventos_sindico:
+                    evento.enviado_em = agora
+                    session.add(evento)
+
+            session.exec(
+                delete(NotificacaoEvento).where(NotificacaoEvento.enviado_em < agora - timedelta(days=DIAS_RETENCAO))
+            )
+            session.commit()
+            logger.info(
+                f"🔔 {enfileirados} resumo(s) de alertas enfileirado(s) ({len(eventos)} eventos, "
+                f"{len(recuperadas)} TV(s) já online descartada(s))"
+            )
+            return enfileirados
+
+        except Exception as e:
+            logger.error(f"❌ Erro ao enviar resumos de alertas: {e}")
+            session.rollback()
+            return 0
+
+
+def start_digest_sender():
+    """
+    Inicia o envio dos resumos de alertas em background
+    Envia a cada JANELA_MINUTOS minutos
+    """
+    from apscheduler.schedulers.background import BackgroundScheduler
+
+    scheduler = BackgroundScheduler()
+
+    scheduler.add_job(
+        enviar_digests,
+        'interval',
+        minutes=JANELA_MINUTOS,
+        id='digest_sender',
+        name='Resumo de Alertas dos Síndicos',
+        replace_existing=True,
+        max_instances=1,
+        coalesce=True
+    )
+
+    scheduler.start()
+    logger.info(f"🔔 Resumo de alertas iniciado - Enviando a cada {JANELA_MINUTOS} minutos")
+
+    return scheduler
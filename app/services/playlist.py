@@ -0,0 +1,186 @@
+"""
+Motor de intercalação de conteúdo das TVs (playlist)
+Calcula a sequência avisos/anúncios/notícias por aritmética de índices
+sobre o ciclo de proporção, sem depender de banco ou de FastAPI
+"""
+
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Tamanho mínimo da playlist gerada para a TV
+TAMANHO_MINIMO_PADRAO = 30
+
+TIPO_AVISO = "aviso"
+TIPO_ANUNCIO = "anuncio"
+TIPO_NOTICIA = "noticia"
+
+
+def slots_por_ciclo(
+    total_avisos: int,
+    total_anuncios: int,
+    total_noticias: int,
+    proporcao_avisos: int,
+    proporcao_anuncios: int,
+    proporcao_noticias: int,
+) -> Tuple[int, int, int]:
+    """
+    Calcula quantas posições de cada tipo um ciclo efetivamente ocupa
+
+    - Tipos sem itens não ocupam posição no ciclo
+    - Aviso/anúncio com um único item aparece no máximo 1x por ciclo
+      (evita repetir o MESMO item em sequência)
+    - Notícias podem repetir: é melhor repetir do que sumir da playlist
+
+    Returns:
+        Tupla (avisos, anuncios, noticias) por ciclo
+    """
+    proporcao_avisos = max(proporcao_avisos, 0)
+    proporcao_anuncios = max(proporcao_anuncios, 0)
+    proporcao_noticias = max(proporcao_noticias, 0)
+
+    avisos = proporcao_avisos if total_avisos > 1 else min(proporcao_avisos, total_avisos)
+    anuncios = proporcao_anuncios if total_anuncios > 1 else min(proporcao_anuncios, total_anuncios)
+    noticias = proporcao_noticias if total_noticias > 0 else 0
+
+    return avisos, anuncios, noticias
+
+
+def estatisticas_playlist(
+    total_avisos: int,
+    total_anuncios: int,
+    total_noticias: int,
+    proporcao_avisos: int,
+    proporcao_anuncios: int,
+    proporcao_noticias: int,
+    tamanho_minimo: int = TAMANHO_MINIMO_PADRAO,
+) -> Dict[str, int]:
+    """
+    Calcula as estatísticas da playlist sem montá-la
+
+    Útil para pré-visualização e para saber quantas posições de anúncio
+    uma playlist terá antes de planejar a rotação.
+    """
+    total_natural = total_avisos + total_anuncios + total_noticias
+    if total_natural == 0:
+        return {"total_items": 0, "avisos": 0, "anuncios": 0, "noticias": 0}
+
+    slots_aviso, slots_anuncio, slots_noticia = slots_por_ciclo(
+        total_avisos, total_anuncios, total_noticias,
+        proporcao_avisos, proporcao_anuncios, proporcao_noticias,
+    )
+    tamanho_ciclo = slots_aviso + slots_anuncio + slots_noticia
+
+    if tamanho_ciclo == 0:
+        return {
+            "total_items": total_natural,
+            "avisos": total_avisos,
+            "anuncios": total_anuncios,
+            "noticias": total_noticias,
+        }
+
+    target_size = max(total_natural, tamanho_minimo)
+    ciclos_completos, resto = divmod(target_size, tamanho_ciclo)
+    fim_aviso = slots_aviso
+    fim_anuncio = slots_aviso + slots_anuncio
+
+    return {
+        "total_items": target_size,
+        "avisos": ciclos_completos * slots_aviso + min(resto, fim_aviso),
+        "anuncios": ciclos_completos * slots_anuncio + max(min(resto, fim_anuncio) - fim_aviso, 0),
+        "noticias": ciclos_completos * slots_noticia + max(resto - fim_anuncio, 0),
+    }
+
+
+def build_playlist(
+    avisos: Sequence[Any],
+    anuncios: Sequence[Any],
+    noticias: Sequence[Any],
+    proporcao_avisos: int,
+    proporcao_anuncios: int,
+    proporcao_noticias: int,
+    tamanho_minimo: int = TAMANHO_MINIMO_PADRAO,
+    ordem_anuncios: Optional[Sequence[int]] = None,
+    inicio_anuncios: int = 0,
+) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Monta a playlist intercalada e as estatísticas em uma única passada
+
+    A posição p da playlist pertence ao ciclo p // L (L = tamanho do ciclo)
+    e ao slot p % L; o item de cada tipo é escolhido pelo contador global
+    daquele tipo (ciclo * slots_do_tipo + offset), em rodízio circular.
+
+    Cada item de origem é embrulhado uma única vez em {"type", "data"} e a
+    mesma referência é reutilizada nas repetições.
+
+    Args:
+        avisos, anuncios, noticias: Listas de conteúdo já filtradas
+        proporcao_*: Proporção configurada na TV (notícias já efetiva)
+        tamanho_minimo: Tamanho mínimo da playlist
+        ordem_anuncios: Sequência de índices de anúncios a percorrer em rodízio
+            (ex.: gerada por app.services.ad_scheduler); padrão: ordem da lista
+        inicio_anuncios: Posição inicial na sequência de anúncios
+
+    Returns:
+        Tupla (content, stats) no formato do endpoint da TV
+    """
+    total_natural = len(avisos) + len(anuncios) + len(noticias)
+
+    if total_natural == 0:
+        return [], {"total_items": 0, "avisos": 0, "anuncios": 0, "noticias": 0}
+
+    itens_aviso = [{"type": TIPO_AVISO, "data": item} for item in avisos]
+    itens_anuncio = [{"type": TIPO_ANUNCIO, "data": item} for item in anuncios]
+    itens_noticia = [{"type": TIPO_NOTICIA, "data": item} for item in noticias]
+
+    slots_aviso, slots_anuncio, slots_noticia = slots_por_ciclo(
+        len(avisos), len(anuncios), len(noticias),
+        proporcao_avisos, proporcao_anuncios, proporcao_noticias,
+    )
+    tamanho_ciclo = slots_aviso + slots_anuncio + slots_noticia
+
+    # Nenhum tipo com conteúdo tem proporção configurada: apenas concatena
+    if tamanho_ciclo == 0:
+        content = itens_aviso + itens_anuncio + itens_noticia
+        return content, {
+            "total_items": len(content),
+            "avisos": len(itens_aviso),
+            "anuncios": len(itens_anuncio),
+            "noticias": len(itens_noticia),
+        }
+
+    target_size = max(total_natural, tamanho_minimo)
+    ciclos_completos, resto = divmod(target_size, tamanho_ciclo)
+
+    # Limites dos slots dentro do ciclo: [0, fim_aviso) avisos, [fim_aviso, fim_anuncio) anúncios
+    fim_aviso = slots_aviso
+    fim_anuncio = slots_aviso + slots_anuncio
+
+    n_aviso = len(itens_aviso)
+    n_noticia = len(itens_noticia)
+
+    if ordem_anuncios is None:
+        ordem_anuncios = range(len(itens_anuncio))
+    n_ordem = len(ordem_anuncios)
+
+    content: List[Dict[str, Any]] = [None] * target_size  # type: ignore[list-item]
+    pos = 0
+    for ciclo in range(ciclos_completos + 1):
+        slots = tamanho_ciclo if ciclo < ciclos_completos else resto
+        base_aviso = ciclo * slots_aviso
+        base_anuncio = ciclo * slots_anuncio - fim_aviso + inicio_anuncios
+        base_noticia = ciclo * slots_noticia - fim_anuncio
+        for slot in range(slots):
+            if slot < fim_aviso:
+                content[pos] = itens_aviso[(base_aviso + slot) % n_aviso]
+            elif slot < fim_anuncio:
+                content[pos] = itens_anuncio[ordem_anuncios[(base_anuncio + slot) % n_ordem]]
+            else:
+                content[pos] = itens_noticia[(base_noticia + slot) % n_noticia]
+            pos += 1
+
+    stats = estatisticas_playlist(
+        len(avisos), len(anuncios), len(noticias),
+        proporcao_avisos, proporcao_anuncios, proporcao_noticias,
+        tamanho_minimo,
+    )
+
+    return content, stats
@@ -7,6 +7,7 @@ from datetime import datetime, timedelta
 from sqlmodel import Session, select
 from app.db import engine
 from app.models import TV
+from app.services.notificacoes import registrar_tvs_offline
 import logging
 
 logging.basicConfig(level=logging.INFO)
@@ -15,7 +16,7 @@ logger = logging.getLogger(__name__)
 def check_offline_tvs():
     """
     Verifica TVs que não enviaram heartbeat nos últimos 5 minutos
-    e marca como offline
+    e marca como offline (com alerta no resumo do síndico)
     """
     with Session(engine) as session:
         try:
@@ -24,7 +25,7 @@ def check_offline_tvs():
                 select(TV).where(TV.status == "online")
             ).all()
             
-            tvs_offline_count = 0
+            tvs_offline = []
             current_time = datetime.now()
             timeout_threshold = current_time - timedelta(minutes=5)
             
@@ -33,7 +34,7 @@ def check_offline_tvs():
                 if tv.last_ping and tv.last_ping < timeout_threshold:
                     tv.status = "offline"
                     session.add(tv)
-                    tvs_offline_count += 1
+                    tvs_offline.append(tv)
                     
                     tempo_sem_ping = (current_time - tv.last_ping).total_seconds() / 60
                     logger.warning(
@@ -42,9 +43,10 @@ def check_offline_tvs():
                     )
             
             # Commit das mudanças
-            if tvs_offline_count > 0:
+            if tvs_offline:
+                registrar_tvs_offline(session, tvs_offline)
                 session.commit()
-                logger.info(f"✅ {tvs_offline_count} TV(s) marcada(s) como offline")
+                logger.info(f"✅ {len(tvs_offline)} TV(s) marcada(s) como offline")
             else:
                 logger.info("✅ Todas as TVs online estão respondendo")
                 
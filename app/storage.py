@@ -3,9 +3,12 @@ from botocore.config import Config
 import os
 from datetime import datetime
 import uuid
+import hashlib
 import subprocess
 import tempfile
 from pathlib import Path
+from typing import Optional
+import requests
 
 # Carregar variáveis de ambiente do .env
 try:
@@ -40,6 +43,17 @@ s3_client = boto3.client(
     region_name='auto'
 )
 
+# Cache de metadados de mídia: as chaves no R2 são únicas (uuid), então o
+# conteúdo de uma URL nunca muda e o resultado pode ser guardado indefinidamente
+_media_info_cache: dict = {}
+MEDIA_INFO_CACHE_MAX = 5000
+
+def _guardar_media_info(info: dict):
+    """Guarda os metadados no cache (limpa o cache ao atingir MEDIA_INFO_CACHE_MAX)"""
+    if len(_media_info_cache) >= MEDIA_INFO_CACHE_MAX:
+        _media_info_cache.clear()
+    _media_info_cache[info["url"]] = info
+
 def convert_video_to_mp4(input_content: bytes, input_filename: str) -> tuple[bytes, str]:
     """
     Converte qualquer vídeo para MP4 usando FFmpeg
@@ -131,37 +145,7 @@ def upload_image_to_r2(file_content: bytes, filename: str, content_type: str) ->
     Returns:
         URL pública da mídia
     """
-    try:
-        # Se for vídeo e NÃO for MP4, converter
-        is_video = content_type.startswith('video/')
-        is_compatible = content_type in ['video/mp4', 'video/quicktime']
-        
-        if is_video and not is_compatible:
-            print(f"🎬 Convertendo vídeo {filename} para MP4...")
-            file_content, content_type = convert_video_to_mp4(file_content, filename)
-            # Trocar extensão para .mp4
-            filename = filename.rsplit('.', 1)[0] + '.mp4'
-            print(f"✅ Conversão concluída!")
-        
-        # Gerar nome único para o arquivo
-        file_extension = filename.split('.')[-1] if '.' in filename else 'jpg'
-        unique_filename = f"anuncios/{datetime.now().strftime('%Y/%m/%d')}/{uuid.uuid4()}.{file_extension}"
-        
-        # Upload para R2
-        s3_client.put_object(
-            Bucket=R2_BUCKET,
-            Key=unique_filename,
-            Body=file_content,
-            ContentType=content_type,
-            ACL='public-read'  # Tornar público
-        )
-        
-        # Retornar URL pública personalizada
-        public_url = f"{R2_PUBLIC_URL}/{unique_filename}"
-        return public_url
-        
-    except Exception as e:
-        raise Exception(f"Erro no upload: {str(e)}")
+    return upload_media_with_info(file_content, filename, content_type)["url"]
 
 def upload_media_to_r2(file_content: bytes, filename: str, content_type: str, media_type: str = "anuncios") -> str:
     """
@@ -177,6 +161,26 @@ def upload_media_to_r2(file_content: bytes, filename: str, content_type: str, me
     Returns:
         URL pública da mídia
     """
+    return upload_media_with_info(file_content, filename, content_type, media_type)["url"]
+
+def upload_media_with_info(file_content: bytes, filename: str, content_type: str, media_type: str = "anuncios") -> dict:
+    """
+    Faz upload de mídia para o Cloudflare R2 e retorna seus metadados
+    Converte automaticamente vídeos para MP4
+    
+    Tamanho, hash SHA-256 e tipo MIME são calculados sobre o arquivo final
+    (após conversão), gravados como metadados do objeto no R2 e devolvidos
+    para serem salvos junto do anúncio/aviso (manifesto de prefetch das TVs).
+    
+    Args:
+        file_content: Conteúdo do arquivo em bytes
+        filename: Nome original do arquivo
+        content_type: Tipo MIME do arquivo
+        media_type: Tipo de pasta (anuncios, avisos, etc)
+    
+    Returns:
+        Dicionário com url, size, hash e content_type
+    """
     try:
         # Se for vídeo e NÃO for MP4, converter
         is_video = content_type.startswith('video/')
@@ -193,18 +197,27 @@ def upload_media_to_r2(file_content: bytes, filename: str, content_type: str, me
         file_extension = filename.split('.')[-1] if '.' in filename else 'jpg'
         unique_filename = f"{media_type}/{datetime.now().strftime('%Y/%m/%d')}/{uuid.uuid4()}.{file_extension}"
         
+        content_hash = hashlib.sha256(file_content).hexdigest()
+        
         # Upload para R2
         s3_client.put_object(
             Bucket=R2_BUCKET,
             Key=unique_filename,
             Body=file_content,
             ContentType=content_type,
+            Metadata={'sha256': content_hash},
             ACL='public-read'  # Tornar público
         )
         
-        # Retornar URL pública personalizada
-        public_url = f"{R2_PUBLIC_URL}/{unique_filename}"
-        return public_url
+        # URL pública personalizada + metadados
+        info = {
+            "url": f"{R2_PUBLIC_URL}/{unique_filename}",
+            "size": len(file_content),
+            "hash": content_hash,
+            "content_type": content_type,
+        }
+        _guardar_media_info(info)
+        return info
         
     except Exception as e:
         raise Exception(f"Erro no upload: {str(e)}")
@@ -233,3 +246,53 @@ def delete_image_from_r2(image_url: str) -> bool:
     except Exception as e:
         print(f"Erro ao deletar mídia: {str(e)}")
         return False
+
+def get_media_info(media_url: str) -> Optional[dict]:
+    """
+    Retorna tamanho, hash e tipo MIME de uma mídia sem baixar o conteúdo
+    
+    Mídias do R2 usam HEAD no bucket; URLs externas (ex.: imagens de notícias)
+    usam uma requisição HEAD HTTP. O hash só é preenchido com o SHA-256
+    gravado no upload: o ETag não é um SHA-256 (é MD5 ou opaco), então sem
+    ele o hash fica None.
+    
+    Args:
+        media_url: URL pública da mídia
+    
+    Returns:
+        Dicionário com url, size, hash e content_type, ou None se indisponível
+    """
+    if not media_url:
+        return None
+    
+    cached = _media_info_cache.get(media_url)
+    if cached is not None:
+        return cached
+    
+    try:
+        if media_url.startswith(f"{R2_PUBLIC_URL}/"):
+            key = media_url.replace(f"{R2_PUBLIC_URL}/", "")
+            head = s3_client.head_object(Bucket=R2_BUCKET, Key=key)
+            info = {
+                "url": media_url,
+                "size": head.get("ContentLength"),
+                "hash": head.get("Metadata", {}).get("sha256") or None,
+                "content_type": head.get("ContentType"),
+            }
+        else:
+            response = requests.head(media_url, timeout=5, allow_redirects=True)
+            if response.status_code != 200:
+                return None
+            size = response.headers.get("Content-Length")
+            info = {
+                "url": media_url,
+                "size": int(size) if size and size.isdigit() else None,
+                "hash": None,
+                "content_type": response.headers.get("Content-Type"),
+            }
+    except Exception as e:
+        print(f"Erro ao obter metadados da mídia {media_url}: {str(e)}")
+        return None
+    
+    _guardar_media_info(info)
+    return info
@@ -19,7 +19,9 @@ import sys
 from datetime import datetime
 
 # Importar todos os modelos
-from app.models import User, Condominio, TV, Anuncio, Aviso
+from app.models import User, Condominio, TV, Anuncio, Aviso, AvisoSindico, AnuncioCondominio, AvisoCondominio, EmailOutbox, NotificacaoEvento
+from app.services.content_links import backfill_condominios, backfill_sindicos
+from app.services.aviso_quota import recontar_avisos_ativos
 from app.auth import get_password_hash
 
 # Configuração do banco
@@ -67,6 +69,27 @@ def add_column_if_not_exists(table_name: str, column_name: str, column_definitio
         print(f"  ℹ️  Coluna '{column_name}' já existe em '{table_name}'")
 
 
+def add_index_if_not_exists(table_name: str, index_name: str, columns: str, unique: bool = False):
+    """Cria um índice se ele não existir"""
+    with engine.connect() as conn:
+        result = conn.execute(text(f"""
+            SELECT INDEX_NAME 
+            FROM INFORMATION_SCHEMA.STATISTICS 
+            WHERE TABLE_SCHEMA = '{banco}' 
+            AND TABLE_NAME = '{table_name}'
+            AND INDEX_NAME = '{index_name}'
+        """))
+        if len(list(result)) > 0:
+            print(f"  ℹ️  Índice '{index_name}' já existe em '{table_name}'")
+            return
+        
+        print(f"  ➕ Criando índice '{index_name}' na tabela '{table_name}'...")
+        tipo = "UNIQUE INDEX" if unique else "INDEX"
+        conn.execute(text(f"CREATE {tipo} {index_name} ON `{table_name}` ({columns})"))
+        conn.commit()
+    print(f"  ✅ Índice '{index_name}' criado!")
+
+
 def create_tables():
     """Cria todas as tabelas do sistema"""
     print("\n📦 Criando/Verificando tabelas...")
@@ -133,6 +156,66 @@ def run_migrations():
         else:
             print("  ℹ️  archive_url já é TEXT em aviso")
     
+    # Migração 4: Peso e prioridade no rodízio de anúncios
+    print("\n  🔧 Migração 4: Peso e prioridade de anúncios")
+    add_column_if_not_exists('anuncio', 'peso', 'INT NOT NULL DEFAULT 1')
+    add_column_if_not_exists('anuncio', 'prioridade', 'INT NOT NULL DEFAULT 0')
+    
+    # Migração 5: Programação por horário (dayparting)
+    print("\n  🔧 Migração 5: Início e janelas de exibição")
+    for tabela in ('anuncio', 'aviso'):
+        add_column_if_not_exists(tabela, 'data_inicio', 'DATETIME NULL')
+        add_column_if_not_exists(tabela, 'janelas_exibicao', 'VARCHAR(255) NULL')
+    
+    # Migração 6: Metadados de mídia (manifesto de prefetch das TVs)
+    print("\n  🔧 Migração 6: Tamanho, hash e tipo das mídias")
+    for tabela in ('anuncio', 'aviso'):
+        add_column_if_not_exists(tabela, 'archive_size', 'BIGINT NULL')
+        add_column_if_not_exists(tabela, 'archive_hash', 'VARCHAR(64) NULL')
+        add_column_if_not_exists(tabela, 'archive_content_type', 'VARCHAR(100) NULL')
+    
+    # Migração 7: Tabela aviso_sindico (criada por create_tables) preenchida a partir de sindico_ids
+    print("\n  🔧 Migração 7: Vínculos aviso ↔ síndico")
+    with Session(engine) as session:
+        total = backfill_sindicos(session)
+    print(f"  ✅ Vínculos de {total} avisos sincronizados!")
+    
+    # Migração 8: Contador de avisos ativos por síndico (cota O(1))
+    print("\n  🔧 Migração 8: Contador de avisos ativos por síndico")
+    add_column_if_not_exists('user', 'avisos_ativos', 'INT NOT NULL DEFAULT 0')
+    with Session(engine) as session:
+        contagem = recontar_avisos_ativos(session)
+    print(f"  ✅ Contadores recalculados para {len(contagem)} síndicos!")
+    
+    # Migração 9: Tabelas anuncio_condominio / aviso_condominio (criadas por create_tables)
+    print("\n  🔧 Migração 9: Vínculos conteúdo ↔ condomínio")
+    with Session(engine) as session:
+        total = backfill_condominios(session)
+    print(f"  ✅ Vínculos de {total} anúncios/avisos sincronizados!")
+    
+    # Migração 10: Índice único em user.email (login e autenticação por email)
+    print("\n  🔧 Migração 10: Índice único em user.email")
+    with engine.connect() as conn:
+        duplicados = conn.execute(text(
+            "SELECT email, COUNT(*) FROM `user` GROUP BY email HAVING COUNT(*) > 1"
+        )).all()
+    if duplicados:
+        print(f"  ⚠️  Emails duplicados impedem o índice único: {[email for email, _ in duplicados]}")
+    else:
+        add_index_if_not_exists('user', 'ix_user_email', 'email', unique=True)
+    
+    # Migração 11: Versão dos tokens (revogação sem gravar o JWT a cada login)
+    print("\n  🔧 Migração 11: Versão dos tokens JWT")
+    add_column_if_not_exists('user', 'token_version', 'INT NOT NULL DEFAULT 0')
+    
+    # Migração 12: Fila de emails (tabela email_outbox criada por create_tables)
+    print("\n  🔧 Migração 12: Fila de emails")
+    add_index_if_not_exists('email_outbox', 'ix_email_outbox_fila', 'status, proxima_tentativa')
+    
+    # Migração 13: Eventos do resumo de alertas dos síndicos (tabela notificacao_evento criada por create_tables)
+    print("\n  🔧 Migração 13: Eventos de notificação (digest)")
+    add_index_if_not_exists('notificacao_evento', 'ix_notificacao_evento_pendente', 'enviado_em, sindico_id')
+    
     print("\n✅ Migrações concluídas!")
 
 
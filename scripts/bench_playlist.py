@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark do motor de playlist (app/services/playlist.py)
+
+Uso:
+    python scripts/bench_playlist.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from app.services.playlist import build_playlist
+
+CENARIOS = [
+    # (avisos, anuncios, noticias, proporção)
+    (1, 1, 0, (1, 5, 0)),
+    (5, 20, 0, (1, 5, 0)),
+    (10, 50, 15, (1, 5, 3)),
+    (50, 500, 30, (2, 8, 3)),
+]
+
+
+def main():
+    print("📊 Benchmark: build_playlist")
+    print("=" * 70)
+
+    for n_avisos, n_anuncios, n_noticias, proporcao in CENARIOS:
+        avisos = [f"aviso-{i}" for i in range(n_avisos)]
+        anuncios = [f"anuncio-{i}" for i in range(n_anuncios)]
+        noticias = [f"noticia-{i}" for i in range(n_noticias)]
+
+        execucoes = 2000
+        total = timeit.timeit(
+            lambda: build_playlist(avisos, anuncios, noticias, *proporcao),
+            number=execucoes,
+        )
+        content, stats = build_playlist(avisos, anuncios, noticias, *proporcao)
+
+        print(
+            f"  {n_avisos:>3} avisos / {n_anuncios:>3} anúncios / {n_noticias:>2} notícias "
+            f"{proporcao}: {total / execucoes * 1e6:8.1f} µs/build "
+            f"({stats['total_items']} itens)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,25 @@
+"""
+Rodízio ponderado de anúncios (app/services/ad_scheduler.py)
+"""
+
+from types import SimpleNamespace
+
+from hypothesis import given, strategies as st
+
+from app.services.ad_scheduler import deslocamento_rotacao, planejar_rotacao
+
+
+@given(
+    st.lists(st.tuples(st.integers(min_value=1, max_value=10), st.integers(min_value=0, max_value=3)), min_size=2, max_size=8),
+    st.integers(min_value=1, max_value=10_000),
+    st.integers(min_value=0, max_value=40),
+    st.floats(min_value=0, max_value=4e9),
+)
+def test_rotacao_atual_e_canonica_mais_deslocamento(pesos, tv_id, slots, agora):
+    anuncios = [SimpleNamespace(id=i + 1, peso=peso, prioridade=prioridade) for i, (peso, prioridade) in enumerate(pesos)]
+
+    _, ordem, inicio_canonico = planejar_rotacao(anuncios, tv_id, slots, agora=0)
+    _, ordem_atual, inicio_atual = planejar_rotacao(anuncios, tv_id, slots, agora=agora)
+
+    assert ordem_atual == ordem
+    assert inicio_atual == (inicio_canonico + deslocamento_rotacao(slots, len(ordem), agora)) % len(ordem)
@@ -0,0 +1,180 @@
+"""
+Cota de avisos ativos por síndico (app/services/aviso_quota.py)
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, select
+
+from app import auth, db
+from app.endpoints import avisos
+from app.models import Aviso, Condominio, User
+from app.services import expiration_monitor
+from app.services.aviso_quota import ajustar_contadores, recontar_avisos_ativos
+from app.services.content_links import sincronizar_condominios
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = db._criar_engine(f"sqlite:///{tmp_path / 'quota.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        for sindico_id in (1, 2):
+            session.add(User(id=sindico_id, tipo="SINDICO", nome=f"Síndico {sindico_id}", email=f"s{sindico_id}@exemplo.com", senha="x", limite_avisos=3))
+            session.add(Condominio(id=sindico_id, nome=f"Condomínio {sindico_id}", sindico_id=sindico_id))
+        session.commit()
+    yield engine
+    engine.dispose()
+
+
+def _em_cache(engine, user_id):
+    with Session(engine) as session:
+        auth.cache_user(session.get(User, user_id))
+    return auth._user_cache.get(user_id) is not None
+
+
+def test_ajustar_contadores_invalida_o_cache_de_usuarios(engine):
+    assert _em_cache(engine, 1) and _em_cache(engine, 2)
+
+    with Session(engine) as session:
+        ajustar_contadores(session, set(), {1})
+        session.commit()
+
+    assert auth._user_cache.get(1) is None
+    assert auth._user_cache.get(2) is not None
+    with Session(engine) as session:
+        assert auth.get_cached_user(session, 1) is None
+        assert session.get(User, 1).avisos_ativos == 1
+
+
+def test_recontar_invalida_todo_o_cache(engine):
+    assert _em_cache(engine, 1) and _em_cache(engine, 2)
+
+    with Session(engine) as session:
+        recontar_avisos_ativos(session)
+
+    assert auth._user_cache.get(1) is None
+    assert auth._user_cache.get(2) is None
+
+
+@pytest.fixture
+def cliente(engine, monkeypatch):
+    """
+    API de avisos e monitor de expiração sobre o banco de teste
+
+    O SQLite ignora FOR UPDATE, então cada transação abre com BEGIN IMMEDIATE
+    (trava de escrita desde o início), o equivalente mais próximo dos bloqueios
+    de linha do MySQL: transações concorrentes esperam em vez de ler o mesmo
+    contador.
+    """
+    @event.listens_for(engine, "connect")
+    def _sem_begin_automatico(dbapi_conn, _):
+        dbapi_conn.isolation_level = None
+
+    @event.listens_for(engine, "begin")
+    def _begin_immediate(conn):
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    engine.dispose()  # Reabre as conexões já com os eventos acima
+
+    def get_session():
+        with Session(engine) as session:
+            yield session
+
+    app = FastAPI()
+    app.include_router(avisos.router)
+    app.dependency_overrides[avisos.get_session] = get_session
+    monkeypatch.setattr(expiration_monitor, "engine", engine)
+    return TestClient(app)
+
+
+def _criar_aviso(engine, condominios_ids, status="Ativo", **campos):
+    with Session(engine) as session:
+        aviso = Aviso(nome="Aviso", condominios_ids=condominios_ids, status=status, **campos)
+        session.add(aviso)
+        session.flush()
+        sincronizar_condominios(session, aviso)
+        session.commit()
+        return aviso.id
+
+
+def _contadores(engine):
+    with Session(engine) as session:
+        return {u.id: u.avisos_ativos for u in session.exec(select(User).order_by(User.id))}
+
+
+def _definir_limite(engine, limite):
+    with Session(engine) as session:
+        for user in session.exec(select(User)):
+            user.limite_avisos = limite
+            session.add(user)
+        session.commit()
+
+
+def test_contador_acompanha_recontagem_com_operacoes_concorrentes(engine, cliente):
+    _definir_limite(engine, 100)
+    vencido = datetime.now() - timedelta(minutes=1)
+    ids = [_criar_aviso(engine, condominios) for condominios in ("1", "2", "1,2") * 4]
+    ids += [_criar_aviso(engine, "1,2", data_expiracao=vencido) for _ in range(4)]
+    # Removidos só pelo DELETE (o PUT relê o aviso depois do commit)
+    removiveis = [_criar_aviso(engine, condominios) for condominios in ("1", "2", "1,2") * 3]
+    with Session(engine) as session:
+        recontar_avisos_ativos(session)
+
+    def operar(n):
+        aviso_id = ids[n % len(ids)]
+        if n % 7 == 0:
+            expiration_monitor.check_expired_content()
+            return 200
+        if n % 11 == 0:
+            return cliente.delete(f"/avisos/{removiveis[n // 11 % len(removiveis)]}").status_code
+        if n % 2:
+            return cliente.put(f"/avisos/{aviso_id}", data={"status": ("Ativo", "Inativo")[n % 3 == 0]}).status_code
+        return cliente.put(f"/avisos/{aviso_id}", data={"condominios_ids": ("1", "2", "1,2")[n % 3]}).status_code
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        respostas = list(executor.map(operar, range(120)))
+
+    assert set(respostas) <= {200, 404}  # 404: DELETE repetido do mesmo aviso
+
+    contadores = _contadores(engine)
+    with Session(engine) as session:
+        recontar_avisos_ativos(session)
+    assert contadores == _contadores(engine)
+
+
+def test_put_que_ativa_aviso_respeita_o_limite(engine, cliente):
+    _definir_limite(engine, 1)
+    _criar_aviso(engine, "1")
+    inativo = _criar_aviso(engine, "1,2", status="Inativo")
+    with Session(engine) as session:
+        recontar_avisos_ativos(session)
+
+    resposta = cliente.put(f"/avisos/{inativo}", data={"status": "Ativo"})
+
+    assert resposta.status_code == 403
+    assert _contadores(engine) == {1: 1, 2: 0}
+    with Session(engine) as session:
+        assert session.get(Aviso, inativo).status == "Inativo"
+
+
+def test_monitor_nao_ativa_agendado_acima_do_limite(engine, cliente):
+    _definir_limite(engine, 1)
+    _criar_aviso(engine, "1")
+    inicio = datetime.now() - timedelta(minutes=1)
+    bloqueado = _criar_aviso(engine, "1", status="Agendado", data_inicio=inicio)
+    liberado = _criar_aviso(engine, "2", status="Agendado", data_inicio=inicio)
+    with Session(engine) as session:
+        recontar_avisos_ativos(session)
+
+    expiration_monitor.check_expired_content()
+
+    with Session(engine) as session:
+        assert session.get(Aviso, bloqueado).status == "Agendado"
+        assert session.get(Aviso, liberado).status == "Ativo"
+    assert _contadores(engine) == {1: 1, 2: 1}
@@ -0,0 +1,51 @@
+"""
+Programação por horário (app/services/dayparting.py)
+"""
+
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+from app.services.dayparting import STATUS_AGENDADO, filtrar_programados, horario_local, status_inicial
+
+
+def _item(id, **campos):
+    return SimpleNamespace(**{"id": id, "data_inicio": None, "data_expiracao": None, "janelas_exibicao": None, **campos})
+
+
+def test_horario_local_converte_datas_com_fuso():
+    data = datetime(2030, 1, 1, 12, 0, tzinfo=timezone.utc)
+    local = horario_local(data)
+
+    assert local.tzinfo is None
+    assert local == data.astimezone().replace(tzinfo=None)
+    assert horario_local(None) is None
+    assert horario_local(datetime(2030, 1, 1)) == datetime(2030, 1, 1)
+
+
+def test_status_inicial_aceita_data_com_fuso():
+    futuro = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    passado = datetime(2020, 1, 1, tzinfo=timezone(timedelta(hours=-3)))
+
+    assert status_inicial("Ativo", futuro) == STATUS_AGENDADO
+    assert status_inicial("Ativo", passado) == "Ativo"
+    assert status_inicial("Ativo", futuro, agora=datetime(2031, 1, 1, tzinfo=timezone.utc)) == "Ativo"
+
+
+def test_status_inicial_sem_inicio_futuro_desfaz_agendamento():
+    assert status_inicial(STATUS_AGENDADO, None) == "Ativo"
+    assert status_inicial(STATUS_AGENDADO, datetime(2020, 1, 1)) == "Ativo"
+    assert status_inicial(STATUS_AGENDADO, datetime(2030, 1, 1)) == STATUS_AGENDADO
+    assert status_inicial("Inativo", datetime(2030, 1, 1)) == "Inativo"
+
+
+def test_filtrar_programados_com_agora_com_fuso():
+    agora = datetime(2025, 6, 2, 12, 0, tzinfo=timezone.utc)
+    agora_local = horario_local(agora)
+    avisos = [
+        _item(1),
+        _item(2, data_inicio=agora_local + timedelta(hours=1)),
+        _item(3, data_expiracao=agora_local - timedelta(minutes=1)),
+    ]
+
+    filtrados, _ = filtrar_programados(1, avisos, [], agora=agora)
+    assert [a.id for a in filtrados] == [1]
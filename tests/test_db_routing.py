@@ -0,0 +1,85 @@
+"""
+Roteamento das sessões de leitura para a réplica (app/db.py)
+Usa dois bancos SQLite locais como principal e réplica.
+"""
+
+import asyncio
+
+import pytest
+from sqlalchemy import update
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, SQLModel, select
+
+from app import db
+from app.models import Condominio, User
+
+
+@pytest.fixture
+def bancos(tmp_path, monkeypatch):
+    """Principal e réplica com conteúdos diferentes para saber de onde veio a leitura"""
+    url_principal = f"sqlite:///{tmp_path / 'principal.db'}"
+    url_replica = f"sqlite:///{tmp_path / 'replica.db'}"
+
+    principal = db._criar_engine(url_principal)
+    replica_escrita = db._criar_engine(url_replica)
+    for engine, nome in ((principal, "principal"), (replica_escrita, "replica")):
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add(User(id=1, tipo="SINDICO", nome="Síndico", email="sindico@exemplo.com", senha="x"))
+            session.add(Condominio(id=1, nome=nome, sindico_id=1))
+            session.commit()
+    replica_escrita.dispose()
+
+    replica = db._criar_engine(url_replica, somente_leitura=True)
+    async_replica = db._criar_async_engine(db._url_async(url_replica), somente_leitura=True)
+    monkeypatch.setattr(db, "engine", principal)
+    monkeypatch.setattr(db, "replica_engine", replica)
+    monkeypatch.setattr(db, "async_replica_engine", async_replica)
+    yield principal
+    for engine in (principal, replica):
+        engine.dispose()
+    asyncio.run(async_replica.dispose())
+
+
+def test_leitura_vai_para_a_replica(bancos):
+    with Session(bancos) as session:
+        assert session.get(Condominio, 1).nome == "principal"
+
+    sessoes = db.get_read_session()
+    session = next(sessoes)
+    assert session.exec(select(Condominio.nome)).one() == "replica"
+    sessoes.close()
+
+
+def test_leitura_async_vai_para_a_replica(bancos):
+    async def ler():
+        sessoes = db.get_async_read_session()
+        session = await sessoes.__anext__()
+        nome = (await session.exec(select(Condominio.nome))).one()
+        await sessoes.aclose()
+        return nome
+
+    assert asyncio.run(ler()) == "replica"
+
+
+def test_flush_na_sessao_de_leitura_falha(bancos):
+    sessoes = db.get_read_session()
+    session = next(sessoes)
+    session.add(Condominio(id=2, nome="novo", sindico_id=1))
+    with pytest.raises(RuntimeError):
+        session.flush()
+    sessoes.close()
+
+
+def test_update_core_na_sessao_de_leitura_falha(bancos):
+    sessoes = db.get_read_session()
+    session = next(sessoes)
+    with pytest.raises(RuntimeError):
+        session.exec(update(Condominio).where(Condominio.id == 1).values(nome="alterado"))
+    sessoes.close()
+
+
+def test_conexao_da_replica_e_somente_leitura(bancos):
+    with db.replica_engine.connect() as conn:
+        with pytest.raises(OperationalError):
+            conn.exec_driver_sql("UPDATE condominio SET nome = 'alterado'")
@@ -0,0 +1,184 @@
+"""
+Fila de emails (app/services/email_outbox.py)
+O SMTP é substituído por um servidor falso que registra as conexões e envios.
+"""
+
+import smtplib
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session, SQLModel, select
+
+from app import db
+from app.models import EmailOutbox
+from app.services import email_outbox
+from app.services.email_outbox import MAX_TENTATIVAS, STATUS_ENVIADO, STATUS_FALHOU, STATUS_PENDENTE
+
+
+class SMTPFalso:
+    """Conexão SMTP falsa: recusa destinatários e pode cair no envio"""
+
+    def __init__(self, smtp):
+        self.smtp = smtp
+        self.fechada = False
+
+    def send_message(self, mensagem):
+        destinatario = mensagem["To"]
+        self.smtp.ao_enviar(destinatario)
+        if destinatario in self.smtp.recusados:
+            raise smtplib.SMTPRecipientsRefused({destinatario: (550, b"Mailbox unavailable")})
+        if destinatario in self.smtp.derrubar:
+            self.smtp.derrubar.remove(destinatario)
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        self.smtp.enviados.append((self, destinatario))
+
+    def quit(self):
+        self.fechada = True
+
+    def close(self):
+        self.fechada = True
+
+
+class ServidorFalso:
+    def __init__(self):
+        self.conexoes = []
+        self.enviados = []
+        self.recusados = set()
+        self.derrubar = set()
+        self.ao_enviar = lambda destinatario: None
+        self.falha_ao_conectar = None
+
+    def conectar(self):
+        if self.falha_ao_conectar:
+            raise self.falha_ao_conectar
+        conexao = SMTPFalso(self)
+        self.conexoes.append(conexao)
+        return conexao
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = db._criar_engine(f"sqlite:///{tmp_path / 'outbox.db'}")
+    SQLModel.metadata.create_all(engine)
+    monkeypatch.setattr(email_outbox, "engine", engine)
+    monkeypatch.setattr(email_outbox, "smtp_configurado", lambda: True)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def smtp(monkeypatch):
+    servidor = ServidorFalso()
+    monkeypatch.setattr(email_outbox, "conectar_smtp", servidor.conectar)
+    return servidor
+
+
+def _enfileirar(engine, *destinatarios, **campos):
+    with Session(engine) as session:
+        emails = [EmailOutbox(destinatario=d, assunto="Assunto", texto="Texto", **campos) for d in destinatarios]
+        session.add_all(emails)
+        session.commit()
+        return [email.id for email in emails]
+
+
+def _emails(engine):
+    with Session(engine) as session:
+        return {email.destinatario: email for email in session.exec(select(EmailOutbox))}
+
+
+def test_lote_reutiliza_uma_conexao(engine, smtp):
+    _enfileirar(engine, "a@exemplo.com", "b@exemplo.com", "c@exemplo.com")
+
+    assert email_outbox.processar_fila() == 3
+
+    assert len(smtp.conexoes) == 1 and smtp.conexoes[0].fechada
+    assert [d for _, d in smtp.enviados] == ["a@exemplo.com", "b@exemplo.com", "c@exemplo.com"]
+    assert {e.status for e in _emails(engine).values()} == {STATUS_ENVIADO}
+
+
+def test_envio_acontece_depois_do_commit_da_reserva(engine, smtp):
+    _enfileirar(engine, "a@exemplo.com")
+    vistos = []
+
+    def ao_enviar(destinatario):
+        # Outra conexão já enxerga a reserva: nenhuma transação aberta durante o SMTP
+        email = _emails(engine)[destinatario]
+        vistos.append((email.status, email.proxima_tentativa > datetime.utcnow()))
+
+    smtp.ao_enviar = ao_enviar
+    email_outbox.processar_fila()
+
+    assert vistos == [(STATUS_PENDENTE, True)]
+    assert _emails(engine)["a@exemplo.com"].status == STATUS_ENVIADO
+
+
+def test_destinatario_recusado_e_reagendado_sem_reconectar(engine, smtp):
+    _enfileirar(engine, "a@exemplo.com", "recusado@exemplo.com", "c@exemplo.com")
+    smtp.recusados.add("recusado@exemplo.com")
+    antes = datetime.utcnow()
+
+    email_outbox.processar_fila()
+
+    emails = _emails(engine)
+    recusado = emails.pop("recusado@exemplo.com")
+    assert len(smtp.conexoes) == 1
+    assert {e.status for e in emails.values()} == {STATUS_ENVIADO}
+    assert recusado.status == STATUS_PENDENTE and recusado.tentativas == 1
+    assert "550" in recusado.ultimo_erro
+    assert recusado.proxima_tentativa >= antes + timedelta(seconds=email_outbox.BACKOFF_INICIAL)
+
+
+def test_reconecta_apos_conexao_perdida(engine, smtp):
+    _enfileirar(engine, "a@exemplo.com", "b@exemplo.com", "c@exemplo.com")
+    smtp.derrubar.add("b@exemplo.com")
+
+    email_outbox.processar_fila()
+
+    primeira, segunda = smtp.conexoes
+    assert primeira.fechada and segunda.fechada
+    assert [(c, d) for c, d in smtp.enviados] == [(primeira, "a@exemplo.com"), (segunda, "c@exemplo.com")]
+    emails = _emails(engine)
+    assert emails["b@exemplo.com"].status == STATUS_PENDENTE and emails["b@exemplo.com"].tentativas == 1
+    assert emails["c@exemplo.com"].status == STATUS_ENVIADO
+
+
+def test_falha_ao_conectar_reagenda_o_lote(engine, smtp):
+    _enfileirar(engine, "a@exemplo.com", "b@exemplo.com")
+    smtp.falha_ao_conectar = OSError("Connection refused")
+
+    assert email_outbox.processar_fila() == 2
+
+    assert {(e.status, e.tentativas) for e in _emails(engine).values()} == {(STATUS_PENDENTE, 1)}
+
+
+def test_backoff_e_descarte_apos_max_tentativas(engine, smtp):
+    assert [email_outbox._backoff(n) for n in (1, 2, 3)] == [30, 60, 120]
+    assert email_outbox._backoff(20) == email_outbox.BACKOFF_MAXIMO
+
+    _enfileirar(engine, "ultima@exemplo.com", tentativas=MAX_TENTATIVAS - 1)
+    _enfileirar(engine, "segunda@exemplo.com", tentativas=1)
+    smtp.recusados.update({"ultima@exemplo.com", "segunda@exemplo.com"})
+    antes = datetime.utcnow()
+
+    email_outbox.processar_fila()
+
+    emails = _emails(engine)
+    assert emails["ultima@exemplo.com"].status == STATUS_FALHOU
+    assert emails["ultima@exemplo.com"].tentativas == MAX_TENTATIVAS
+    assert emails["segunda@exemplo.com"].status == STATUS_PENDENTE
+    assert emails["segunda@exemplo.com"].proxima_tentativa >= antes + timedelta(seconds=60)
+
+    # Reagendados não voltam antes do backoff
+    assert email_outbox.processar_fila() == 0
+
+
+def test_reserva_vencida_volta_para_a_fila(engine, smtp):
+    vencida = datetime.utcnow() - timedelta(seconds=1)
+    _enfileirar(engine, "a@exemplo.com", proxima_tentativa=vencida)
+    reservados = email_outbox._reservar_lote(datetime.utcnow())
+    assert len(reservados) == 1
+    assert email_outbox._reservar_lote(datetime.utcnow()) == []  # Reservado: outra máquina não pega
+
+    # Processo caiu sem registrar o resultado: após RESERVA_LOTE o email volta
+    depois = datetime.utcnow() + timedelta(seconds=email_outbox.RESERVA_LOTE + 1)
+    assert [e.id for e in email_outbox._reservar_lote(depois)] == [reservados[0].id]
@@ -0,0 +1,198 @@
+"""
+Cache de notícias (app/services/news.py)
+"""
+
+import io
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import pytest
+
+from app.services import news
+from app.services.news import FeedSource, NewsItem, get_news_status, parse_feed, refresh_news
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def _noticia(titulo):
+    return NewsItem(title=titulo, url=f"https://exemplo.com/{titulo}", publishedAt="2025-01-01T00:00:00", source="Teste")
+
+
+def _falha(feed):
+    raise ConnectionError("feed fora do ar")
+
+
+@pytest.fixture
+def feeds(monkeypatch):
+    """Isola o registro de feeds e o estado do cache"""
+    monkeypatch.setattr(news, "FEEDS", {})
+    monkeypatch.setattr(news, "_por_feed", {})
+    monkeypatch.setattr(news, "_agregado", [])
+    monkeypatch.setattr(news, "_atualizado_em", None)
+    monkeypatch.setattr(news, "_tentado_em", None)
+    monkeypatch.setattr(news, "NEWS_IMAGE_PROXY", False)
+    return news.FEEDS
+
+
+def test_refresh_com_sucesso_atualiza_o_cache(feeds):
+    feeds["a"] = FeedSource("a", "Teste", "https://exemplo.com/a", lambda feed: [_noticia("um")])
+
+    assert refresh_news() == 1
+    status = get_news_status()
+    assert status["updated_at"] is not None
+    assert status["stale"] is False
+
+
+def test_todos_os_feeds_falhando_mantem_o_cache_velho(feeds):
+    feeds["a"] = FeedSource("a", "Teste", "https://exemplo.com/a", lambda feed: [_noticia("um")])
+    refresh_news()
+    atualizado_em = get_news_status()["updated_at"]
+
+    feeds["a"].fetch = _falha
+    assert refresh_news() == 1  # Últimas notícias boas continuam no cache
+
+    status = get_news_status()
+    assert status["updated_at"] == atualizado_em
+    assert status["feeds"]["a"]["breaker"]["consecutive_failures"] == 1
+
+
+def test_cache_nunca_carregado_continua_stale(feeds):
+    feeds["a"] = FeedSource("a", "Teste", "https://exemplo.com/a", _falha)
+
+    assert refresh_news() == 0
+    status = get_news_status()
+    assert status["updated_at"] is None
+    assert status["stale"] is True
+    assert news._tentado_em is not None
+
+
+def test_breaker_semi_aberto_dispara_o_teste_antes_do_refresh(feeds, monkeypatch):
+    disparos = []
+    monkeypatch.setattr(news, "_refresh_em_background", lambda: disparos.append(True))
+    feeds["a"] = FeedSource("a", "Teste", "https://exemplo.com/a", _falha)
+    breaker = feeds["a"].breaker
+    for _ in range(news.BREAKER_LIMITE_FALHAS):
+        refresh_news()
+    assert breaker.estado == "aberto"
+    assert breaker.to_dict()["retry_in_seconds"] == news.BREAKER_ESPERA_INICIAL
+
+    news.get_news()  # Tentativa recente e breaker aberto: nada a fazer
+    assert disparos == []
+
+    breaker.aberto_ate = time.monotonic() - 1  # Fim da espera (30s), bem antes de NEWS_STALE_SECONDS
+    assert breaker.estado == "semi-aberto"
+    news.get_news()
+    assert disparos == [True]
+
+    # Teste falhou: a espera dobra
+    refresh_news()
+    assert breaker.estado == "aberto"
+    assert breaker.to_dict()["retry_in_seconds"] == 2 * news.BREAKER_ESPERA_INICIAL
+
+    breaker.aberto_ate = time.monotonic() - 1
+    feeds["a"].fetch = lambda feed: [_noticia("um")]
+    refresh_news()
+    assert breaker.estado == "fechado"
+    assert breaker.ultimo_sucesso.tzinfo is not None
+
+
+def _datas(items):
+    return [news._data_publicacao(item) for item in items]
+
+
+def test_parse_feed_rss():
+    with open(FIXTURES / "feed_rss.xml", "rb") as stream:
+        items = parse_feed(stream, "Jornal")
+
+    assert [(i.title, i.url, i.urlToImage) for i in items] == [
+        ("Prefeitura anuncia obras & reformas", "https://noticias.exemplo.com/obras", "https://img.exemplo.com/obras.jpg"),
+        ("Chuva forte no fim de semana", "https://noticias.exemplo.com/chuva", "https://img.exemplo.com/chuva.png"),
+        ("Campeonato começa hoje", "https://noticias.exemplo.com/campeonato", "https://img.exemplo.com/campeonato.webp"),
+    ]
+    assert _datas(items) == [
+        datetime(2025, 6, 2, 15, 30, tzinfo=timezone.utc),
+        datetime(2025, 6, 1, 8, 0, tzinfo=timezone.utc),
+        datetime(2025, 5, 31, 18, 45, tzinfo=timezone.utc),
+    ]
+    assert items[0].description == "Obras começam na segunda-feira."
+    assert {i.source for i in items} == {"Jornal"}
+
+
+def test_parse_feed_atom():
+    with open(FIXTURES / "feed_atom.xml", "rb") as stream:
+        items = parse_feed(stream, "Portal")
+
+    assert [(i.title, i.url, i.urlToImage) for i in items] == [
+        ("Nova linha de ônibus", "https://portal.exemplo.com/onibus", "https://img.exemplo.com/onibus.jpg"),
+        ("Feira de artesanato", "https://portal.exemplo.com/feira", "https://img.exemplo.com/feira.jpg"),
+    ]
+    # <published> tem preferência sobre <updated>
+    assert _datas(items) == [
+        datetime(2025, 6, 2, 14, 0, tzinfo=timezone.utc),
+        datetime(2025, 6, 1, 10, 0, tzinfo=timezone(timedelta(hours=-3))),
+    ]
+    assert items[1].description == "Sábado na praça."
+
+
+class _Resposta:
+    """Resposta do requests.get(stream=True) usada por _fetch_rss"""
+
+    def __init__(self, status_code, corpo=b"", headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.raw = io.BytesIO(corpo)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *erro):
+        return False
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise news.requests.HTTPError(f"HTTP {self.status_code}")
+
+
+@pytest.fixture
+def respostas(monkeypatch):
+    """Fila de respostas de requests.get; registra os headers enviados"""
+    fila, enviados = [], []
+
+    def get(url, headers, timeout, stream):
+        enviados.append(headers)
+        return fila.pop(0)
+
+    monkeypatch.setattr(news.requests, "get", get)
+    return fila, enviados
+
+
+def test_fetch_rss_envia_requisicao_condicional(respostas):
+    fila, enviados = respostas
+    feed = FeedSource("teste", "Jornal", "https://noticias.exemplo.com/feed", news._fetch_rss)
+    validadores = {"ETag": '"v1"', "Last-Modified": "Mon, 02 Jun 2025 15:30:00 GMT"}
+    fila.append(_Resposta(200, (FIXTURES / "feed_rss.xml").read_bytes(), validadores))
+    fila.append(_Resposta(304))
+
+    assert len(news._fetch_rss(feed)) == 3
+    assert "If-None-Match" not in enviados[0] and "If-Modified-Since" not in enviados[0]
+    assert (feed.etag, feed.last_modified) == ('"v1"', "Mon, 02 Jun 2025 15:30:00 GMT")
+
+    assert news._fetch_rss(feed) is None
+    assert enviados[1]["If-None-Match"] == '"v1"'
+    assert enviados[1]["If-Modified-Since"] == "Mon, 02 Jun 2025 15:30:00 GMT"
+    assert (feed.etag, feed.last_modified) == ('"v1"', "Mon, 02 Jun 2025 15:30:00 GMT")
+
+
+def test_304_mantem_o_cache_do_feed(feeds, respostas):
+    fila, _ = respostas
+    feeds["teste"] = FeedSource("teste", "Jornal", "https://noticias.exemplo.com/feed", news._fetch_rss)
+    fila.append(_Resposta(200, (FIXTURES / "feed_rss.xml").read_bytes(), {"ETag": '"v1"'}))
+    fila.append(_Resposta(304))
+
+    assert refresh_news() == 3
+    antes = news.get_news()
+    assert refresh_news() == 3
+
+    assert news.get_news() == antes
+    assert get_news_status()["feeds"]["teste"]["breaker"]["state"] == "fechado"
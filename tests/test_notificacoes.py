@@ -0,0 +1,53 @@
+"""
+Resumo de alertas dos síndicos (app/services/notificacoes.py)
+"""
+
+import pytest
+from sqlmodel import Session, SQLModel, select
+
+from app import db
+from app.models import Condominio, EmailOutbox, NotificacaoEvento, TV, User
+from app.services import notificacoes
+from app.services.notificacoes import TIPO_AVISO_EXPIRADO, TIPO_TV_OFFLINE
+
+
+@pytest.fixture
+def engine(tmp_path, monkeypatch):
+    engine = db._criar_engine(f"sqlite:///{tmp_path / 'notificacoes.db'}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        for sindico_id in (1, 2):
+            session.add(User(id=sindico_id, tipo="SINDICO", nome=f"Síndico {sindico_id}", email=f"s{sindico_id}@exemplo.com", senha="x"))
+            session.add(Condominio(id=sindico_id, nome=f"Condomínio {sindico_id}", sindico_id=sindico_id))
+        session.add(TV(id=1, nome="Hall", condominio_id=1, codigo_conexao="A1", status="online"))
+        session.add(TV(id=2, nome="Garagem", condominio_id=1, codigo_conexao="A2", status="offline"))
+        session.add(TV(id=3, nome="Portaria", condominio_id=2, codigo_conexao="B1", status="online"))
+        session.commit()
+    monkeypatch.setattr(notificacoes, "engine", engine)
+    yield engine
+    engine.dispose()
+
+
+def _evento(session, sindico_id, tipo, referencia, descricao):
+    session.add(NotificacaoEvento(sindico_id=sindico_id, tipo=tipo, referencia=referencia, descricao=descricao))
+
+
+def test_digest_descarta_tvs_que_voltaram(engine):
+    with Session(engine) as session:
+        _evento(session, 1, TIPO_TV_OFFLINE, "tv:1", "TV 'Hall' - Condomínio 1")
+        _evento(session, 1, TIPO_TV_OFFLINE, "tv:2", "TV 'Garagem' - Condomínio 1")
+        _evento(session, 1, TIPO_AVISO_EXPIRADO, "aviso:5", "Aviso 'Piscina' expirado")
+        _evento(session, 2, TIPO_TV_OFFLINE, "tv:3", "TV 'Portaria' - Condomínio 2")
+        session.commit()
+
+    assert notificacoes.enviar_digests() == 1
+
+    with Session(engine) as session:
+        emails = session.exec(select(EmailOutbox)).all()
+        pendentes = session.exec(select(NotificacaoEvento).where(NotificacaoEvento.enviado_em == None)).all()  # noqa: E711
+
+    # Síndico 2 só tinha a TV que voltou: sem email
+    assert [email.destinatario for email in emails] == ["s1@exemplo.com"]
+    assert "Garagem" in emails[0].texto and "Piscina" in emails[0].texto
+    assert "Hall" not in emails[0].texto
+    assert pendentes == []  # Descartados também saem da fila
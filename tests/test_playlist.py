@@ -0,0 +1,120 @@
+"""
+Propriedades do motor de playlist (app/services/playlist.py)
+"""
+
+from hypothesis import given, strategies as st
+
+from app.services.playlist import (
+    TIPO_ANUNCIO, TIPO_AVISO, TIPO_NOTICIA, build_playlist, estatisticas_playlist, slots_por_ciclo
+)
+
+quantidades = st.integers(min_value=0, max_value=12)
+proporcoes = st.integers(min_value=0, max_value=6)
+tamanhos = st.integers(min_value=0, max_value=80)
+
+
+def _itens(prefixo, quantidade):
+    return [{"id": f"{prefixo}{i}"} for i in range(quantidade)]
+
+
+def _montar(n_avisos, n_anuncios, n_noticias, p_avisos, p_anuncios, p_noticias, tamanho_minimo, **kwargs):
+    avisos, anuncios, noticias = _itens("av", n_avisos), _itens("an", n_anuncios), _itens("no", n_noticias)
+    content, stats = build_playlist(
+        avisos, anuncios, noticias, p_avisos, p_anuncios, p_noticias, tamanho_minimo, **kwargs
+    )
+    return avisos, anuncios, noticias, content, stats
+
+
+def _do_tipo(content, tipo):
+    return [item["data"] for item in content if item["type"] == tipo]
+
+
+@given(quantidades, quantidades, quantidades, proporcoes, proporcoes, proporcoes)
+def test_slots_por_ciclo(n_avisos, n_anuncios, n_noticias, p_avisos, p_anuncios, p_noticias):
+    avisos, anuncios, noticias = slots_por_ciclo(n_avisos, n_anuncios, n_noticias, p_avisos, p_anuncios, p_noticias)
+
+    assert 0 <= avisos <= p_avisos and 0 <= anuncios <= p_anuncios and 0 <= noticias <= p_noticias
+    # Tipo sem itens não ocupa posição; item único aparece no máximo 1x por ciclo
+    assert avisos <= n_avisos or n_avisos > 1
+    assert anuncios <= n_anuncios or n_anuncios > 1
+    assert (noticias == 0) == (n_noticias == 0 or p_noticias == 0)
+
+
+@given(quantidades, quantidades, quantidades, proporcoes, proporcoes, proporcoes, tamanhos)
+def test_proporcao_em_cada_ciclo(n_avisos, n_anuncios, n_noticias, p_avisos, p_anuncios, p_noticias, tamanho_minimo):
+    *_, content, _ = _montar(n_avisos, n_anuncios, n_noticias, p_avisos, p_anuncios, p_noticias, tamanho_minimo)
+    slots = slots_por_ciclo(n_avisos, n_anuncios, n_noticias, p_avisos, p_anuncios, p_noticias)
+    tamanho_ciclo = sum(slots)
+    if tamanho_ciclo == 0:
+        return
+
+    esperado = [TIPO_AVISO] * slots[0] + [TIPO_ANUNCIO] * slots[1] + [TIPO_NOTICIA] * slots[2]
+    for inicio in range(0, len(content), tamanho_ciclo):
+        ciclo = [item["type"] for item in content[inicio:inicio + tamanho_ciclo]]
+        assert ciclo == esperado[:len(ciclo)]
+
+
+@given(quantidades, quantidades, quantidades, proporcoes, proporcoes, proporcoes, tamanhos)
+def test_tamanho_e_estatisticas(n_avisos, n_anuncios, n_noticias, p_avisos, p_anuncios, p_noticias, tamanho_minimo):
+    *_, content, stats = _montar(n_avisos, n_anuncios, n_noticias, p_avisos, p_anuncios, p_noticias, tamanho_minimo)
+    total_natural = n_avisos + n_anuncios + n_noticias
+
+    if total_natural == 0:
+        assert content == []
+    elif sum(slots_por_ciclo(n_avisos, n_anuncios, n_noticias, p_avisos, p_anuncios, p_noticias)):
+        assert len(content) == max(total_natural, tamanho_minimo)
+    else:
+        assert len(content) == total_natural
+
+    assert stats == {
+        "total_items": len(content),
+        "avisos": len(_do_tipo(content, TIPO_AVISO)),
+        "anuncios": len(_do_tipo(content, TIPO_ANUNCIO)),
+        "noticias": len(_do_tipo(content, TIPO_NOTICIA)),
+    }
+    assert stats == estatisticas_playlist(
+        n_avisos, n_anuncios, n_noticias, p_avisos, p_anuncios, p_noticias, tamanho_minimo
+    )
+
+
+@given(quantidades, quantidades, quantidades, proporcoes, proporcoes, proporcoes, tamanhos)
+def test_rodizio_sem_perder_nem_duplicar(n_avisos, n_anuncios, n_noticias, p_avisos, p_anuncios, p_noticias, tamanho_minimo):
+    avisos, anuncios, noticias, content, _ = _montar(
+        n_avisos, n_anuncios, n_noticias, p_avisos, p_anuncios, p_noticias, tamanho_minimo
+    )
+
+    for origem, tipo in ((avisos, TIPO_AVISO), (anuncios, TIPO_ANUNCIO), (noticias, TIPO_NOTICIA)):
+        exibidos = _do_tipo(content, tipo)
+        # Rodízio circular: cada item volta só depois de todos os outros aparecerem
+        assert all(item is origem[i % len(origem)] for i, item in enumerate(exibidos))
+        if len(exibidos) >= len(origem):
+            assert {id(item) for item in exibidos} == {id(item) for item in origem}
+
+
+@given(
+    st.integers(min_value=1, max_value=8),
+    st.integers(min_value=1, max_value=4),
+    tamanhos,
+    st.data(),
+)
+def test_ordem_e_inicio_de_anuncios(n_anuncios, p_anuncios, tamanho_minimo, data):
+    ordem = data.draw(st.lists(st.integers(min_value=0, max_value=n_anuncios - 1), min_size=1, max_size=20))
+    inicio = data.draw(st.integers(min_value=0, max_value=len(ordem) - 1))
+    _, anuncios, _, content, _ = _montar(
+        0, n_anuncios, 3, 0, p_anuncios, 1, tamanho_minimo, ordem_anuncios=ordem, inicio_anuncios=inicio
+    )
+
+    exibidos = _do_tipo(content, TIPO_ANUNCIO)
+    assert all(item is anuncios[ordem[(inicio + i) % len(ordem)]] for i, item in enumerate(exibidos))
+
+
+@given(quantidades, quantidades, quantidades, tamanhos)
+def test_sem_proporcao_concatena(n_avisos, n_anuncios, n_noticias, tamanho_minimo):
+    avisos, anuncios, noticias, content, _ = _montar(n_avisos, n_anuncios, n_noticias, 0, 0, 0, tamanho_minimo)
+    assert [item["data"] for item in content] == avisos + anuncios + noticias
+
+
+def test_listas_vazias():
+    content, stats = build_playlist([], [], [], 2, 1, 3)
+    assert content == []
+    assert stats == {"total_items": 0, "avisos": 0, "anuncios": 0, "noticias": 0}
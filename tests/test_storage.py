@@ -0,0 +1,64 @@
+"""
+Metadados das mídias (app/storage.py)
+O cliente do R2 é substituído por um falso que guarda os objetos em memória.
+"""
+
+import hashlib
+
+import pytest
+
+from app import storage
+
+
+class R2Falso:
+    def __init__(self):
+        self.objetos = {}
+
+    def put_object(self, Bucket, Key, Body, ContentType, Metadata, ACL):
+        self.objetos[Key] = {"ContentLength": len(Body), "ContentType": ContentType, "Metadata": Metadata, "ETag": '"etag-md5"'}
+
+    def head_object(self, Bucket, Key):
+        return self.objetos[Key]
+
+
+@pytest.fixture
+def r2(monkeypatch):
+    r2 = R2Falso()
+    monkeypatch.setattr(storage, "s3_client", r2)
+    monkeypatch.setattr(storage, "_media_info_cache", {})
+    return r2
+
+
+def test_upload_registra_sha256_do_conteudo(r2):
+    info = storage.upload_media_with_info(b"imagem", "foto.png", "image/png", "avisos")
+
+    assert info["hash"] == hashlib.sha256(b"imagem").hexdigest()
+    assert info["size"] == 6
+    storage._media_info_cache.clear()
+    assert storage.get_media_info(info["url"])["hash"] == info["hash"]
+
+
+def test_midia_sem_sha256_fica_sem_hash(r2):
+    r2.objetos["avisos/antiga.jpg"] = {"ContentLength": 10, "ContentType": "image/jpeg", "Metadata": {}, "ETag": '"etag-md5"'}
+
+    info = storage.get_media_info(f"{storage.R2_PUBLIC_URL}/avisos/antiga.jpg")
+
+    assert info["hash"] is None  # O ETag não é um SHA-256
+    assert info["size"] == 10
+
+
+def test_cache_de_metadados_e_limitado_nos_dois_caminhos(r2, monkeypatch):
+    monkeypatch.setattr(storage, "MEDIA_INFO_CACHE_MAX", 3)
+
+    for i in range(3):
+        storage.upload_media_with_info(b"x", f"{i}.png", "image/png")
+    assert len(storage._media_info_cache) == 3
+
+    info = storage.upload_media_with_info(b"y", "3.png", "image/png")
+    assert list(storage._media_info_cache) == [info["url"]]
+
+    key = info["url"].replace(f"{storage.R2_PUBLIC_URL}/", "")
+    for i in range(4):
+        r2.objetos[f"{key}.{i}"] = r2.objetos[key]
+        storage.get_media_info(f"{info['url']}.{i}")
+    assert len(storage._media_info_cache) <= 3